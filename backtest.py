@@ -0,0 +1,191 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import config
+import market
+import storage
+from resampler import resample_array
+from scanner import rolling_smas, alignment_codes, alignment_code
+from trendlines import Trendline
+
+# ==========================================
+# 백테스트 / 리플레이 (과거 캔들로 알람 규칙 재현)
+# ==========================================
+# 실시간 봇과 같은 규칙을 봉 마감 시각 순서로 재생 (시계 = 각 봉의 마감 시각)
+#  - 타겟 배열: 마감 봉 기준 SMA 배열이 타겟에 "진입"할 때 1회 (벗어나면 다시 알람 가능)
+#  - 추세선: 구간 시작부터 (실시간 봇의 등록 시점과 같이) 마감 종가가 기준선을 돌파한 첫 봉에서 1회 (이후 해제)
+# 봉마다 DataFrame을 다시 만들지 않고 심볼/타임프레임별 배열 연산 한 번으로 전 구간을 평가
+
+KST = timedelta(hours=9)
+
+def kst_str(ts_ms):
+    return (datetime.fromtimestamp(ts_ms / 1000, timezone.utc) + KST).strftime('%Y-%m-%d %H:%M')
+
+def parse_kst(text):
+    """'2024/02/24 09:00' (KST) -> UTC 타임스탬프 (초)"""
+    return (datetime.strptime(text, "%Y/%m/%d %H:%M") - KST).replace(tzinfo=timezone.utc).timestamp()
+
+def fetch_range(symbol, start, end):
+    """[start, end) 구간 기본봉을 페이지 단위로 받아 저장소에 기록"""
+    base = config.BASE_TIMEFRAME
+    base_ms = market.timeframe_ms(base)
+    fetched = 0
+    while start < end:
+        market.limiter.acquire(market.klines_weight(config.HISTORY_PAGE_LIMIT))
+        rows = market.exchange.fetch_ohlcv(symbol, timeframe=base, since=int(start), limit=config.HISTORY_PAGE_LIMIT)
+        rows = [row for row in rows if row[0] < end]
+        if not rows:
+            break
+        storage.save_candles(symbol, base, rows)
+        fetched += len(rows)
+        start = rows[-1][0] + base_ms
+    return fetched
+
+def load_history(symbol, since, until, offline=False):
+    """[since, until) 구간 기본봉 배열 - 저장소에 없는 앞/뒤 구간만 거래소에서 보충"""
+    if not offline:
+        first, last = storage.candle_bounds(symbol, config.BASE_TIMEFRAME)
+        if first is None:
+            fetched = fetch_range(symbol, since, until)
+        else:
+            fetched = fetch_range(symbol, since, first) if since < first else 0
+            resume = last + market.timeframe_ms(config.BASE_TIMEFRAME)
+            fetched += fetch_range(symbol, resume, until) if resume < until else 0
+        if fetched:
+            print(f"📥 {symbol} 기본봉 {fetched:,}개 수신", flush=True)
+    rows = storage.load_range(symbol, config.BASE_TIMEFRAME, since, until)
+    return np.array(rows, dtype=float).reshape(-1, 6)
+
+def alignment_alerts(codes, target):
+    """배열 코드 배열 -> 타겟 배열 진입 봉 인덱스 (알림 중복 방지 규칙과 동일)"""
+    hit = codes == target
+    return np.flatnonzero(hit & ~np.r_[False, hit[:-1]])
+
+def trendline_alert(line, close_times, closes):
+    """추세선이 처음 돌파된 봉 인덱스 (없으면 None) - 실시간 봇처럼 두 번째 점 이전 봉도 평가"""
+    levels = line.level(close_times)
+    broken = (closes > levels) if line.direction == 'up' else (closes < levels)
+    return int(np.argmax(broken)) if broken.any() else None
+
+def forward_returns(closes, indices, horizon):
+    """알람 봉 종가 대비 horizon봉 뒤 수익률 (구간을 벗어나면 제외)"""
+    indices = indices[indices + horizon < len(closes)]
+    return closes[indices + horizon] / closes[indices] - 1
+
+def run(symbols, timeframes, since, until, target=None, trendlines=(), horizon=10, offline=False, quiet=False):
+    """백테스트 실행 후 (심볼, 타임프레임)별 통계 목록 반환"""
+    base_ms = market.timeframe_ms(config.BASE_TIMEFRAME)
+    target_code = alignment_code(target, config.SMA_PERIODS) if target else None
+    results = []
+    started = time.perf_counter()
+    total_base = 0
+
+    for symbol in symbols:
+        base = load_history(symbol, since, until, offline)
+        total_base += len(base)
+        for timeframe in timeframes:
+            tf_ms = market.timeframe_ms(timeframe)
+            bars = base if timeframe == config.BASE_TIMEFRAME else resample_array(base, tf_ms, base_ms)
+            if not len(bars):
+                continue
+            closes = bars[:, 4]
+            close_ms = bars[:, 0] + tf_ms
+            events = []
+
+            if target_code is not None:
+                codes = alignment_codes(rolling_smas(closes, config.SMA_PERIODS))
+                hits = alignment_alerts(codes, target_code)
+                events += [(close_ms[i], f"🎯 {target}") for i in hits]
+                returns = forward_returns(closes, hits, horizon)
+                valid = codes >= 0
+                results.append({
+                    'symbol': symbol, 'timeframe': timeframe, 'rule': target, 'bars': len(bars),
+                    'alerts': len(hits),
+                    'time_in_target': float((codes[valid] == target_code).mean()) if valid.any() else 0.0,
+                    'avg_episode_bars': float((codes == target_code).sum() / len(hits)) if len(hits) else 0.0,
+                    'avg_return': float(returns.mean()) if len(returns) else None,
+                    'win_rate': float((returns > 0).mean()) if len(returns) else None,
+                })
+
+            for line in trendlines:
+                if line.symbol != symbol or line.timeframe != timeframe:
+                    continue
+                i = trendline_alert(line, close_ms / 1000, closes)
+                if i is not None:
+                    events.append((close_ms[i], f"📈 추세선 #{line.id} {line.direction} 돌파 (기준선 ${line.level(close_ms[i] / 1000):,.2f})"))
+                results.append({'symbol': symbol, 'timeframe': timeframe, 'rule': f"trend #{line.id}", 'bars': len(bars),
+                                'alerts': int(i is not None), 'fired_at': kst_str(close_ms[i]) if i is not None else None})
+
+            if not quiet:
+                for ts, text in sorted(events):
+                    print(f"{kst_str(ts)} KST | {symbol} {timeframe} | {text}")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n⏱️ 기본봉 {total_base:,}개 ({len(symbols)}개 심볼 × {', '.join(timeframes)}) 처리 {elapsed:.2f}s", flush=True)
+    return results
+
+def print_summary(results, horizon):
+    print("\n📊 *요약*")
+    for r in results:
+        line = f"• {r['symbol']} {r['timeframe']} [{r['rule']}] 봉 {r['bars']:,}개, 알람 {r['alerts']}회"
+        if 'time_in_target' in r:
+            line += f", 조건 유지 {r['time_in_target']:.1%}, 평균 지속 {r['avg_episode_bars']:.1f}봉"
+            if r['avg_return'] is not None:
+                line += f", {horizon}봉 뒤 평균 {r['avg_return']:+.2%} (상승 {r['win_rate']:.0%})"
+        elif r.get('fired_at'):
+            line += f" ({r['fired_at']} KST)"
+        print(line)
+
+def resolve_symbol(coin):
+    """코인 이름 -> 심볼 (마켓 인덱스에 없으면 'COIN/USDT'로 간주 - 오프라인 실행용)"""
+    symbol = market.market_index.resolve(coin)
+    if symbol:
+        return symbol
+    return coin.upper() if '/' in coin else f"{coin.upper()}/{config.QUOTE_ASSET}"
+
+def parse_trend(spec, line_id, timeframe):
+    """'btc 2024/02/24 09:00 90000 2024/02/25 09:00 95000 up' -> Trendline (시각은 KST)"""
+    coin, d1, t1, p1, d2, t2, p2, direction = spec.split()
+    symbol = resolve_symbol(coin)
+    return Trendline(line_id, symbol, parse_kst(f"{d1} {t1}"), float(p1), parse_kst(f"{d2} {t2}"), float(p2),
+                     direction, timeframe)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SMA 배열/추세선 알람 백테스트 (과거 캔들 리플레이)")
+    parser.add_argument('--symbols', nargs='+', default=config.DEFAULT_SYMBOLS, help="예: btc eth 또는 BTC/USDT")
+    parser.add_argument('--timeframes', nargs='+', default=[config.DEFAULT_TIMEFRAME], choices=config.SUPPORTED_TIMEFRAME)
+    parser.add_argument('--since', required=True, help="시작일 (KST, 예: 2024/01/01)")
+    parser.add_argument('--until', help="종료일 (KST, 기본: 현재)")
+    parser.add_argument('--alert', help="타겟 배열 번호 또는 배열 (예: 1 또는 7>25>99)")
+    parser.add_argument('--trend', action='append', default=[],
+                        help="추세선 (예: 'btc 2024/02/24 09:00 90000 2024/02/25 09:00 95000 up'), 첫 번째 타임프레임 기준")
+    parser.add_argument('--horizon', type=int, default=10, help="알람 후 수익률을 볼 봉 수")
+    parser.add_argument('--db', default=config.HISTORY_FILE, help="과거 캔들 저장소 경로")
+    parser.add_argument('--offline', action='store_true', help="거래소 조회 없이 저장된 캔들만 사용")
+    parser.add_argument('--quiet', action='store_true', help="개별 알람 출력 생략")
+    args = parser.parse_args(argv)
+
+    target = config.ALIGNMENT_MAP.get(args.alert, args.alert)
+    if target and target not in config.ALIGNMENT_MAP.values():
+        parser.error(f"지원하지 않는 배열: {args.alert}")
+
+    storage.open_store(args.db)
+    if not args.offline:
+        market.load_market_index()
+    symbols = [resolve_symbol(s) for s in args.symbols]
+    trendlines = [parse_trend(spec, i, args.timeframes[0]) for i, spec in enumerate(args.trend, 1)]
+    symbols = list(dict.fromkeys([*symbols, *(line.symbol for line in trendlines)]))
+
+    since = int(parse_kst(f"{args.since} 00:00") * 1000)
+    now_ms = int(time.time() * 1000)
+    until = int(parse_kst(f"{args.until} 00:00") * 1000) if args.until else now_ms
+    # 진행 중인 기본봉은 제외
+    base_ms = market.timeframe_ms(config.BASE_TIMEFRAME)
+    until = min(until, now_ms // base_ms * base_ms)
+
+    results = run(symbols, args.timeframes, since, until, target, trendlines, args.horizon, args.offline, args.quiet)
+    print_summary(results, args.horizon)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import argparse
+import contextlib
+import gc
+import itertools
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+import config
+import market
+import telegram_bot
+from exchange_client import ResilientExchange
+from fakes import FakeExchange, FakeTelegramServer
+from sma_monitor import send_report, check_target_alerts, check_cross_alerts, check_trendline_alerts
+from subscriptions import ChatRegistry
+from trendlines import TrendlineRegistry
+from utils import server_time
+
+# ==========================================
+# 벤치마크 (시세 조회 / SMA / 리포트 / 알람 경로)
+# ==========================================
+# 가짜 거래소(FakeExchange)와 가짜 텔레그램 서버로 네트워크 없이 실제 코드 경로를 그대로 실행.
+# 한 틱 = 서버 시각을 기본봉 하나만큼 전진시킨 뒤 메인 루프와 같은 순서로 스냅샷 → 알람 → 리포트 수행.
+# 심볼 수 × SMA 기간 조합 × 타임프레임 조합마다 단계별 지연/할당량/처리량을 JSON으로 저장 (--compare로 커밋 간 비교)
+# --startup N: 봇 프로세스를 N번 새로 띄워 시작 메시지 / 첫 명령어 응답 / 첫 시세 리포트까지 걸린 시간 측정
+
+DEFAULT_SYMBOL_COUNTS = [4, 50, 200, 1000]
+DEFAULT_PERIOD_SETS = ['7,25,99', '5,10,20,60,120']
+DEFAULT_TIMEFRAME_SETS = ['5m', '1m,15m,1h']
+STAGES = ['take_snapshots', 'check_target_alerts', 'check_cross_alerts', 'check_trendline_alerts', 'send_report',
+          'fetch_data', 'calculate_smas', 'get_sma_info', 'tick']
+
+# 시작 시간 측정용 봇 프로세스 - bench 모듈(pandas 등)을 읽지 않도록 별도 코드로 실행.
+# 거래소는 실제와 같은 지연 생성 경로(market.create_exchange)로 가짜 거래소를 주입 (fakes가 ccxt를 임포트하므로 임포트 비용 포함)
+STARTUP_CHILD = '''
+import config
+import market
+from utils import server_time
+
+def create_fake_exchange():
+    from exchange_client import ResilientExchange
+    from fakes import FakeExchange
+    return ResilientExchange(FakeExchange(config.DEFAULT_SYMBOLS, clock=server_time), limiter=market.limiter)
+
+market.create_exchange = create_fake_exchange
+config.SEND_BATCH_WINDOW = config.SEND_MIN_INTERVAL = 0
+import sma_monitor
+sma_monitor.monitor()
+'''
+# 측정 지점 -> 가짜 텔레그램 서버가 받은 메시지에서 찾을 문구
+STARTUP_MARKS = {'start_message': "모니터링 시스템 가동", 'first_command': "명령어 가이드", 'first_report': "수동 현황 보고"}
+
+def make_symbols(count):
+    """기본 심볼 + 합성 심볼 ('S0004/USDT' ...) count개"""
+    symbols = config.DEFAULT_SYMBOLS[:count]
+    symbols += [f"S{i:04d}/{config.QUOTE_ASSET}" for i in range(len(symbols), count)]
+    return symbols
+
+def reset_state(symbols, periods, timeframes, n_chats):
+    """시장/채팅방/추세선 상태를 비우고 벤치마크용 채팅방 구성"""
+    with market.store_lock:
+        for registry in (market.candle_store, market.sma_states, market.resamplers,
+                         market.persisted_ts, market.fetch_latency):
+            registry.clear()
+    config.SMA_PERIODS = list(periods)
+    config.chats = ChatRegistry(symbols, timeframes[0], config.DEFAULT_INTERVAL_SECONDS, periods)
+    config.active_trendlines = TrendlineRegistry()
+
+    # 채팅방마다 서로 다른 타겟 배열 (기간 순열을 돌아가며 배정) + 공통 EMA/WMA 크로스 - 모두 같은 심볼/타임프레임 감시
+    targets = [">".join(map(str, order)) for order in itertools.islice(itertools.permutations(periods), n_chats)]
+    for i in range(n_chats):
+        chat = config.chats.get_or_create(f"bench-{i}")
+        chat.extra_timeframes = list(timeframes[1:])
+        chat.target_alignment = targets[i % len(targets)]
+        chat.crosses = [[f"ema{periods[0]}", f"sma{periods[1]}"], [f"wma{periods[0]}", f"sma{periods[-1]}"]]
+        config.chats.update(chat, reset_alerts=True)
+
+def add_trendlines(snapshot, n_chats):
+    """심볼마다 현재 종가 ±1% 수평 추세선 하나씩 (상/하 번갈아, 채팅방 돌아가며 소유)"""
+    now = server_time()
+    for i, symbol in enumerate(snapshot.symbols):
+        if not snapshot.has(symbol):
+            continue
+        direction = 'up' if i % 2 == 0 else 'down'
+        level = snapshot.close(symbol) * (1.01 if direction == 'up' else 0.99)
+        config.active_trendlines.add(symbol, now - 3600, level, now, level, direction, snapshot.timeframe,
+                                     chat_id=f"bench-{i % n_chats}")
+
+def advance_clock(start, tick):
+    """서버 시각을 start + tick번째 기본봉 마감 직후로 이동 (config.clock_offset 조정)"""
+    base_s = market.timeframe_ms(config.BASE_TIMEFRAME) / 1000
+    config.clock_offset = start + tick * base_s + config.CANDLE_SETTLE_SECONDS - time.time()
+
+def run_tick(symbols, timeframes, timings):
+    """메인 루프 한 틱과 같은 순서로 각 단계를 실행하며 단계별 소요 시간(초)을 timings에 기록"""
+    def timed(stage, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+        return result
+
+    started = time.perf_counter()
+    snapshots = timed('take_snapshots', market.take_snapshots, symbols, timeframes)
+    for timeframe in timeframes:
+        timed('check_target_alerts', check_target_alerts, snapshots[timeframe])
+        timed('check_cross_alerts', check_cross_alerts, snapshots[timeframe])
+        timed('check_trendline_alerts', check_trendline_alerts, snapshots[timeframe])
+    for chat in config.chats:
+        timed('send_report', send_report, chat, snapshots)
+    timings['tick'] = time.perf_counter() - started
+
+    # 예전 DataFrame 경로 (심볼별 조회 → pandas rolling → 포맷) - 틱 시간과 별도 집계
+    # 리샘플링된 상위 봉 저장소를 건드리지 않도록 기본봉 기준으로 실행
+    for symbol in symbols:
+        df = timed('fetch_data', market.fetch_data, symbol, config.BASE_TIMEFRAME)
+        if df is not None:
+            timed('get_sma_info', market.get_sma_info, timed('calculate_smas', market.calculate_smas, df))
+    return snapshots
+
+def measure_allocations(symbols, timeframes):
+    """tracemalloc으로 한 틱의 단계별 최대/순 할당량 (KiB) 측정 - 시간 측정과 분리된 별도 틱"""
+    allocations = {}
+    tracemalloc.start()
+    try:
+        def traced(stage, func, *args):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            result = func(*args)
+            after, peak = tracemalloc.get_traced_memory()
+            entry = allocations.setdefault(stage, {'peak_kib': 0.0, 'net_kib': 0.0})
+            entry['peak_kib'] = max(entry['peak_kib'], (peak - before) / 1024)
+            entry['net_kib'] += (after - before) / 1024
+            return result
+
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        snapshots = traced('take_snapshots', market.take_snapshots, symbols, timeframes)
+        for timeframe in timeframes:
+            traced('check_target_alerts', check_target_alerts, snapshots[timeframe])
+            traced('check_cross_alerts', check_cross_alerts, snapshots[timeframe])
+            traced('check_trendline_alerts', check_trendline_alerts, snapshots[timeframe])
+        for chat in config.chats:
+            traced('send_report', send_report, chat, snapshots)
+        after, peak = tracemalloc.get_traced_memory()
+        allocations['tick'] = {'peak_kib': (peak - before) / 1024, 'net_kib': (after - before) / 1024}
+
+        symbol = symbols[0]
+        df = traced('fetch_data', market.fetch_data, symbol, config.BASE_TIMEFRAME)
+        if df is not None:
+            traced('get_sma_info', market.get_sma_info, traced('calculate_smas', market.calculate_smas, df))
+    finally:
+        tracemalloc.stop()
+    return {stage: {k: round(v, 1) for k, v in entry.items()} for stage, entry in allocations.items()}
+
+def summarize(samples):
+    """틱별 소요 시간(초) -> 밀리초 통계"""
+    ms = np.array(samples) * 1000
+    return {'mean_ms': round(float(ms.mean()), 3), 'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3), 'max_ms': round(float(ms.max()), 3)}
+
+def run_scenario(exchange, outbox_server, n_symbols, periods, timeframes, ticks, n_chats, alloc):
+    symbols = make_symbols(n_symbols)
+    exchange.symbols = symbols
+    reset_state(symbols, periods, timeframes, n_chats)
+    gc.collect()
+
+    start = math.ceil(time.time() / 60) * 60
+    advance_clock(start, 0)
+    calls, rows, faults, sent = exchange.calls, exchange.rows, exchange.faults, len(outbox_server.messages)
+
+    # 첫 틱: 캔들 전체 조회 + 상위 타임프레임 리샘플러 시드
+    started = time.perf_counter()
+    snapshots = market.take_snapshots(symbols, timeframes)
+    cold_start = time.perf_counter() - started
+    add_trendlines(snapshots[timeframes[0]], n_chats)
+    trendlines = len(config.active_trendlines)
+
+    samples = {}
+    for tick in range(1, ticks + 1):
+        advance_clock(start, tick)
+        timings = {}
+        run_tick(symbols, timeframes, timings)
+        for stage, elapsed in timings.items():
+            samples.setdefault(stage, []).append(elapsed)
+
+    allocations = {}
+    if alloc:
+        telegram_bot.flush_messages(timeout=60)
+        advance_clock(start, ticks + 1)
+        allocations = measure_allocations(symbols, timeframes)
+    telegram_bot.flush_messages(timeout=60)
+
+    tick_mean = float(np.mean(samples['tick']))
+    stages = {}
+    for stage in STAGES:
+        if stage in samples:
+            stages[stage] = summarize(samples[stage])
+            if stage in allocations:
+                stages[stage]['alloc'] = allocations[stage]
+    return {
+        'symbols': n_symbols, 'periods': list(periods), 'timeframes': list(timeframes), 'chats': n_chats,
+        'ticks': ticks, 'cold_start_ms': round(cold_start * 1000, 3),
+        'throughput': {
+            'ticks_per_s': round(1 / tick_mean, 2),
+            'symbol_timeframes_per_s': round(n_symbols * len(timeframes) / tick_mean, 1),
+        },
+        'exchange': {'calls': exchange.calls - calls, 'rows': exchange.rows - rows, 'faults': exchange.faults - faults},
+        'alerts': {'trendlines_set': trendlines, 'trendlines_fired': trendlines - len(config.active_trendlines)},
+        'telegram_messages': len(outbox_server.messages) - sent,
+        'stages': stages,
+    }
+
+def scenario_key(result):
+    return f"{result['symbols']} sym | SMA {','.join(map(str, result['periods']))} | {','.join(result['timeframes'])}"
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(results, baseline_file, threshold):
+    """기준 결과 파일과 단계별 p50 비교 - threshold배 이상 느려진 항목 목록 반환"""
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = {scenario_key(r): r for r in json.load(f)['scenarios']}
+    regressions = []
+    print(f"\n🔍 기준 결과 비교 ({baseline_file}, 허용 {threshold:.2f}배)")
+    for result in results:
+        old = baseline.get(scenario_key(result))
+        if old is None:
+            continue
+        for stage, stats in result['stages'].items():
+            before = old['stages'].get(stage, {}).get('p50_ms')
+            if not before:
+                continue
+            ratio = stats['p50_ms'] / before
+            mark = "❌" if ratio >= threshold else "✅"
+            print(f"{mark} {scenario_key(result)} | {stage}: {before:.2f}ms → {stats['p50_ms']:.2f}ms ({ratio:.2f}x)")
+            if ratio >= threshold:
+                regressions.append((scenario_key(result), stage, ratio))
+    return regressions
+
+def startup_once(server, workdir, env, timeout):
+    """봇 프로세스 한 번 실행 - 프로세스 시작부터 측정 지점별 메시지 수신까지 걸린 시간 (ms, 실패 시 None)"""
+    with server.lock:
+        server.updates.clear()
+        server.messages.clear()
+    # 프로세스를 띄우기 전에 보낸 명령어 (help: 명령어 수신/처리, now: 거래소 조회 포함 첫 리포트)
+    server.push_command('bench-0', 'help')
+    server.push_command('bench-0', 'now')
+
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', STARTUP_CHILD], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    marks = {}
+    try:
+        while len(marks) < len(STARTUP_MARKS) and time.perf_counter() - started < timeout and proc.poll() is None:
+            with server.lock:
+                texts = [text for _, text in server.messages]
+            for name, marker in STARTUP_MARKS.items():
+                if name not in marks and any(marker in text for text in texts):
+                    marks[name] = round((time.perf_counter() - started) * 1000, 1)
+            time.sleep(0.001)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {name: marks.get(name) for name in STARTUP_MARKS}
+
+def run_startup(runs, timeout=30):
+    """시작 시간 측정 - 첫 실행은 마켓 목록/캔들 캐시가 없는 상태, 이후는 같은 작업 디렉터리의 캐시를 재사용"""
+    server = FakeTelegramServer().start()
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [repo, os.environ.get('PYTHONPATH')])),
+           'TELEGRAM_API_URL': server.url, 'TELEGRAM_BOT_TOKEN': 'bench', 'TELEGRAM_CHAT_ID': 'bench-0',
+           'METRICS_PORT': '0', 'DATA_SOURCE': 'rest'}
+    runs_out = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for i in range(runs):
+                sample = startup_once(server, workdir, env, timeout)
+                sample['cached'] = i > 0
+                runs_out.append(sample)
+                print(f"🚀 시작 #{i + 1}{' (캐시)' if i else ' (캐시 없음)'} | " +
+                      " / ".join(f"{name} {ms}ms" for name, ms in sample.items() if name != 'cached'), flush=True)
+    finally:
+        server.stop()
+
+    warm = [r for r in runs_out if r['cached']] or runs_out
+    medians = {name: statistics.median(r[name] for r in warm if r[name] is not None)
+               for name in STARTUP_MARKS if any(r[name] is not None for r in warm)}
+    return {'runs': runs_out, 'p50_ms': medians}
+
+def compare_startup(startup, baseline_file, threshold):
+    """기준 결과 파일과 시작 시간 p50 비교 - threshold배 이상 느려진 측정 지점 목록 반환"""
+    with open(baseline_file, encoding='utf-8') as f:
+        baseline = json.load(f).get('startup', {}).get('p50_ms', {})
+    regressions = []
+    print(f"\n🔍 기준 결과 비교 ({baseline_file}, 허용 {threshold:.2f}배)")
+    for name, after in startup['p50_ms'].items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        ratio = after / before
+        mark = "❌" if ratio >= threshold else "✅"
+        print(f"{mark} 시작 | {name}: {before:.1f}ms → {after:.1f}ms ({ratio:.2f}x)")
+        if ratio >= threshold:
+            regressions.append(('startup', name, ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="시세/알람 경로 벤치마크 (가짜 거래소 + 가짜 텔레그램, 네트워크 불필요)")
+    parser.add_argument('--symbols', nargs='+', type=int, default=DEFAULT_SYMBOL_COUNTS, help="심볼 수 목록")
+    parser.add_argument('--periods', nargs='+', default=DEFAULT_PERIOD_SETS, help="SMA 기간 조합 (예: 7,25,99)")
+    parser.add_argument('--timeframes', nargs='+', default=DEFAULT_TIMEFRAME_SETS,
+                        help="타임프레임 조합 (예: 1m,15m,1h - 첫 번째가 기본 타임프레임)")
+    parser.add_argument('--ticks', type=int, default=20, help="시나리오별 측정 틱 수")
+    parser.add_argument('--chats', type=int, default=10, help="채팅방 수 (모두 전체 심볼 감시, 타겟 배열은 서로 다르게)")
+    parser.add_argument('--latency', type=float, default=0.0, help="가짜 거래소 요청당 지연 (초)")
+    parser.add_argument('--fault-rate', type=float, default=0.0, help="가짜 거래소 요청 실패 확률 (재시도 비용 측정)")
+    parser.add_argument('--no-alloc', action='store_true', help="tracemalloc 할당량 측정 생략")
+    parser.add_argument('--output', default='bench_results.json', help="결과 JSON 경로")
+    parser.add_argument('--compare', help="비교할 기준 결과 JSON (느려진 단계가 있으면 종료 코드 1)")
+    parser.add_argument('--threshold', type=float, default=1.25, help="회귀로 판단할 p50 배율")
+    parser.add_argument('--startup', type=int, default=0, metavar='N',
+                        help="시세 경로 대신 봇 시작 시간만 N회 측정 (시작 메시지 / 첫 명령어 응답 / 첫 리포트)")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        startup = run_startup(args.startup)
+        report = {
+            'meta': {
+                'revision': git_revision(), 'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+                'args': vars(args),
+            },
+            'startup': startup,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.output}")
+        if args.compare and compare_startup(startup, args.compare, args.threshold):
+            sys.exit(1)
+        return
+
+    period_sets = [[int(p) for p in spec.split(',')] for spec in args.periods]
+    for periods in period_sets:
+        if max(periods) > config.CANDLE_LIMIT:
+            parser.error(f"SMA 기간은 CANDLE_LIMIT({config.CANDLE_LIMIT}) 이하여야 합니다: {periods}")
+    timeframe_sets = [spec.split(',') for spec in args.timeframes]
+    for timeframes in timeframe_sets:
+        unknown = [tf for tf in timeframes if tf not in config.SUPPORTED_TIMEFRAME]
+        if unknown:
+            parser.error(f"지원하지 않는 타임프레임: {', '.join(unknown)}")
+
+    # 네트워크 대신 가짜 서버 사용 (요청 한도 대기 없음, 채팅방별 전송 간격 없음)
+    # 거래소는 운영과 같은 재시도/회로 차단 래퍼를 거침 (요청 한도 오류도 대기 없이 바로 실패 처리)
+    exchange = FakeExchange(clock=server_time, latency=args.latency, fault_rate=args.fault_rate)
+    outbox_server = FakeTelegramServer().start()
+    market.limiter = market.WeightLimiter(10 ** 9)
+    market.exchange = ResilientExchange(
+        exchange, limiter=market.limiter, retries=config.EXCHANGE_RETRIES, base_delay=config.EXCHANGE_BACKOFF[0],
+        max_delay=config.EXCHANGE_BACKOFF[1], breaker_threshold=config.EXCHANGE_BREAKER_THRESHOLD,
+        breaker_timeout=config.EXCHANGE_BREAKER_TIMEOUT, rate_limit_cooldown=0)
+    config.TOKEN, config.CHAT_ID = 'bench', 'bench-0'
+    config.TELEGRAM_API_URL = outbox_server.url
+    config.SEND_MIN_INTERVAL = 0
+
+    results = []
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+    try:
+        for n_symbols, periods, timeframes in itertools.product(args.symbols, period_sets, timeframe_sets):
+            # 봇의 진행 로그는 숨기고 시나리오 요약만 출력
+            with contextlib.redirect_stdout(devnull):
+                result = run_scenario(exchange, outbox_server, n_symbols, periods, timeframes,
+                                      args.ticks, args.chats, not args.no_alloc)
+            results.append(result)
+            stages = result['stages']
+            print(f"⏱️ {scenario_key(result)} | 틱 p50 {stages['tick']['p50_ms']:.2f}ms "
+                  f"(스냅샷 {stages['take_snapshots']['p50_ms']:.2f}ms, 리포트 {stages['send_report']['p50_ms']:.2f}ms, "
+                  f"DataFrame 경로 {stages['fetch_data']['p50_ms'] + stages['calculate_smas']['p50_ms'] + stages['get_sma_info']['p50_ms']:.2f}ms) "
+                  f"| {result['throughput']['symbol_timeframes_per_s']:,.0f} 심볼·TF/s", flush=True)
+    finally:
+        devnull.close()
+        outbox_server.stop()
+
+    report = {
+        'meta': {
+            'revision': git_revision(), 'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(), 'fetch_workers': config.FETCH_WORKERS,
+            'candle_limit': config.CANDLE_LIMIT, 'args': vars(args),
+        },
+        'scenarios': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 결과 저장: {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,62 @@
 import os
 from dotenv import load_dotenv
-from datetime import datetime
+from trendlines import TrendlineRegistry
+from subscriptions import ChatRegistry
+from scanner import alignment_map
 
 # ==========================================
 # 1. 환경 변수 로드
 # ==========================================
 load_dotenv()
 TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')  # 관리자 채팅방 (시작 시 자동 등록)
+# 명령어를 받을 채팅방 (쉼표 구분, '*'이면 모든 채팅방) - 관리자 채팅방은 항상 허용
+ALLOWED_CHAT_IDS = [c.strip() for c in os.getenv('ALLOWED_CHAT_IDS', '').split(',') if c.strip()]
+DATA_SOURCE = os.getenv('DATA_SOURCE', 'rest')  # 'rest' (REST 폴링) 또는 'stream' (웹소켓)
+STREAM_URL = os.getenv('BINANCE_STREAM_URL', 'wss://fstream.binance.com/stream')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')  # 가짜 서버로 바꿔 오프라인 실행 가능
+# Prometheus 형식 계측 엔드포인트 (http://METRICS_HOST:METRICS_PORT/metrics, 포트 0이면 끔)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
 
 # ==========================================
 # 2. 고정 설정 (Constants)
 # ==========================================
-SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'XRP/USDT', 'SOL/USDT']
-SMA_PERIODS = [7, 25, 99]
+QUOTE_ASSET = 'USDT'  # 감시 대상은 USDT 무기한 선물
+DEFAULT_SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'XRP/USDT', 'SOL/USDT']  # 새 채팅방의 기본 감시 심볼
+DEFAULT_TIMEFRAME = '5m'         # 새 채팅방의 기본 타임프레임
+DEFAULT_INTERVAL_SECONDS = 60    # 새 채팅방의 정기 리포트 간격 (60초 = 1분)
+SMA_PERIODS = sorted(int(p) for p in os.getenv('SMA_PERIODS', '7,25,99').split(','))  # 배열 알람 기준 SMA 기간
+BASE_TIMEFRAME = '1m'  # 모든 타임프레임이 공유하는 기본봉 (상위 봉은 로컬 리샘플링)
 SUPPORTED_TIMEFRAME = ['1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d']
 LOCK_FILE = "sma_monitor.lock"
+STORE_FILE = os.getenv('STORE_FILE', 'sma_monitor.db')  # 캔들/설정 상태 저장소 (SQLite)
+HISTORY_FILE = "history.db"  # 백테스트용 과거 캔들 저장소 (SQLite, 실시간 저장소와 분리)
+HISTORY_PAGE_LIMIT = 1500    # 과거 캔들 페이지당 요청 개수 (바이낸스 선물 최대)
+MARKETS_CACHE_FILE = "markets_cache.json"  # 거래소 마켓 목록 캐시
+MARKETS_CACHE_TTL = 86400  # 마켓 목록 캐시 유효 시간 (초)
+MAX_SYMBOLS = 200   # 전체 채팅방 합산 감시 심볼 최대 개수 (스트림 연결 하나당 구독 한도)
+CANDLE_LIMIT = 150  # 심볼/타임프레임별로 메모리에 보관할 최대 캔들 수
+FETCH_WORKERS = 8   # 동시 조회 스레드 수
+REQUEST_WEIGHT_PER_MINUTE = 1200  # 바이낸스 선물 IP 한도(2400/분)의 절반만 사용
+EXCHANGE_TIMEOUT_MS = 10000       # 거래소 요청 타임아웃 (ms)
+EXCHANGE_RETRIES = 2              # 일시적 오류(네트워크/점검) 즉시 재시도 횟수 - 길게 막히면 메인 루프 재시도 타이머가 이어받음
+EXCHANGE_BACKOFF = (0.25, 2.0)    # 즉시 재시도 대기 (기본, 최대) 초 - 지수 증가 + 지터
+EXCHANGE_BREAKER_THRESHOLD = 5    # 엔드포인트별 연속 실패 시 회로 열림
+EXCHANGE_BREAKER_TIMEOUT = 30     # 회로가 열린 뒤 다시 시험하기까지 (초)
+RATE_LIMIT_COOLDOWN = 10          # 요청 한도 초과 응답 시 모든 조회를 멈추는 시간 (초)
+MISSED_CLOSE_LIMIT = 60           # 조회 실패로 놓친 마감 봉을 캐시로 재평가하는 최대 봉 수
+MISSED_RETRY_MAX_DELAY = 60       # 조회 실패 심볼 재시도 간격 상한 (초) - RETRY_DELAY부터 지수 증가
+TELEGRAM_MAX_LENGTH = 4096  # 텔레그램 메시지 최대 길이
+SEND_BATCH_WINDOW = 0.3   # 같은 틱 메시지를 모으는 시간 (초)
+SEND_MIN_INTERVAL = 1.0   # 채팅방별 최소 전송 간격 (초)
+SEND_MAX_RETRIES = 5      # 전송 재시도 횟수 (429/네트워크 오류)
+POLL_TIMEOUT = 25         # 텔레그램 롱폴링 대기 시간 (초) - 전용 스레드에서 수행
+STREAM_RECV_TIMEOUT = 5    # 스트림 수신 대기 시간 (초) - 종료/구독 변경 확인 주기
+STREAM_CLOSE_GRACE = 0.5   # 첫 마감 이벤트 후 나머지 심볼 마감을 기다리는 시간 (초)
+CANDLE_SETTLE_SECONDS = 0.1  # 봉 마감 후 거래소 집계 반영 대기 (초) - 서버 시각 기준
+CLOCK_SYNC_INTERVAL = 3600   # 거래소 서버 시각 재측정 주기 (초)
+RETRY_DELAY = 5              # 처리 중 오류가 난 이벤트 재시도 간격 (초)
 
 # 타임프레임별 분 단위 변환
 TIMEFRAME_MINUTES = {
@@ -23,28 +64,19 @@ TIMEFRAME_MINUTES = {
     '1h': 60, '2h': 120, '4h': 240, '6h': 360, '8h': 480, '12h': 720, '1d': 1440
 }
 
-# 번호별 배열 매핑
-ALIGNMENT_MAP = {
-    '1': '7>25>99',
-    '2': '25>7>99',
-    '3': '25>99>7',
-    '4': '99>25>7',
-    '5': '99>7>25',
-    '6': '7>99>25'
-}
+# 번호별 배열 매핑 (설정된 기간의 모든 순열 - 1번이 정배열, 기간 3개면 4번이 역배열)
+ALIGNMENT_MAP = alignment_map(SMA_PERIODS)
 
 # ==========================================
 # 3. 글로벌 상태 변수 (Global State)
 # ==========================================
-# 모듈을 임포트해서 config.TIMEFRAME 형태로 접근 및 수정
-TIMEFRAME = '5m'
-INTERVAL_SECONDS = 60  # 정기 리포트 간격 (60초 = 1분)
-is_report_enabled = True      # 정기 리포트 활성화 여부
-target_alignment = None       # 알림을 받을 타겟 배열 (예: '7>25>99')
-alert_sent_state = {symbol: False for symbol in SYMBOLS} # 코인별 알림 중복 방지
-next_alert_time = None        # 다음 알람 체크 시각 (UTC)
-active_trendlines = {}        # 코인별 설정된 추세선 좌표 저장
+# 모듈을 임포트해서 config.chats 형태로 접근 및 수정
+# 채팅방별 설정 (심볼, 타임프레임, 리포트, 타겟 배열) - 시세/SMA는 합집합으로 한 번만 계산
+chats = ChatRegistry(DEFAULT_SYMBOLS, DEFAULT_TIMEFRAME, DEFAULT_INTERVAL_SECONDS, SMA_PERIODS)
+next_alert_times = {}         # 타임프레임별 다음 알람 체크 시각 (UTC, 서버 시각 기준)
+clock_offset = 0.0            # 거래소 서버 시각 - 로컬 시각 (초)
+missed_closes = {}            # 타임프레임 -> {심볼: 조회 실패 전 마지막으로 평가한 마감 봉 시각} (재시도/복구 시 재평가)
+active_trendlines = TrendlineRegistry()  # 전체 채팅방의 추세선 (번호로 관리, 추세선마다 소유 채팅방 기록)
 
 last_update_id = 0
-last_report_time = datetime.min
 get_updates_call_count = 0
@@ -0,0 +1,157 @@
+import threading
+import time
+import ccxt
+from requests.adapters import HTTPAdapter
+import metrics
+from utils import backoff_delay
+
+# ==========================================
+# 거래소 클라이언트 복원력 계층 (재시도 / 백오프 / 서킷 브레이커)
+# ==========================================
+# 네트워크 오류·점검만 짧게 재시도하고, 잘못된 심볼 같은 요청 오류는 바로 호출자에게 넘김.
+# 요청 한도(429/418)는 재시도하지 않고 리미터를 멈춰 모든 조회를 쉬게 함 (놓친 봉은 메인 루프가 나중에 재평가).
+# 엔드포인트별로 연속 실패가 쌓이면 회로를 열어 일정 시간 요청을 보내지 않음 (장애 중 거래소를 두드리지 않도록)
+
+# 재시도할 오류 (ccxt.NetworkError 하위: RequestTimeout, ExchangeNotAvailable, DDoSProtection, RateLimitExceeded ...)
+RETRYABLE_ERRORS = (ccxt.NetworkError,)
+RATE_LIMIT_ERRORS = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+
+class CircuitOpenError(ccxt.ExchangeNotAvailable):
+    """회로가 열려 있어 요청을 보내지 않음 (ccxt 오류와 같은 방식으로 처리되도록 ExchangeNotAvailable 하위)"""
+
+
+class CircuitBreaker:
+    """연속 실패 threshold회면 열림 -> reset_timeout초 뒤 요청 하나만 시험 (성공하면 닫힘, 실패하면 다시 열림)"""
+
+    def __init__(self, name, threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False  # 반열림 상태에서 시험 요청이 진행 중인지
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if self.clock() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_timeout or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                if self.opened_at is None or self.probing:
+                    print(f"🚧 거래소 {self.name} 회로 열림 ({self.failures}회 연속 실패, {self.reset_timeout}초 대기)", flush=True)
+                self.opened_at = self.clock()
+                self.probing = False
+
+    def retry_after(self):
+        """회로가 다시 시험 가능해질 때까지 남은 초 (닫혀 있으면 0)"""
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.reset_timeout - self.clock())
+
+
+class ResilientExchange:
+    """ccxt 거래소 객체 래퍼 - fetch_ohlcv / fetch_time / load_markets를 재시도·서킷 브레이커로 감쌈
+
+    나머지 속성은 원래 거래소 객체로 위임하므로 market.exchange 자리에 그대로 사용
+    limiter: 요청 한도 초과 응답을 받으면 limiter.pause()로 모든 요청을 잠시 멈춤
+    """
+
+    ENDPOINTS = ('fetch_ohlcv', 'fetch_time', 'load_markets')
+
+    def __init__(self, exchange, limiter=None, retries=3, base_delay=0.5, max_delay=8.0,
+                 breaker_threshold=5, breaker_timeout=30, rate_limit_cooldown=10.0, pool_size=None, sleep=time.sleep):
+        self.exchange = exchange
+        self.limiter = limiter
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.sleep = sleep
+        self.breakers = {name: CircuitBreaker(name, breaker_threshold, breaker_timeout) for name in self.ENDPOINTS}
+        if pool_size:
+            tune_session(exchange, pool_size)
+
+    def __getattr__(self, name):
+        return getattr(self.exchange, name)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        return self._call('fetch_ohlcv', symbol, self.exchange.fetch_ohlcv, symbol, timeframe=timeframe,
+                          since=since, limit=limit)
+
+    def fetch_time(self):
+        return self._call('fetch_time', '', self.exchange.fetch_time)
+
+    def load_markets(self):
+        return self._call('load_markets', '', self.exchange.load_markets)
+
+    def is_available(self, endpoint='fetch_ohlcv'):
+        return self.breakers[endpoint].state != 'open'
+
+    def retry_after(self, endpoint='fetch_ohlcv'):
+        """엔드포인트 회로가 다시 시험 가능해질 때까지 남은 초 (닫혀 있으면 0)"""
+        return self.breakers[endpoint].retry_after()
+
+    def open_circuits(self):
+        return sum(breaker.state != 'closed' for breaker in self.breakers.values())
+
+    def _call(self, endpoint, symbol, func, *args, **kwargs):
+        breaker = self.breakers[endpoint]
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(f"{endpoint} circuit open ({breaker.retry_after():.0f}s)")
+            try:
+                result = func(*args, **kwargs)
+            except RATE_LIMIT_ERRORS:
+                # 요청 한도 초과: 이 요청뿐 아니라 모든 요청을 잠시 멈추고 바로 실패 처리
+                metrics.rate_limited.inc('exchange', symbol)
+                if self.limiter is not None:
+                    self.limiter.pause(self.rate_limit_cooldown)
+                breaker.record_success()
+                raise
+            except RETRYABLE_ERRORS:
+                breaker.record_failure()
+                if attempt == self.retries:
+                    raise
+                metrics.retries.inc(endpoint)
+                self.sleep(backoff_delay(attempt, self.base_delay, self.max_delay))
+            except Exception:
+                # 요청 자체가 잘못된 경우 (잘못된 심볼 등) - 거래소 상태와 무관하므로 회로에 반영하지 않음
+                breaker.record_success()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+
+def tune_session(exchange, pool_size):
+    """ccxt가 사용하는 requests 세션의 연결 풀을 동시 조회 스레드 수에 맞춤 (재시도는 이 계층에서만)"""
+    session = getattr(exchange, 'session', None)
+    if session is None or not hasattr(session, 'mount'):
+        return
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
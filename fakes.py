@@ -0,0 +1,406 @@
+import base64
+import hashlib
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import ccxt
+import numpy as np
+import config
+
+# ==========================================
+# 테스트/개발용 가짜 서버 (네트워크 불필요)
+# ==========================================
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def ws_frame(text):
+    """서버 -> 클라이언트 텍스트 프레임 (마스킹 없음)"""
+    payload = text.encode('utf-8')
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x81, length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x81, 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x81, 127, length)
+    return header + payload
+
+
+class FakeKlineStreamServer:
+    """바이낸스 선물 combined kline 스트림을 흉내내는 로컬 웹소켓 서버
+
+    tick초마다 clock 기준 진행 중인 봉을 보내고, clock이 다음 봉으로 넘어가면 지난 봉을 마감(x=true)으로 보냄.
+    캔들 값은 exchange(FakeExchange)와 같은 결정적 합성 파동이라 REST 보충 조회 결과와 일치함.
+    clock/exchange를 봇과 공유하면 (예: utils.server_time) 시각을 앞당겨 봉 마감을 바로 만들 수 있음.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, tick=0.2, clock=time.time, exchange=None):
+        self.tick = tick
+        self.clock = clock
+        self.exchange = exchange or FakeExchange(clock=clock)
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.connections = 0  # 누적 접속 횟수 (재연결 확인용)
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve_client(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/stream"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-stream', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.drop_connections()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def drop_connections(self):
+        """접속 중인 모든 클라이언트 연결을 끊음 (재연결/보충 테스트용)"""
+        with self.lock:
+            clients, self.clients = list(self.clients), set()
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+                sock.close()
+            except OSError:
+                pass
+
+    def _handshake(self, sock):
+        data = b""
+        while b"\r\n\r\n" not in data:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return None
+            data += chunk
+        lines = data.decode('latin-1').split("\r\n")
+        path = lines[0].split()[1]
+        headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(':') for line in lines[1:] if line)}
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode()).digest()).decode()
+        sock.sendall(("HTTP/1.1 101 Switching Protocols\r\n"
+                      "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        return parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+
+    def _serve_client(self, sock):
+        streams = self._handshake(sock)
+        if not streams:
+            return
+        with self.lock:
+            self.clients.add(sock)
+            self.connections += 1
+
+        # 스트림별 마지막으로 보낸 봉 시작 시각 (접속 시점의 진행 중인 봉부터 시작)
+        states = {}
+        for name in filter(None, streams):
+            pair, _, interval = name.partition('@kline_')
+            pair = pair.upper()
+            symbol = f"{pair[:-len(config.QUOTE_ASSET)]}/{config.QUOTE_ASSET}" if pair.endswith(config.QUOTE_ASSET) else pair
+            states[name] = {'pair': pair, 'symbol': symbol, 'interval': interval, 'open_time': None,
+                            'tf_ms': config.TIMEFRAME_MINUTES.get(interval, 5) * 60 * 1000}
+
+        try:
+            while True:
+                for name, st in states.items():
+                    for kline in self._next_klines(st):
+                        sock.sendall(ws_frame(json.dumps({'stream': name, 'data': kline})))
+                time.sleep(self.tick)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.clients.discard(sock)
+
+    def _next_klines(self, st):
+        """이번 tick에 보낼 kline - 봉이 바뀌었으면 지난 봉 마감 후 새 봉 (여러 봉을 건너뛰면 중간 봉은 보내지 않음)"""
+        now_ms = int(self.clock() * 1000)
+        current = now_ms // st['tf_ms'] * st['tf_ms']
+        klines = []
+        if st['open_time'] is not None and current > st['open_time']:
+            klines.append(self._kline(st, st['open_time'], now_ms, closed=True))
+        st['open_time'] = current
+        klines.append(self._kline(st, current, now_ms, closed=False))
+        return klines
+
+    def _kline(self, st, open_time, now_ms, closed):
+        ts, o, h, l, c, v = self.exchange.candle(st['symbol'], st['interval'], open_time)
+        return {'e': 'kline', 'E': now_ms, 's': st['pair'], 'k': {
+            't': ts, 'T': ts + st['tf_ms'] - 1, 's': st['pair'], 'i': st['interval'],
+            'o': f"{o:.4f}", 'h': f"{h:.4f}", 'l': f"{l:.4f}", 'c': f"{c:.4f}", 'v': f"{v:.3f}", 'x': closed,
+        }}
+
+
+class FakeExchange:
+    """ccxt 거래소 객체를 흉내내는 오프라인 시세 공급원 (fetch_ohlcv / fetch_time / load_markets)
+
+    1m 가격은 (심볼, 봉 시작 시각)만으로 정해지는 결정적 합성 파동이라 같은 조건이면 항상 같은 캔들을 돌려주고,
+    상위 타임프레임 봉은 그 1m 봉을 집계해 만듦 (REST 시드와 로컬 리샘플링 결과가 일치).
+    clock이 가리키는 현재 시각까지만 봉을 만들고 마지막 봉은 진행 중인 봉으로 취급.
+    market.exchange에 대입하면 봇/벤치마크가 네트워크 없이 동작함.
+
+    장애 주입: fault_rate 확률로 fault_errors 중 하나를 발생시키고, failing_symbols는 항상 실패,
+    outage(seconds)로 일정 시간 모든 요청을 실패시킴 (ResilientExchange 재시도/회로 차단 확인용)
+    """
+
+    def __init__(self, symbols=(), clock=time.time, latency=0.0, start_price=100.0, fault_rate=0.0,
+                 fault_errors=(ccxt.NetworkError, ccxt.RequestTimeout, ccxt.RateLimitExceeded), seed=0):
+        self.clock = clock
+        self.latency = latency          # 요청마다 흉내낼 네트워크 지연 (초)
+        self.start_price = start_price
+        self.symbols = list(symbols)
+        self.fault_rate = fault_rate    # 요청이 무작위로 실패할 확률
+        self.fault_errors = tuple(fault_errors)
+        self.failing_symbols = set()    # 항상 실패하는 심볼
+        self.outage_until = 0.0         # 이 시각(clock 기준)까지 모든 요청 실패
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0                  # 누적 fetch_ohlcv 호출 수
+        self.rows = 0                   # 누적 반환 봉 수
+        self.faults = 0                 # 누적 주입 오류 수
+
+    def outage(self, seconds):
+        """지금부터 seconds초 동안 거래소 점검/장애 흉내"""
+        self.outage_until = self.clock() + seconds
+
+    def _maybe_fail(self, symbol=None):
+        with self.lock:
+            if self.clock() < self.outage_until:
+                error = ccxt.ExchangeNotAvailable
+            elif symbol in self.failing_symbols:
+                error = ccxt.RequestTimeout
+            elif self.fault_rate and self.random.random() < self.fault_rate:
+                error = self.random.choice(self.fault_errors)
+            else:
+                return
+            self.faults += 1
+        raise error(f"injected fault ({symbol or 'fetch_time'})")
+
+    def load_markets(self):
+        return {symbol: {'symbol': symbol, 'base': symbol.partition('/')[0], 'quote': symbol.partition('/')[2],
+                         'swap': True, 'linear': True, 'active': True} for symbol in self.symbols}
+
+    def fetch_time(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail()
+        return int(self.clock() * 1000)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=500):
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail(symbol)
+        tf_ms = config.TIMEFRAME_MINUTES.get(timeframe, 5) * 60 * 1000
+        current = int(self.clock() * 1000) // tf_ms * tf_ms  # 진행 중인 봉 시작 시각
+        start = current - (limit - 1) * tf_ms if since is None else -(-since // tf_ms) * tf_ms
+        rows = self._bars(symbol, tf_ms, start, min(current, start + (limit - 1) * tf_ms))
+        with self.lock:
+            self.calls += 1
+            self.rows += len(rows)
+        return rows
+
+    def candle(self, symbol, timeframe, open_time):
+        """(심볼, 타임프레임, 봉 시작 시각 ms)의 캔들 - fetch_ohlcv와 같은 값 (호출 수/장애 주입에 포함되지 않음)"""
+        tf_ms = config.TIMEFRAME_MINUTES.get(timeframe, 5) * 60 * 1000
+        open_time = open_time // tf_ms * tf_ms
+        return self._bars(symbol, tf_ms, open_time, open_time)[0]
+
+    @staticmethod
+    def _seed(symbol, timeframe):
+        digest = hashlib.md5(f"{symbol}|{timeframe}".encode()).digest()
+        return int.from_bytes(digest[:4], 'big')
+
+    def _price(self, seed, i):
+        # 봉 번호 i(배열)의 가격: 주기가 다른 사인파 두 개 + 해시 잡음 - SMA 배열이 주기적으로 뒤바뀌도록
+        phase = seed % 1000
+        wave = 0.04 * np.sin((i + phase) / 40) + 0.015 * np.sin((i + phase) / 9)
+        noise = ((i * 2654435761 + seed) % 10007) / 10007 - 0.5
+        return self.start_price * (1 + (seed % 97) / 10) * (1 + wave + 0.004 * noise)
+
+    def _base_candles(self, symbol, first, last):
+        """기본봉(1m) 시작 시각 first..last 구간의 (봉 × 6) 캔들 배열"""
+        base_ms = config.TIMEFRAME_MINUTES[config.BASE_TIMEFRAME] * 60 * 1000
+        seed = self._seed(symbol, config.BASE_TIMEFRAME)
+        i = np.arange(first // base_ms - 1, last // base_ms + 1, dtype=np.int64)
+        prices = self._price(seed, i)
+        open_, close = prices[:-1], prices[1:]
+        spread = np.abs(close - open_) * 0.5 + close * 0.001
+        return np.column_stack([i[1:] * base_ms, open_, np.maximum(open_, close) + spread,
+                                np.minimum(open_, close) - spread, close, np.full(len(close), 10.0 + seed % 1000)])
+
+    def _bars(self, symbol, tf_ms, start, stop):
+        """봉 시작 시각 start..stop 구간의 캔들 목록
+
+        상위 타임프레임 봉은 같은 심볼의 1m 봉을 집계해 만들고 진행 중인 봉은 clock 시각의 1m 봉까지만 포함
+        (봇이 1m 봉을 리샘플링한 결과와 REST로 받은 상위 봉이 일치하도록)
+        """
+        base_ms = config.TIMEFRAME_MINUTES[config.BASE_TIMEFRAME] * 60 * 1000
+        last = min(stop + tf_ms - base_ms, int(self.clock() * 1000) // base_ms * base_ms)
+        if last < start:
+            return []
+        base = self._base_candles(symbol, start, last)
+        if tf_ms != base_ms:
+            buckets = base[:, 0] // tf_ms * tf_ms
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(base)] - 1
+            base = np.column_stack([buckets[starts], base[starts, 1], np.maximum.reduceat(base[:, 2], starts),
+                                    np.minimum.reduceat(base[:, 3], starts), base[ends, 4], np.add.reduceat(base[:, 5], starts)])
+        rows = base.tolist()
+        for row in rows:
+            row[0] = int(row[0])
+        return rows
+
+
+class FakeTelegramServer:
+    """텔레그램 Bot API (sendMessage / getUpdates)를 흉내내는 로컬 HTTP 서버
+
+    config.TELEGRAM_API_URL = server.url 로 지정하면 봇의 발신/수신이 이 서버로 향함.
+    받은 메시지는 messages에 쌓이고, push_command()로 넣은 명령어는 다음 getUpdates에 전달됨.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.messages = []               # (chat_id, text)
+        self.updates = []
+        self.next_update_id = 1
+        self.lock = threading.Lock()
+        self.has_updates = threading.Condition(self.lock)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                server._reply(self, server._handle(self.path, body))
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                server._reply(self, server._handle(url.path, {k: v[0] for k, v in parse_qs(url.query).items()}))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-telegram', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            self.has_updates.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def push_command(self, chat_id, text):
+        """채팅방에서 명령어를 보낸 것처럼 getUpdates 대기열에 추가"""
+        with self.lock:
+            self.updates.append({'update_id': self.next_update_id,
+                                 'message': {'chat': {'id': chat_id}, 'text': text}})
+            self.next_update_id += 1
+            self.has_updates.notify_all()
+
+    def _handle(self, path, params):
+        method = path.rsplit('/', 1)[-1]
+        with self.lock:
+            if method == 'sendMessage':
+                self.messages.append((str(params.get('chat_id')), params.get('text', '')))
+                return {'ok': True, 'result': {'message_id': len(self.messages)}}
+            if method == 'getUpdates':
+                offset = int(params.get('offset') or 0)
+                self.updates = [u for u in self.updates if u['update_id'] >= offset]
+                if not self.updates:
+                    # 롱폴링 흉내 (최대 1초만 대기해 종료가 늦어지지 않도록)
+                    self.has_updates.wait(min(float(params.get('timeout') or 0), 1.0))
+                return {'ok': True, 'result': list(self.updates)}
+        return {'ok': False, 'description': f"Not Found: {method}"}
+
+    @staticmethod
+    def _reply(handler, result):
+        data = json.dumps(result).encode('utf-8')
+        handler.send_response(200 if result.get('ok') else 404)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        handler.end_headers()
+        try:
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 롱폴링 중 클라이언트 프로세스가 종료됨
+
+
+def run_offline_bot(port):
+    """가짜 거래소 + 가짜 스트림으로 봇을 네트워크 없이 실행 (토큰이 없으면 텔레그램도 가짜 서버로, 발신 메시지는 콘솔에 출력)"""
+    import market
+    import sma_monitor
+    import utils
+    from exchange_client import ResilientExchange
+
+    exchange = FakeExchange(config.DEFAULT_SYMBOLS, clock=utils.server_time)
+    stream = FakeKlineStreamServer(port=port, clock=utils.server_time, exchange=exchange).start()
+    market.exchange = ResilientExchange(exchange, limiter=market.limiter)
+    config.DATA_SOURCE, config.STREAM_URL = 'stream', stream.url
+    print(f"🧪 가짜 거래소/kline 스트림 사용: {stream.url}")
+
+    if not config.TOKEN:
+        telegram = FakeTelegramServer().start()
+        config.TELEGRAM_API_URL, config.TOKEN = telegram.url, 'offline'
+        config.CHAT_ID = config.CHAT_ID or 'offline'
+        print(f"🧪 가짜 텔레그램 사용: {telegram.url} (채팅방 {config.CHAT_ID})")
+
+        def echo():
+            shown = 0
+            while True:
+                with telegram.lock:
+                    new = telegram.messages[shown:]
+                shown += len(new)
+                for chat_id, text in new:
+                    print(f"📨 [{chat_id}] {text}", flush=True)
+                time.sleep(0.5)
+
+        threading.Thread(target=echo, name='fake-telegram-echo', daemon=True).start()
+
+    sma_monitor.monitor()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="가짜 kline 스트림 서버 (네트워크 불필요)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--bot', action='store_true', help="가짜 거래소/스트림에 연결한 봇을 같은 프로세스에서 실행")
+    args = parser.parse_args()
+
+    if args.bot:
+        run_offline_bot(args.port)
+    else:
+        fake = FakeKlineStreamServer(port=args.port).start()
+        print(f"🧪 가짜 kline 스트림 서버 실행 중: {fake.url}")
+        print(f"   DATA_SOURCE=stream BINANCE_STREAM_URL={fake.url} python sma_monitor.py")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            fake.stop()
@@ -0,0 +1,197 @@
+import math
+
+# ==========================================
+# 증분 지표 엔진 (SMA / EMA / WMA + 크로스)
+# ==========================================
+# 지표 이름은 '종류+기간' 문자열 (예: 'sma25', 'ema9', 'wma20' - 숫자만 쓰면 SMA)
+# 모든 지표가 심볼/타임프레임별 종가 링 버퍼 하나를 공유하고, 봉 마감마다 O(1)로 갱신됨
+
+class CloseBuffer:
+    """마감된 봉의 종가 링 버퍼 (최근 size개)"""
+
+    def __init__(self, size):
+        self.size = size
+        self.buffer = [0.0] * size
+        self.count = 0  # 지금까지 반영된 마감 봉 수
+
+    def ago(self, k):
+        """k번째 최근 종가 (1 = 마지막 마감 봉)"""
+        return self.buffer[(self.count - k) % self.size]
+
+    def append(self, close):
+        self.buffer[self.count % self.size] = close
+        self.count += 1
+
+
+class SMA:
+    """단순 이동 평균 - 윈도우 합계를 누적합으로 갱신"""
+
+    def __init__(self, period):
+        self.period = period
+        self.sum = 0.0
+
+    def push(self, close, closes):
+        self.sum += close
+        if closes.count >= self.period:
+            # 윈도우에서 빠지는 가장 오래된 종가 제거 (버퍼에 새 종가를 쓰기 전에 호출됨)
+            self.sum -= closes.ago(self.period)
+
+    def value(self, closes):
+        return self.sum / self.period if closes.count >= self.period else math.nan
+
+    def provisional(self, close, closes):
+        p = self.period
+        if closes.count >= p:
+            return (self.sum - closes.ago(p) + close) / p
+        if closes.count == p - 1:
+            return (self.sum + close) / p
+        return math.nan
+
+    def resync(self, closes):
+        if closes.count >= self.period:
+            self.sum = math.fsum(closes.ago(i) for i in range(1, self.period + 1))
+
+
+class EMA:
+    """지수 이동 평균 - 처음 period개 종가의 SMA로 시작 (거래소 차트와 같은 방식)"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.sum = 0.0     # 시작값 계산용 (period개 모일 때까지)
+        self.ema = math.nan
+
+    def push(self, close, closes):
+        if closes.count >= self.period:
+            self.ema += self.alpha * (close - self.ema)
+        else:
+            self.sum += close
+            if closes.count == self.period - 1:
+                self.ema = self.sum / self.period
+
+    def value(self, closes):
+        return self.ema if closes.count >= self.period else math.nan
+
+    def provisional(self, close, closes):
+        if closes.count >= self.period:
+            return self.ema + self.alpha * (close - self.ema)
+        if closes.count == self.period - 1:
+            return (self.sum + close) / self.period
+        return math.nan
+
+    def resync(self, closes):
+        pass
+
+
+class WMA:
+    """가중 이동 평균 (최근 봉 가중치 period, 가장 오래된 봉 1) - 합계와 가중합을 함께 갱신"""
+
+    def __init__(self, period):
+        self.period = period
+        self.denom = period * (period + 1) / 2
+        self.sum = 0.0       # 윈도우 종가 합
+        self.weighted = 0.0  # 윈도우 가중합
+
+    def push(self, close, closes):
+        p = self.period
+        if closes.count >= p:
+            # 모든 가중치가 1씩 줄고 (가장 오래된 봉은 0이 되어 빠짐) 새 종가는 가중치 p
+            self.weighted += p * close - self.sum
+            self.sum += close - closes.ago(p)
+        else:
+            self.weighted += (closes.count + 1) * close
+            self.sum += close
+
+    def value(self, closes):
+        return self.weighted / self.denom if closes.count >= self.period else math.nan
+
+    def provisional(self, close, closes):
+        p = self.period
+        if closes.count >= p:
+            return (self.weighted + p * close - self.sum) / self.denom
+        if closes.count == p - 1:
+            return (self.weighted + p * close) / self.denom
+        return math.nan
+
+    def resync(self, closes):
+        p = self.period
+        if closes.count >= p:
+            self.sum = math.fsum(closes.ago(i) for i in range(1, p + 1))
+            self.weighted = math.fsum((p - i + 1) * closes.ago(i) for i in range(1, p + 1))
+
+
+# 지표 종류 -> 클래스 (새 지표는 push/value/provisional/resync를 구현해 여기에 등록)
+INDICATOR_TYPES = {'sma': SMA, 'ema': EMA, 'wma': WMA}
+
+def parse_indicator(name):
+    """'ema9' / 'SMA25' / '25' -> ('ema', 9) 형식 (지원하지 않으면 ValueError)"""
+    name = str(name).strip().lower()
+    kind = name.rstrip('0123456789') or 'sma'
+    period = name[len(kind):] if name[:len(kind)] == kind else name
+    if kind not in INDICATOR_TYPES or not period.isdigit() or int(period) < 1:
+        raise ValueError(f"지원하지 않는 지표: {name}")
+    return kind, int(period)
+
+def indicator_name(name):
+    """지표 이름 정규화 ('EMA9' -> 'ema9', '25' -> 'sma25')"""
+    kind, period = parse_indicator(name)
+    return f"{kind}{period}"
+
+def indicator_label(name):
+    """'ema9' -> 'EMA9' (메시지 표시용)"""
+    return indicator_name(name).upper()
+
+def cross_direction(previous, current, a, b):
+    """직전 봉 값 -> 이번 봉 값에서 a가 b를 상향 돌파하면 1, 하향 돌파하면 -1, 아니면 0 (값이 없으면 0)"""
+    before = previous[a] - previous[b]
+    after = current[a] - current[b]
+    if before <= 0 < after:
+        return 1
+    if before >= 0 > after:
+        return -1
+    return 0
+
+
+class IndicatorState:
+    """여러 지표를 종가 링 버퍼 하나로 O(1) 갱신 - 직전 마감 봉의 값도 보관해 크로스 판정"""
+
+    def __init__(self, names):
+        self.names = tuple(dict.fromkeys(indicator_name(n) for n in names))
+        self.series = {name: INDICATOR_TYPES[kind](period)
+                       for name, (kind, period) in ((n, parse_indicator(n)) for n in self.names)}
+        self.closes = CloseBuffer(max((s.period for s in self.series.values()), default=1))
+        self.last_timestamp = None  # 마지막으로 반영된 마감 봉 시각 (ms)
+        self.current = {name: math.nan for name in self.names}  # 마지막 마감 봉 기준 값
+        self.previous = dict(self.current)                       # 그 직전 마감 봉 기준 값
+
+    @property
+    def count(self):
+        return self.closes.count
+
+    def push(self, close, timestamp=None):
+        """봉 마감 시 종가 반영 - 모든 지표를 O(1)로 갱신"""
+        close = float(close)
+        for series in self.series.values():
+            series.push(close, self.closes)
+        self.closes.append(close)
+        self.last_timestamp = timestamp
+
+        # 부동소수점 오차 누적 방지: 버퍼가 한 바퀴 돌 때마다 합계 재계산
+        if self.closes.count % self.closes.size == 0:
+            for series in self.series.values():
+                series.resync(self.closes)
+        self.previous = self.current
+        self.current = {name: s.value(self.closes) for name, s in self.series.items()}
+
+    def values(self):
+        """마감된 봉 기준 지표 값 (데이터 부족 시 NaN)"""
+        return self.current
+
+    def provisional(self, close):
+        """진행 중인 봉의 현재 종가를 포함한 잠정 지표 값"""
+        close = float(close)
+        return {name: s.provisional(close, self.closes) for name, s in self.series.items()}
+
+    def crossed(self, a, b):
+        """마지막 마감 봉에서 a가 b를 상향 돌파하면 1, 하향 돌파하면 -1, 아니면 0 (값이 없으면 0)"""
+        return cross_direction(self.previous, self.current, a, b)
@@ -1,20 +1,479 @@
-import ccxt
-import pandas as pd
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import config
+import metrics
+import storage
+from indicators import IndicatorState
+from resampler import Resampler
+from scanner import alignment_codes
+from symbols import MarketIndex
+from utils import tracked_symbols, server_time
 
-# API 객체 초기화 (재사용)
-exchange = ccxt.binance({'options': {'defaultType': 'future'}})
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
 
-def fetch_data(symbol):
-    """바이낸스 데이터 가져오기"""
+# (심볼, 타임프레임)별 캔들 저장소 - [timestamp, open, high, low, close, volume] 리스트
+candle_store = {}
+store_lock = threading.RLock()  # 조회 스레드/스트림 스레드와 메인 루프 간 보호
+
+# (심볼, 타임프레임)별 증분 지표 상태 (배열 알람용 SMA + 크로스 알람에 쓰이는 지표)
+sma_states = {}
+
+# (심볼, 상위 타임프레임)별 리샘플러 - 기본봉(1m) 저장소에서 상위 봉을 만듦
+resamplers = {}
+
+# (심볼, 타임프레임)별 디스크에 기록한 마지막 캔들 시각
+persisted_ts = {}
+
+# 심볼별 마지막 조회 소요 시간 (초)
+fetch_latency = {}
+
+# 기초자산 -> 심볼 인덱스 (코인 이름 조회용)
+market_index = MarketIndex(config.MARKETS_CACHE_FILE, config.QUOTE_ASSET, config.MARKETS_CACHE_TTL)
+
+class WeightLimiter:
+    """바이낸스 요청 가중치(weight) 기반 토큰 버킷"""
+
+    def __init__(self, weight_per_minute):
+        self.capacity = weight_per_minute
+        self.tokens = float(weight_per_minute)
+        self.refill_rate = weight_per_minute / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight):
+        """가중치만큼 토큰이 찰 때까지 대기 후 차감 - 대기한 시간(초) 반환"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return waited
+                wait = (weight - self.tokens) / self.refill_rate
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        """요청 한도 초과 응답을 받았을 때 - 토큰을 비워 seconds초 동안 모든 요청을 멈춤"""
+        with self.lock:
+            self.tokens = min(self.tokens, -seconds * self.refill_rate)
+
+limiter = WeightLimiter(config.REQUEST_WEIGHT_PER_MINUTE)
+
+# API 객체는 처음 사용할 때 생성 (ccxt 임포트만 수백 ms라 시작 시 명령어 수신/시작 메시지를 막지 않도록)
+# market.exchange로 접근하면 아래 모듈 __getattr__이 생성 - 벤치마크/테스트는 market.exchange에 직접 대입해 교체
+exchange_lock = threading.Lock()
+fetch_pool = ThreadPoolExecutor(max_workers=config.FETCH_WORKERS, thread_name_prefix='fetch')
+
+def create_exchange():
+    """바이낸스 선물 클라이언트 생성 - 요청 간격은 위 가중치 리미터가, 일시적 오류 재시도/회로 차단은 래퍼가 관리"""
+    import ccxt
+    from exchange_client import ResilientExchange
+    return ResilientExchange(
+        ccxt.binance({'options': {'defaultType': 'future'}, 'enableRateLimit': False, 'timeout': config.EXCHANGE_TIMEOUT_MS}),
+        limiter=limiter, retries=config.EXCHANGE_RETRIES, base_delay=config.EXCHANGE_BACKOFF[0],
+        max_delay=config.EXCHANGE_BACKOFF[1], breaker_threshold=config.EXCHANGE_BREAKER_THRESHOLD,
+        breaker_timeout=config.EXCHANGE_BREAKER_TIMEOUT, rate_limit_cooldown=config.RATE_LIMIT_COOLDOWN,
+        pool_size=config.FETCH_WORKERS)
+
+def get_exchange():
+    """거래소 클라이언트 (처음 호출될 때 생성, 조회 스레드가 동시에 불러도 한 번만)"""
+    global exchange
+    ex = globals().get('exchange')
+    if ex is not None:
+        return ex
+    with exchange_lock:
+        if globals().get('exchange') is None:
+            exchange = create_exchange()
+        return exchange
+
+def __getattr__(name):
+    if name == 'exchange':
+        return get_exchange()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def klines_weight(limit):
+    """바이낸스 선물 klines 요청 가중치 (limit 구간별)"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+def timeframe_ms(timeframe):
+    """타임프레임 한 봉의 길이 (밀리초)"""
+    return config.TIMEFRAME_MINUTES.get(timeframe, 5) * 60 * 1000
+
+def merge_candles(candles, ohlcv):
+    """새로 받은 캔들을 저장소에 병합 (진행 중인 마지막 봉은 제자리에서 교체)"""
+    for row in ohlcv:
+        if candles and row[0] == candles[-1][0]:
+            candles[-1] = row
+        elif not candles or row[0] > candles[-1][0]:
+            candles.append(row)
+
+    # 오래된 봉은 잘라내어 메모리 일정 유지
+    if len(candles) > config.CANDLE_LIMIT:
+        del candles[:-config.CANDLE_LIMIT]
+    return candles
+
+def update_candles(symbol, timeframe=None):
+    """저장된 마지막 봉 이후의 캔들만 요청하여 저장소 갱신"""
+    timeframe = timeframe or config.DEFAULT_TIMEFRAME
+    key = (symbol, timeframe)
+    candles = candle_store.get(key)
+
+    # 마지막 봉(진행 중일 수 있음)부터 현재까지 받아야 할 봉 수
+    missing = config.CANDLE_LIMIT
+    if candles:
+        missing = int((server_time() * 1000 - candles[-1][0]) // timeframe_ms(timeframe)) + 1
+
+    if missing < config.CANDLE_LIMIT:
+        if limiter.acquire(klines_weight(missing + 1)):
+            metrics.rate_limited.inc('limiter', symbol)
+        ohlcv = get_exchange().fetch_ohlcv(symbol, timeframe=timeframe, since=candles[-1][0], limit=missing + 1)
+    else:
+        # 최초 조회이거나 공백이 너무 길면 전체 재조회
+        candles = []
+        if limiter.acquire(klines_weight(config.CANDLE_LIMIT)):
+            metrics.rate_limited.inc('limiter', symbol)
+        ohlcv = get_exchange().fetch_ohlcv(symbol, timeframe=timeframe, limit=config.CANDLE_LIMIT)
+
+    with store_lock:
+        # 대기 중 스트림이 먼저 채웠을 수 있으므로 최신 저장소에 병합
+        if candles:
+            candles = candle_store.get(key, candles)
+        candle_store[key] = merge_candles(candles, ohlcv)
+        return candle_store[key]
+
+def apply_kline(symbol, timeframe, candle):
+    """스트림으로 받은 캔들 한 개를 저장소에 반영"""
+    with store_lock:
+        merge_candles(candle_store.setdefault((symbol, timeframe), []), [candle])
+
+def sync_clock(samples=3):
+    """거래소 서버 시각과의 차이를 측정해 config.clock_offset에 반영 - 왕복 지연이 가장 짧은 표본 사용
+
+    반환: (왕복 지연, 보정값) 초
+    """
+    best = None
+    for _ in range(samples):
+        limiter.acquire(1)
+        sent = time.time()
+        server = get_exchange().fetch_time() / 1000
+        received = time.time()
+        if best is None or received - sent < best[0]:
+            best = (received - sent, server - (sent + received) / 2)
+    config.clock_offset = best[1]
+    return best
+
+def warm_market_index():
+    """디스크 캐시로 마켓 인덱스를 바로 구성 (거래소 접속 없음) - 반환: 캐시가 아직 유효한지 (아니면 갱신 필요)"""
+    fresh = market_index.warm()
+    market_index.seed(tracked_symbols())
+    return fresh
+
+def load_market_index():
+    """마켓 인덱스 로드 (캐시 우선) - 실패하면 감시 중인 심볼만으로 구성"""
+    try:
+        market_index.load(lambda: get_exchange().load_markets())
+    except Exception as e:
+        print(f"Error loading markets: {e}")
+    market_index.seed(tracked_symbols())
+    return len(market_index)
+
+def evict_symbol(symbol):
+    """더 이상 추적하지 않는 심볼의 캔들/SMA/리샘플러/크로스 알림 상태를 메모리와 디스크에서 제거"""
+    with store_lock:
+        for registry in (candle_store, sma_states, resamplers, persisted_ts):
+            for key in [key for key in registry if key[0] == symbol]:
+                del registry[key]
+    fetch_latency.pop(symbol, None)
+    for key in [key for key in config.chats.crossed if key[0] == symbol]:
+        del config.chats.crossed[key]
+    if storage.is_open():
+        storage.delete_candles(symbol)
+
+def restore_candles():
+    """디스크에 저장된 캔들로 저장소 복원 - 이후 조회는 끊긴 구간만 보충"""
+    loaded = storage.load_candles(config.CANDLE_LIMIT)
+    base_ms = timeframe_ms(config.BASE_TIMEFRAME)
+    with store_lock:
+        for key, candles in loaded.items():
+            candle_store[key] = candles
+            persisted_ts[key] = candles[-1][0]
+            if key[1] != config.BASE_TIMEFRAME:
+                # 상위 봉은 REST 재시드 없이 다음 구간부터 리샘플링 재개
+                resampler = Resampler(timeframe_ms(key[1]), base_ms)
+                resampler.resume(candles[-1])
+                resamplers[key] = resampler
+    return len(loaded)
+
+def persist_candles():
+    """마지막 기록 이후 새로 마감된 캔들만 디스크에 기록 - 시리즈별로 최근 CANDLE_LIMIT개 봉 구간만 남김"""
+    now_ms = server_time() * 1000
+    pending = {}
+    with store_lock:
+        for key, candles in candle_store.items():
+            last = persisted_ts.get(key, -1)
+            start = len(candles)
+            while start > 0 and candles[start - 1][0] > last:
+                start -= 1
+            rows = [list(c) for c in candles[start:] if is_closed(c, key[1], now_ms)]
+            if rows:
+                pending[key] = rows
+    for (symbol, timeframe), rows in pending.items():
+        since = rows[-1][0] - (config.CANDLE_LIMIT - 1) * timeframe_ms(timeframe)
+        storage.save_candles(symbol, timeframe, rows, since)
+        persisted_ts[(symbol, timeframe)] = rows[-1][0]
+
+def fetch_candles(symbol, timeframe=None):
+    """캔들 저장소를 갱신하고 캔들 리스트 반환 (실패 시 None)"""
     try:
-        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=config.TIMEFRAME, limit=150)
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-        return df
+        return update_candles(symbol, timeframe)
     except Exception as e:
         print(f"Error fetching data ({symbol}): {e}")
+        metrics.errors.inc('fetch', symbol)
+        return None
+
+def _timed_fetch(symbol, timeframe):
+    started = time.perf_counter()
+    candles = fetch_candles(symbol, timeframe)
+    fetch_latency[symbol] = time.perf_counter() - started
+    metrics.fetch_latency.observe(fetch_latency[symbol])
+    return candles
+
+def fetch_all(symbols, timeframe=None):
+    """여러 심볼을 동시에 조회 (심볼 -> 캔들 리스트 또는 None)"""
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    started = time.perf_counter()
+    futures = {symbol: fetch_pool.submit(_timed_fetch, symbol, timeframe) for symbol in symbols}
+    results = {symbol: future.result() for symbol, future in futures.items()}
+
+    slowest = max(symbols, key=lambda s: fetch_latency.get(s, 0))
+    print(f"⏱️ {len(symbols)}개 심볼 조회 {time.perf_counter() - started:.2f}s "
+          f"(최장 {slowest} {fetch_latency.get(slowest, 0):.2f}s)", flush=True)
+    return results
+
+class MarketSnapshot:
+    """한 틱 동안 리포트/알람이 함께 참조하는 시세 및 SMA 스냅샷
+
+    심볼 × 기간 SMA 행렬과 배열 코드를 한 번에 계산해 두고, 문자열 포맷은 필요한 심볼만 지연 생성
+    """
+
+    def __init__(self, timeframe, symbols):
+        self.timeframe = timeframe
+        self.taken_at = server_time()
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.valid = np.zeros(len(self.symbols), dtype=bool)    # 조회 성공 여부
+        self.stale = np.zeros(len(self.symbols), dtype=bool)    # 조회는 실패했지만 캐시된 캔들로 채운 심볼 (알람 평가 제외)
+        self.closes = np.full(len(self.symbols), np.nan)
+        self.smas = np.full((len(self.symbols), len(config.SMA_PERIODS)), np.nan)
+        self.codes = np.full(len(self.symbols), -1)
+        self.states = {}   # 심볼 -> 마감 봉 기준 지표 상태 (크로스 판정용)
+        self._status = {}
+
+    def has(self, symbol):
+        i = self.index.get(symbol)
+        return i is not None and bool(self.valid[i])
+
+    def is_stale(self, symbol):
+        i = self.index.get(symbol)
+        return i is not None and bool(self.stale[i])
+
+    def close(self, symbol):
+        return float(self.closes[self.index[symbol]])
+
+    def status(self, symbol):
+        """배열 상태 문자열 (처음 요청될 때만 포맷)"""
+        if symbol not in self._status:
+            row = self.smas[self.index[symbol]]
+            self._status[symbol] = format_sma_info(dict(zip(config.SMA_PERIODS, row.tolist())))[0]
+        return self._status[symbol]
+
+    def matching(self, code):
+        """배열 코드가 일치하는 심볼 목록 (벡터 비교)"""
+        return [self.symbols[i] for i in np.flatnonzero(self.valid & (self.codes == code))]
+
+    def cross(self, symbol, a, b):
+        """마지막 마감 봉에서 지표 a의 b 돌파 방향 (1 상향 / -1 하향 / 0)과 그 봉 시각"""
+        state = self.states.get(symbol)
+        if state is None or a not in state.current or b not in state.current:
+            return 0, None
+        return state.crossed(a, b), state.last_timestamp
+
+    def indicator(self, symbol, name):
+        """마지막 마감 봉 기준 지표 값"""
+        return self.states[symbol].current[name]
+
+def sync_timeframes(symbols, timeframes, refresh=True):
+    """기본봉(1m) 한 번의 조회로 모든 타임프레임 저장소를 갱신 (상위 봉은 로컬 리샘플링)
+
+    refresh=False면 조회 없이 (스트림이 갱신 중인) 기본봉 저장소를 그대로 사용.
+    상위 타임프레임의 과거 봉은 처음 한 번만 REST로 받아 시드함.
+    반환: 심볼 -> 기본봉 갱신 성공 여부
+    """
+    base = config.BASE_TIMEFRAME
+    if refresh:
+        results = fetch_all(symbols, base)
+    else:
+        with store_lock:
+            results = {symbol: candle_store.get((symbol, base)) for symbol in symbols}
+    ok = {symbol: bool(results.get(symbol)) for symbol in symbols}
+
+    now_ms = server_time() * 1000
+    for timeframe in timeframes:
+        if timeframe == base:
+            continue
+        # 리샘플러가 없거나 기본봉이 끊겨 이어지지 않으면 해당 타임프레임을 재시드
+        with store_lock:
+            stale = [s for s in symbols if ok[s] and (
+                (s, timeframe) not in resamplers or resamplers[(s, timeframe)].has_gap(candle_store[(s, base)]))]
+        if stale:
+            for symbol, candles in fetch_all(stale, timeframe).items():
+                resamplers.pop((symbol, timeframe), None)
+                if candles:
+                    resampler = Resampler(timeframe_ms(timeframe), timeframe_ms(base))
+                    resampler.seed(candles[-1], now_ms)
+                    resamplers[(symbol, timeframe)] = resampler
+
+        with store_lock:
+            for symbol in symbols:
+                resampler = resamplers.get((symbol, timeframe))
+                if ok[symbol] and resampler is not None:
+                    rows = resampler.update(candle_store[(symbol, base)], now_ms)
+                    merge_candles(candle_store.setdefault((symbol, timeframe), []), rows)
+    return ok
+
+def take_snapshots(symbols, timeframes, refresh=True):
+    """심볼별로 한 번씩만 조회하고 타임프레임별 SMA도 한 번만 계산하여 스냅샷 생성"""
+    symbols = list(dict.fromkeys(symbols))
+    ok = sync_timeframes(symbols, timeframes, refresh)
+    sma_names = [f"sma{p}" for p in config.SMA_PERIODS]
+    snapshots = {}
+    for timeframe in timeframes:
+        started = time.perf_counter()
+        snapshot = snapshots[timeframe] = MarketSnapshot(timeframe, symbols)
+        for i, symbol in enumerate(symbols):
+            with store_lock:
+                candles = candle_store.get((symbol, timeframe))
+                last = candles[-1] if candles else None
+            has_feed = timeframe == config.BASE_TIMEFRAME or (symbol, timeframe) in resamplers
+            if not (has_feed and last):
+                continue
+            # 조회에 실패한 심볼은 캐시된 캔들 값으로 리포트만 채우고 알람 평가에서는 제외 (재시도 때 평가)
+            values = get_sma_values(symbol, timeframe) if ok[symbol] else cached_sma_values(symbol, timeframe)
+            if values is None:
+                continue
+            snapshot.valid[i] = ok[symbol]
+            snapshot.stale[i] = not ok[symbol]
+            snapshot.closes[i] = last[4]
+            snapshot.smas[i] = [values[name] for name in sma_names]
+            if ok[symbol]:
+                snapshot.states[symbol] = sma_states.get((symbol, timeframe))
+        snapshot.codes = alignment_codes(snapshot.smas)
+        metrics.sma_latency.observe(time.perf_counter() - started)
+    return snapshots
+
+def replay_closed_bars(symbol, timeframe, after_ts, before_ts, limit=None):
+    """캐시된 캔들로 지표를 처음부터 다시 계산해 after_ts < 봉 시각 < before_ts 인 마감 봉 목록 반환
+
+    반환: [(봉 시각, 종가, 직전 봉 지표 값, 이 봉 지표 값)] (최근 limit개) - 놓친 봉 알람 재평가용
+    """
+    with store_lock:
+        candles = list(candle_store.get((symbol, timeframe), []))
+    now_ms = server_time() * 1000
+    state = IndicatorState(indicator_names())
+    bars = []
+    for candle in candles:
+        if candle[0] >= before_ts or not is_closed(candle, timeframe, now_ms):
+            break
+        state.push(candle[4], candle[0])
+        if candle[0] > after_ts:
+            bars.append((candle[0], candle[4], state.previous, state.current))
+    return bars[-limit:] if limit else bars
+
+def fetch_data(symbol, timeframe=None):
+    """바이낸스 데이터 가져오기 (캔들 저장소 경유)"""
+    import pandas as pd  # DataFrame 경로에서만 사용 (알람/리포트는 증분 지표 경로라 pandas를 읽지 않음)
+    candles = fetch_candles(symbol, timeframe)
+    if candles is None:
         return None
+    df = pd.DataFrame(candles, columns=OHLCV_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+def is_closed(candle, timeframe, now_ms=None):
+    """봉 마감 여부 (시작 시각 + 봉 길이가 지났는지)"""
+    if now_ms is None:
+        now_ms = server_time() * 1000
+    return candle[0] + timeframe_ms(timeframe) <= now_ms
+
+def indicator_names():
+    """계산할 지표 목록 - 배열 알람용 SMA + 채팅방 크로스 알람에 쓰이는 지표"""
+    return tuple(dict.fromkeys([*(f"sma{p}" for p in config.SMA_PERIODS), *config.chats.series_names]))
+
+def get_sma_state(symbol, timeframe=None):
+    """캔들 저장소의 마감 봉을 증분 지표 상태에 반영하여 반환"""
+    timeframe = timeframe or config.DEFAULT_TIMEFRAME
+    key = (symbol, timeframe)
+    state = sma_states.get(key)
+    names = indicator_names()
+
+    with store_lock:
+        candles = candle_store.get(key, [])
+        # 저장소가 재조회되어 이어지지 않거나 지표 구성이 바뀌면 저장된 봉으로 상태를 새로 구성
+        if state is None or state.names != names or \
+                (candles and state.last_timestamp is not None and state.last_timestamp < candles[0][0]):
+            state = sma_states[key] = IndicatorState(names)
+
+        # 아직 반영하지 않은 봉만 뒤에서부터 찾기 (보통 1~2개)
+        start = len(candles)
+        while start > 0 and (state.last_timestamp is None or candles[start - 1][0] > state.last_timestamp):
+            start -= 1
+        pending = candles[start:]
+
+    now_ms = server_time() * 1000
+    for candle in pending:
+        if not is_closed(candle, timeframe, now_ms):
+            break
+        state.push(candle[4], candle[0])
+    return state
+
+def get_sma_values(symbol, timeframe=None):
+    """현재 지표 값 ('sma25' 등 이름 -> 값) - 진행 중인 봉이 있으면 잠정값 (pandas rolling 결과의 마지막 행과 동일)"""
+    timeframe = timeframe or config.DEFAULT_TIMEFRAME
+    state = get_sma_state(symbol, timeframe)
+    with store_lock:
+        candles = candle_store.get((symbol, timeframe))
+        last = candles[-1] if candles else None
+    if last and not is_closed(last, timeframe):
+        return state.provisional(last[4])
+    return state.values()
+
+def cached_sma_values(symbol, timeframe):
+    """조회 실패 시 마지막으로 받은 캔들 기준 지표 값 (상태를 갱신하지 않음, 없으면 None)
+
+    갱신되지 않은 캔들은 받을 당시 진행 중이던 봉일 수 있으므로 마감 봉으로 반영하지 않고 잠정값으로만 계산
+    """
+    state = sma_states.get((symbol, timeframe))
+    with store_lock:
+        candles = candle_store.get((symbol, timeframe))
+        last = candles[-1] if candles else None
+    if state is None or state.names != indicator_names() or last is None:
+        return None
+    if state.last_timestamp is None or last[0] > state.last_timestamp:
+        return state.provisional(last[4])
+    return state.values()
 
 def calculate_smas(df):
     """지정된 기간의 SMA 계산"""
@@ -28,7 +487,10 @@ def get_sma_info(df):
     
     # SMA 값 가져오기
     sma_values = {p: last_row[f'SMA_{p}'] for p in config.SMA_PERIODS}
-    
+    return format_sma_info(sma_values)
+
+def format_sma_info(sma_values):
+    """SMA 값으로 배열 상태 포맷팅"""
     # 정렬하여 순서 파악 (큰 값부터 작은 값 순)
     sorted_smas = sorted(sma_values.items(), key=lambda x: x[1], reverse=True)
     raw_alignment = ">".join(str(p) for p, v in sorted_smas)
@@ -36,10 +498,11 @@ def get_sma_info(df):
     # 포맷 구성
     order_str = " > ".join(f"SMA{p}({v:,.2f})" for p, v in sorted_smas)
     
-    # 정배열/역배열 표시
-    if raw_alignment == '7>25>99':
+    # 정배열(짧은 기간이 위)/역배열 표시
+    ascending = sorted(sma_values)
+    if raw_alignment == ">".join(map(str, ascending)):
         return f"🚀 *{order_str} (정배열)*", raw_alignment
-    elif raw_alignment == '99>25>7':
+    elif raw_alignment == ">".join(map(str, reversed(ascending))):
         return f"📉 *{order_str} (역배열)*", raw_alignment
     else:
         return f"🔄 {order_str}", raw_alignment
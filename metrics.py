@@ -0,0 +1,164 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==========================================
+# 내부 계측 (히스토그램 / 카운터 / 게이지) + Prometheus 형식 노출
+# ==========================================
+# 관측은 잠금 한 번 + 이진 탐색뿐이라 운영 중에도 항상 켜 둠 (메모리는 구간/라벨 수에 비례해 고정)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 15, 30, 60)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+registry = []  # 노출 순서대로 등록된 메트릭
+
+class Histogram:
+    """고정 구간(초) 누적 히스토그램 - 관측 O(log 구간 수), 메모리 고정"""
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 마지막 칸은 +Inf
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def quantile(self, q):
+        """구간 상한 기준 근사 분위수 (관측이 없으면 None)"""
+        with self.lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for i, c in enumerate(self.counts):
+                seen += c
+                if seen >= rank:
+                    return self.buckets[i] if i < len(self.buckets) else float('inf')
+
+    def summary(self):
+        if not self.count:
+            return "기록 없음"
+        return f"p50≤{self.quantile(0.5)}s / p95≤{self.quantile(0.95)}s / 평균 {self.total / self.count:.3g}s ({self.count}건)"
+
+    def expose(self):
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.total
+        lines, seen = [], 0
+        for bound, c in zip((*self.buckets, '+Inf'), counts):
+            seen += c
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {seen}')
+        lines += [f"{self.name}_sum {total}", f"{self.name}_count {count}"]
+        return 'histogram', lines
+
+
+class Counter:
+    """라벨 조합별 누적 카운터 (예: 출처 × 심볼)"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.values = {}  # 라벨 값 튜플 -> 누적 값
+        self.lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def total(self):
+        with self.lock:
+            return sum(self.values.values())
+
+    def top(self, n=5):
+        """값이 큰 순서로 (라벨 값 튜플, 값) n개"""
+        with self.lock:
+            items = list(self.values.items())
+        return sorted(items, key=lambda item: item[1], reverse=True)[:n]
+
+    def expose(self):
+        with self.lock:
+            items = list(self.values.items())
+        return 'counter', [f"{self.name}{_labels(self.label_names, labels)} {value}" for labels, value in items]
+
+
+class Gauge:
+    """노출 시점에 함수를 호출해 값을 읽는 게이지 (큐 길이, 감시 심볼 수 등)"""
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        registry.append(self)
+
+    def expose(self):
+        try:
+            return 'gauge', [f"{self.name} {self.read()}"]
+        except Exception:
+            return 'gauge', []
+
+
+def _labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return "{" + ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values)) + "}"
+
+def render():
+    """등록된 모든 메트릭을 Prometheus 텍스트 형식으로"""
+    out = []
+    for metric in registry:
+        kind, lines = metric.expose()
+        out += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {kind}", *lines]
+    return "\n".join(out) + "\n"
+
+def start_server(host, port):
+    """/metrics HTTP 엔드포인트를 데몬 스레드로 시작 (port가 0이면 시작하지 않음)"""
+    if not port:
+        return None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+
+# 봉 마감 시각 -> 알람 발송 완료까지 걸린 시간
+alert_latency = Histogram('sma_alert_latency_seconds', "Candle close to alert delivered (server time)")
+# 심볼 하나의 거래소 캔들 조회 (요청 한도 대기 포함)
+fetch_latency = Histogram('sma_exchange_fetch_seconds', "Exchange OHLCV fetch per symbol", FAST_BUCKETS)
+# 타임프레임 하나의 스냅샷 SMA/배열 코드 계산 (조회 제외)
+sma_latency = Histogram('sma_compute_seconds', "SMA snapshot computation per timeframe", FAST_BUCKETS)
+# 메인 루프 한 틱 처리 (대기 제외)
+tick_latency = Histogram('sma_tick_seconds', "Main loop tick processing", FAST_BUCKETS)
+# 텔레그램 sendMessage 요청 한 번
+send_latency = Histogram('sma_telegram_send_seconds', "Telegram sendMessage request", FAST_BUCKETS)
+# 텔레그램 getUpdates 롱폴링 한 번 (대기 시간 포함)
+poll_latency = Histogram('sma_telegram_poll_seconds', "Telegram getUpdates long poll", DEFAULT_BUCKETS)
+
+commands = Counter('sma_telegram_commands_total', "Commands received", ['chat'])
+errors = Counter('sma_errors_total', "Errors by source and symbol", ['source', 'symbol'])
+retries = Counter('sma_exchange_retries_total', "Exchange requests retried after a transient error", ['endpoint'])
+rate_limited = Counter('sma_rate_limited_total', "Rate limit hits (exchange 429/418, local limiter waits, Telegram 429)",
+                       ['source', 'symbol'])
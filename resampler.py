@@ -0,0 +1,97 @@
+import numpy as np
+
+# ==========================================
+# 기본봉(1m) -> 상위 타임프레임 증분 리샘플링
+# ==========================================
+class Resampler:
+    """마감된 기본봉을 한 번씩만 집계하여 상위 타임프레임 캔들을 증분 생성
+
+    진행 중인 기본봉은 집계에 넣지 않고 출력할 때만 잠정적으로 합쳐서 보여줌
+    """
+
+    def __init__(self, timeframe_ms, base_ms):
+        self.timeframe_ms = timeframe_ms
+        self.base_ms = base_ms
+        self.candle = None      # 현재 구간에서 마감된 기본봉만 집계한 캔들
+        self.last_base = None   # 마지막으로 집계한 기본봉 시작 시각
+
+    def bucket(self, ts):
+        return ts // self.timeframe_ms * self.timeframe_ms
+
+    def seed(self, candle, now_ms):
+        """REST로 받은 상위 봉(진행 중)으로 시작 - 이후 지금 진행 중인 기본봉부터 집계
+
+        시드 시점의 기본봉 일부 거래량이 중복 집계될 수 있으나 시가/고가/저가/종가에는 영향 없음
+        """
+        self.candle = list(candle)
+        self.last_base = now_ms // self.base_ms * self.base_ms - self.base_ms
+
+    def resume(self, last_closed):
+        """디스크에서 복원한 마지막 마감 상위 봉 다음 구간부터 집계 재개"""
+        self.candle = None
+        self.last_base = last_closed[0] + self.timeframe_ms - self.base_ms
+
+    def has_gap(self, base_candles):
+        """기본봉 저장소가 마지막 집계 이후로 이어지지 않는지 (재시드 필요)"""
+        return bool(base_candles) and self.last_base is not None and base_candles[0][0] > self.last_base + self.base_ms
+
+    def update(self, base_candles, now_ms):
+        """새 기본봉을 반영하고 저장소에 병합할 상위 봉 목록 반환 (시간순)"""
+        start = len(base_candles)
+        while start > 0 and (self.last_base is None or base_candles[start - 1][0] > self.last_base):
+            start -= 1
+
+        rows, forming = [], None
+        for candle in base_candles[start:]:
+            if candle[0] + self.base_ms > now_ms:
+                forming = candle
+                break
+            b = self.bucket(candle[0])
+            if self.candle is None or b != self.candle[0]:
+                if self.candle is not None:
+                    rows.append(self.candle)
+                self.candle = [b, candle[1], candle[2], candle[3], candle[4], candle[5]]
+            else:
+                self._aggregate(self.candle, candle)
+            self.last_base = candle[0]
+
+        if self.candle is not None:
+            rows.append(list(self.candle))
+        if forming is not None:
+            b = self.bucket(forming[0])
+            if rows and rows[-1][0] == b:
+                self._aggregate(rows[-1], forming)
+            else:
+                rows.append([b, forming[1], forming[2], forming[3], forming[4], forming[5]])
+        return rows
+
+    @staticmethod
+    def _aggregate(target, candle):
+        target[2] = max(target[2], candle[2])
+        target[3] = min(target[3], candle[3])
+        target[4] = candle[4]
+        target[5] += candle[5]
+
+
+def resample_array(ohlcv, timeframe_ms, base_ms):
+    """기본봉 (봉 × 6) 배열을 상위 타임프레임 배열로 한 번에 집계 (백테스트용)
+
+    구간 끝까지 기본봉이 없는 마지막 구간(진행 중)은 제외
+    """
+    ohlcv = np.asarray(ohlcv, dtype=float)
+    if not len(ohlcv):
+        return ohlcv.reshape(0, 6)
+    buckets = ohlcv[:, 0] // timeframe_ms * timeframe_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ohlcv)] - 1
+    out = np.column_stack([
+        buckets[starts],
+        ohlcv[starts, 1],
+        np.maximum.reduceat(ohlcv[:, 2], starts),
+        np.minimum.reduceat(ohlcv[:, 3], starts),
+        ohlcv[ends, 4],
+        np.add.reduceat(ohlcv[:, 5], starts),
+    ])
+    if ohlcv[-1, 0] + base_ms < buckets[-1] + timeframe_ms:
+        out = out[:-1]
+    return out
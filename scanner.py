@@ -0,0 +1,66 @@
+import numpy as np
+
+# ==========================================
+# 다중 심볼 SMA 배열 일괄 스캐너 (NumPy)
+# ==========================================
+# 배열 코드: SMA 값이 큰 순서대로 나열한 기간 인덱스 순열을 n진수 정수로 표현
+# (예: 기간 [7, 25, 99]에서 '7>25>99' -> 인덱스 (0, 1, 2) -> 0*9 + 1*3 + 2 = 5)
+# 데이터 부족(NaN)인 심볼의 코드는 -1
+
+def alignment_codes(smas):
+    """(심볼 × 기간) SMA 행렬 -> 심볼별 배열 코드 (argsort, 값이 같으면 기간 순서 유지)"""
+    smas = np.asarray(smas, dtype=float)
+    n = smas.shape[1]
+    order = np.argsort(-smas, axis=1, kind='stable')
+    codes = order @ (n ** np.arange(n - 1, -1, -1))
+    codes[np.isnan(smas).any(axis=1)] = -1
+    return codes
+
+def alignment_code(alignment, periods):
+    """'7>25>99' 형식 문자열 -> 배열 코드"""
+    periods = list(periods)
+    n = len(periods)
+    order = [periods.index(int(p)) for p in alignment.split('>')]
+    return sum(idx * n ** (n - 1 - i) for i, idx in enumerate(order))
+
+def _adjacent_swaps(n):
+    """0..n-1의 모든 순열을 인접한 두 원소만 바꾸며 나열 (Steinhaus–Johnson–Trotter)"""
+    perm = list(range(n))
+    direction = [-1] * n  # 원소별 이동 방향 (-1: 왼쪽)
+    yield tuple(perm)
+    while True:
+        # 이동 가능한(옆 원소보다 큰) 가장 큰 원소
+        mobile, pos = -1, -1
+        for i, value in enumerate(perm):
+            j = i + direction[value]
+            if 0 <= j < n and perm[j] < value and value > mobile:
+                mobile, pos = value, i
+        if mobile < 0:
+            return
+        j = pos + direction[mobile]
+        perm[pos], perm[j] = perm[j], perm[pos]
+        for value in range(mobile + 1, n):
+            direction[value] = -direction[value]
+        yield tuple(perm)
+
+def alignment_permutations(periods):
+    """설정된 기간의 모든 배열을 '7>25>99' 형식으로 - 정배열에서 시작해 이웃한 번호끼리는 두 기간만 자리가 바뀜
+
+    인접 교환 순서를 거꾸로 돌아 기간 3개면 기존 번호(1: 정배열, 4: 역배열)와 같음
+    """
+    periods = list(periods)
+    perms = list(_adjacent_swaps(len(periods)))
+    return [">".join(str(periods[i]) for i in order) for order in perms[:1] + perms[:0:-1]]
+
+def alignment_map(periods):
+    """번호('1'부터) -> 배열 문자열"""
+    return {str(i): alignment for i, alignment in enumerate(alignment_permutations(periods), 1)}
+
+def rolling_smas(closes, periods):
+    """종가 1차원 배열 -> 모든 봉의 (봉 × 기간) SMA 행렬 (봉 수가 모자란 앞부분은 NaN)"""
+    closes = np.asarray(closes, dtype=float)
+    smas = np.full((len(closes), len(periods)), np.nan)
+    for j, period in enumerate(periods):
+        if len(closes) >= period:
+            smas[period - 1:, j] = np.convolve(closes, np.full(period, 1.0 / period), mode='valid')
+    return smas
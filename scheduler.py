@@ -0,0 +1,83 @@
+import heapq
+import itertools
+import threading
+import time
+
+# ==========================================
+# 타이머 이벤트 스케줄러 (봉 마감 / 정기 리포트 / 재시도)
+# ==========================================
+class Scheduler:
+    """키별 타이머를 힙으로 관리 - 가장 이른 이벤트 시각까지 정확히 잠들고, notify()로 즉시 깨어남
+
+    같은 키를 다시 예약하면 이전 예약은 무효 (힙에 남은 항목은 꺼낼 때 건너뜀)
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.heap = []       # (시각, 순번, 키)
+        self.due_at = {}     # 키 -> 유효한 예약 시각
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.notified = False
+
+    def schedule(self, key, when):
+        with self.cond:
+            if self.due_at.get(key) == when:
+                return
+            self.due_at[key] = when
+            heapq.heappush(self.heap, (when, next(self.counter), key))
+            self.cond.notify()
+
+    def cancel(self, key):
+        with self.cond:
+            self.due_at.pop(key, None)
+
+    def due(self, key):
+        return self.due_at.get(key)
+
+    def keys(self):
+        with self.cond:
+            return list(self.due_at)
+
+    def notify(self):
+        """다른 스레드에서 처리할 일이 생겼을 때 (명령어 수신, 스트림 마감 등) 대기 중인 wait()를 깨움"""
+        with self.cond:
+            self.notified = True
+            self.cond.notify()
+
+    def wait(self, timeout=None):
+        """예약 시각이 되거나 notify()되거나 timeout초가 지날 때까지 대기
+
+        반환: 시각이 된 키 목록 (예약에서 제거됨, 시각 순)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while True:
+                fired = self._pop_due(self.clock())
+                if fired or self.notified:
+                    self.notified = False
+                    return fired
+                delay = self._next_delay()
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return []
+                    delay = remaining if delay is None else min(delay, remaining)
+                self.cond.wait(delay)
+
+    def _pop_due(self, now):
+        fired = []
+        while self.heap and self.heap[0][0] <= now:
+            when, _, key = heapq.heappop(self.heap)
+            if self.due_at.get(key) == when:
+                del self.due_at[key]
+                fired.append(key)
+        return fired
+
+    def _next_delay(self):
+        # 무효가 된 예약은 버리고 가장 이른 유효 예약까지 남은 시간
+        while self.heap and self.due_at.get(self.heap[0][2]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - self.clock())
@@ -1,143 +1,414 @@
-import time
 from datetime import datetime, timedelta, timezone
 import sys
+import threading
+import time
 
 import config
-from utils import setup_os_environment, check_single_instance, get_next_candle_close
-from market import fetch_data, calculate_smas, get_sma_info
-from telegram_bot import send_telegram_message, get_updates
+import market
+import metrics
+import storage
+from indicators import indicator_label, cross_direction
+from utils import setup_os_environment, check_single_instance, get_next_candle_close, get_last_candle_close, \
+    get_watched_timeframes, sync_alert_schedule, tracked_symbols, server_time, server_now, backoff_delay
+from market import take_snapshots, restore_candles, persist_candles, warm_market_index, load_market_index, sync_clock, \
+    replay_closed_bars, format_sma_info
+from scanner import alignment_codes
+from scheduler import Scheduler
+from sources import create_source
+from telegram_bot import send_telegram_message, start_command_listener, process_commands, flush_messages, \
+    release_symbol, outbox, command_queue
+
+def send_alert(msg, timeframe, chat_id=None):
+    """알람 발송 - 실제 전송 완료 시점에 봉 마감 → 발송 지연 기록"""
+    candle_close = get_last_candle_close(timeframe).timestamp()
+    def on_sent():
+        metrics.alert_latency.observe(server_time() - candle_close)
+    send_telegram_message(msg, chat_id, on_sent=on_sent)
+
+def broadcast(msg):
+    """등록된 모든 채팅방에 발송"""
+    for chat in config.chats:
+        send_telegram_message(msg, chat.chat_id)
 
-def send_report(is_manual=False):
-    """현재 상태 리포트 발송"""
-    title = "📊 *수동 현황 보고*" if is_manual else f"📊 *정기 리포트 ({config.TIMEFRAME})*"
+def send_report(chat, snapshots, is_manual=False):
+    """채팅방 하나에 현재 상태 리포트 발송 (채팅방이 감시 중인 타임프레임별)
+
+    스냅샷은 모든 채팅방이 공유 - 배열 상태 문자열도 심볼/타임프레임별로 한 번만 생성됨
+    """
+    timeframes = chat.timeframes()
+    title = "📊 *수동 현황 보고*" if is_manual else f"📊 *정기 리포트 ({', '.join(timeframes)})*"
     report_lines = [title]
     
-    for symbol in config.SYMBOLS:
-        df = fetch_data(symbol)
-        if df is not None:
-            df = calculate_smas(df)
-            status_str, _ = get_sma_info(df)
-            report_lines.append(f"• {symbol}: {status_str}")
-        else:
-            report_lines.append(f"• {symbol}: 데이터 오류")
-        time.sleep(0.5)
+    for timeframe in timeframes:
+        snapshot = snapshots[timeframe]
+        if len(timeframes) > 1:
+            report_lines.append(f"\n🕒 *{timeframe}*")
+        for symbol in chat.symbols:
+            if snapshot.has(symbol):
+                report_lines.append(f"• {symbol}: {snapshot.status(symbol)}")
+            elif snapshot.is_stale(symbol):
+                report_lines.append(f"• {symbol}: {snapshot.status(symbol)} ⚠️ _조회 실패 - 이전 데이터_")
+            else:
+                report_lines.append(f"• {symbol}: 데이터 오류")
     
-    send_telegram_message("\n".join(report_lines))
+    send_telegram_message("\n".join(report_lines), chat.chat_id)
     if not is_manual:
-        config.last_report_time = datetime.now()
+        chat.last_report_at = server_time()
 
-def check_target_alerts():
-    """지정된 타겟 배열 진입 여부 체크"""
-    if not config.target_alignment:
+def notify_alignment(symbol, timeframe, code, chat_ids, matched, status, note=""):
+    """타겟 배열에 진입하면 아직 알림을 받지 않은 채팅방에만 발송하고, 벗어나면 알림 기록 초기화
+
+    status: 배열 상태 문자열을 만드는 함수 (실제로 발송할 때만 호출)
+    """
+    key = (symbol, timeframe, code)
+    notified = config.chats.notified.get(key, ())
+    if matched:
+        if len(notified) < len(chat_ids):
+            msg = f"🎯 *[타겟 알람] 조건 충족!* 🔔\n품목: {symbol}\n배열: {status()}\n봉: {timeframe}{note}"
+            for chat_id in chat_ids - set(notified):
+                send_alert(msg, timeframe, chat_id)
+            config.chats.notified[key] = set(chat_ids)
+    elif notified:
+        del config.chats.notified[key] # 조건 벗어나면 초기화
+
+def notify_cross(symbol, timeframe, pair, direction, bar, chat_ids, values, note=""):
+    """크로스 알람 발송 - 같은 봉의 크로스는 한 번만"""
+    a, b = pair
+    key = (symbol, timeframe, a, b)
+    if not direction or config.chats.crossed.get(key) == bar:
         return
+    config.chats.crossed[key] = bar
+    label = "상향 돌파 (골든크로스) 🟢" if direction > 0 else "하향 돌파 (데드크로스) 🔴"
+    msg = f"⚔️ *[크로스 알람] 조건 충족!* 🔔\n품목: {symbol}\n" \
+          f"{indicator_label(a)}({values[a]:,.2f}) → {indicator_label(b)}({values[b]:,.2f}) {label}\n" \
+          f"봉: {timeframe}{note}"
+    for chat_id in chat_ids:
+        send_alert(msg, timeframe, chat_id)
 
-    for symbol in config.SYMBOLS:
-        df = fetch_data(symbol)
-        if df is not None:
-            df = calculate_smas(df)
-            status_str, current_alignment = get_sma_info(df)
-            
-            if current_alignment == config.target_alignment:
-                if not config.alert_sent_state[symbol]:
-                    msg = f"🎯 *[타겟 알람] 조건 충족!* 🔔\n품목: {symbol}\n배열: {status_str}\n봉: {config.TIMEFRAME}"
-                    send_telegram_message(msg)
-                    config.alert_sent_state[symbol] = True
-            else:
-                config.alert_sent_state[symbol] = False # 조건 벗어나면 초기화
-        time.sleep(0.5)
+def check_target_alerts(snapshot, only=None):
+    """타겟 배열 진입 여부 체크 (스냅샷의 타임프레임 기준)
+
+    (심볼, 타임프레임, 배열 코드) 조건별로 한 번만 평가하고 구독 중인 채팅방에 나눠 보냄
+    only: 이 심볼들만 평가 (조회 실패 재시도)
+    """
+    timeframe = snapshot.timeframe
+    for code, subscribers in config.chats.conditions.get(timeframe, {}).items():
+        # 전체 심볼의 배열 코드를 한 번에 비교하고, 문자열은 알람 대상만 생성
+        matched = set(snapshot.matching(code))
+        for symbol, chat_ids in subscribers.items():
+            if (only is not None and symbol not in only) or not snapshot.has(symbol):
+                continue
+            notify_alignment(symbol, timeframe, code, chat_ids, symbol in matched,
+                             lambda: snapshot.status(symbol))
 
-def check_trendline_alerts():
-    """지정된 대각선 추세선 돌파 여부 체크"""
+def check_cross_alerts(snapshot, only=None):
+    """지표 크로스(상향/하향 돌파) 체크 - 직전 마감 봉과 이번 마감 봉의 지표 값만 비교
+
+    (심볼, 타임프레임, 지표 쌍)별로 한 번만 판정하고, 같은 봉의 크로스는 한 번만 발송
+    """
+    timeframe = snapshot.timeframe
+    for pair, subscribers in config.chats.crosses.get(timeframe, {}).items():
+        for symbol, chat_ids in subscribers.items():
+            if only is not None and symbol not in only:
+                continue
+            direction, bar = snapshot.cross(symbol, *pair)
+            if direction:
+                notify_cross(symbol, timeframe, pair, direction, bar, chat_ids, snapshot.states[symbol].current)
+
+def check_trendline_alerts(snapshot, only=None):
+    """지정된 대각선 추세선 돌파 여부 체크 (심볼별 종가 하나로 모든 추세선을 한 번에 비교)"""
     if not config.active_trendlines:
         return
         
-    now_utc = datetime.now(timezone.utc)
-    current_timestamp = now_utc.timestamp()
+    current_timestamp = server_time()
     
-    symbols_to_delete = []
+    for symbol in config.active_trendlines.symbols():
+        if (only is not None and symbol not in only) or not snapshot.has(symbol):
+            continue
+        current_close = snapshot.close(symbol)
+        # 돌파한 추세선은 레지스트리에서 바로 해제됨 (추세선을 등록한 채팅방으로 발송)
+        fired = config.active_trendlines.check(symbol, snapshot.timeframe, current_close, current_timestamp)
+        for line, trend_price in fired:
+            msg = f"📈 *[추세선 돌파 알람] 조건 충족!* 🔔\n품목: {symbol} (#{line.id})\n현재가: ${current_close:,.2f}\n기준선가격: ${trend_price:,.2f}\n방향: {line.direction} 이탈"
+            send_alert(msg, snapshot.timeframe, line.chat_id)
+        if fired:
+            release_symbol(symbol)
 
-    for symbol, t_data in config.active_trendlines.items():
-        df = fetch_data(symbol)
-        if df is not None and not df.empty:
-            current_close = df.iloc[-1]['close']
-            
-            t1, p1 = t_data['t1'], t_data['p1']
-            t2, p2 = t_data['t2'], t_data['p2']
-            direction = t_data['direction']
-            
-            if t2 == t1: # prevent division by zero
-                continue
-                
-            m = (p2 - p1) / (t2 - t1)
-            b = p1 - m * t1
-            
-            trend_price = m * current_timestamp + b
-            
-            is_breakout = False
-            if direction == 'up' and current_close > trend_price:
-                is_breakout = True
-            elif direction == 'down' and current_close < trend_price:
-                is_breakout = True
-                
-            if is_breakout:
-                msg = f"📈 *[추세선 돌파 알람] 조건 충족!* 🔔\n품목: {symbol}\n현재가: ${current_close:,.2f}\n기준선가격: ${trend_price:,.2f}\n방향: {direction} 이탈"
-                send_telegram_message(msg)
-                symbols_to_delete.append(symbol)
-                
-        time.sleep(0.5)
-        
-    for sym in symbols_to_delete:
-        del config.active_trendlines[sym]
+def replay_missed_closes(snapshot, missed):
+    """조회 실패로 평가하지 못한 마감 봉을 캐시된 캔들로 순서대로 재평가 (타겟 배열 / 크로스)
+
+    missed: 심볼 -> 실패 전 마지막으로 평가한 봉 시각. 스냅샷의 마지막 마감 봉은 이어서 평소대로 평가됨
+    (추세선은 봉별 기록이 아니라 현재가 기준이라 재평가하지 않음)
+    """
+    timeframe = snapshot.timeframe
+    conditions = config.chats.conditions.get(timeframe, {})
+    crosses = config.chats.crosses.get(timeframe, {})
+    for symbol, evaluated in missed.items():
+        state = snapshot.states.get(symbol)
+        if evaluated is None or state is None or state.last_timestamp is None:
+            continue
+        for ts, _, previous, current in replay_closed_bars(symbol, timeframe, evaluated, state.last_timestamp,
+                                                           config.MISSED_CLOSE_LIMIT):
+            bar_time = datetime.fromtimestamp(ts / 1000, timezone.utc) + timedelta(hours=9)
+            note = f"\n⏳ 지연 확인 (KST {bar_time.strftime('%H:%M')} 봉)"
+            smas = {p: current[f"sma{p}"] for p in config.SMA_PERIODS}
+            code = alignment_codes([list(smas.values())])[0]
+            for target, subscribers in conditions.items():
+                if symbol in subscribers:
+                    notify_alignment(symbol, timeframe, target, subscribers[symbol], code == target,
+                                     lambda: format_sma_info(smas)[0], note)
+            for pair, subscribers in crosses.items():
+                if symbol in subscribers:
+                    notify_cross(symbol, timeframe, pair, cross_direction(previous, current, *pair), ts,
+                                 subscribers[symbol], current, note)
+
+def alert_symbols(timeframe):
+    """이 타임프레임 마감에 알람을 평가하는 심볼 (타겟 배열 / 크로스 / 추세선)"""
+    symbols = set(config.active_trendlines.symbols())
+    for subscribers in (*config.chats.conditions.get(timeframe, {}).values(),
+                        *config.chats.crosses.get(timeframe, {}).values()):
+        symbols.update(subscribers)
+    return symbols
+
+def evaluate_alerts(snapshot, only=None):
+    """봉 마감(또는 재시도) 시 알람 평가 - 복구된 심볼의 놓친 봉을 먼저 재평가하고, 조회 실패 심볼은 기록
+
+    반환: 아직 조회에 실패한 심볼이 남아 있는지
+    """
+    timeframe = snapshot.timeframe
+    missed = config.missed_closes.setdefault(timeframe, {})
+    recovered = {symbol: missed.pop(symbol) for symbol in list(missed) if snapshot.has(symbol)}
+    replay_missed_closes(snapshot, recovered)
+
+    check_target_alerts(snapshot, only)
+    check_cross_alerts(snapshot, only)
+    # 추세선은 등록 시점의 타임프레임 마감 기준
+    check_trendline_alerts(snapshot, only)
+
+    for symbol in (alert_symbols(timeframe) if only is None else only):
+        if symbol in snapshot.index and not snapshot.has(symbol) and symbol not in missed:
+            state = market.sma_states.get((symbol, timeframe))
+            missed[symbol] = state.last_timestamp if state is not None else None
+    if not missed:
+        del config.missed_closes[timeframe]
+    return bool(missed)
 
 # ==========================================
 # 메인 루프
 # ==========================================
 
+def plan_timers(scheduler, source, chats):
+    """봉 마감 타이머(REST 모드)와 채팅방별 정기 리포트 타이머를 현재 설정에 맞게 예약
+
+    봉 마감 타이머는 아직 예약이 없는 (새로 감시하는) 타임프레임만 추가하고 감시 해제된 것은 취소
+    """
+    if not source.live:
+        for timeframe, due in config.next_alert_times.items():
+            if scheduler.due(('close', timeframe)) is None:
+                scheduler.schedule(('close', timeframe), due.timestamp())
+        for key in scheduler.keys():
+            if key[0] == 'close' and key[1] not in config.next_alert_times:
+                scheduler.cancel(key)
+    for chat in chats:
+        due = chat.next_report_at()
+        if due is None:
+            scheduler.cancel(('report', chat.chat_id))
+        else:
+            scheduler.schedule(('report', chat.chat_id), due)
+
+def fired_reports(events):
+    """이번 틱에 정기 리포트 타이머가 울린 채팅방 목록 (타이머는 이미 꺼냈으므로 발송 여부와 무관하게 다시 예약해야 함)"""
+    return [config.chats.get(key[1]) for key in events if key[0] == 'report' and key[1] in config.chats]
+
+def schedule_retry(scheduler, timeframe, attempts):
+    """조회에 실패한 심볼이 남아 있으면 백오프 간격으로 재시도 예약 (다음 봉 마감을 넘기면 마감 평가가 이어받음)"""
+    if not config.missed_closes.get(timeframe):
+        attempts.pop(timeframe, None)
+        scheduler.cancel(('retry', timeframe))
+        return
+    attempt = attempts[timeframe] = attempts.get(timeframe, -1) + 1
+    # 회로가 열려 있으면 다시 시험 가능해질 때까지는 재시도해도 바로 실패하므로 그 뒤로 미룸
+    delay = max(backoff_delay(attempt, config.RETRY_DELAY, config.MISSED_RETRY_MAX_DELAY), market.exchange.retry_after())
+    due = server_time() + delay
+    if due < config.next_alert_times[timeframe].timestamp():
+        scheduler.schedule(('retry', timeframe), due)
+    else:
+        scheduler.cancel(('retry', timeframe))
+
+def prune_missed(scheduler, timeframes, has_alerts):
+    """더 이상 감시하지 않는 타임프레임/심볼 또는 알람이 모두 해제된 경우의 재시도 기록 정리"""
+    symbols = set(tracked_symbols())
+    for timeframe in list(config.missed_closes):
+        missed = config.missed_closes[timeframe]
+        for symbol in [s for s in missed if s not in symbols]:
+            del missed[symbol]
+        if not (has_alerts and missed and timeframe in timeframes):
+            del config.missed_closes[timeframe]
+            scheduler.cancel(('retry', timeframe))
+
+def resync_clock(scheduler):
+    """거래소 서버 시각 보정값 갱신 후 다음 재측정 예약"""
+    try:
+        rtt, offset = sync_clock()
+        print(f"🕰️ 서버 시각 보정 {offset * 1000:+.1f}ms (왕복 {rtt * 1000:.1f}ms)", flush=True)
+    except Exception as e:
+        print(f"Error syncing clock: {e}")
+    scheduler.schedule(('clock',), server_time() + config.CLOCK_SYNC_INTERVAL)
+
+def warm_up(scheduler, refresh_markets):
+    """시작 직후 백그라운드에서 거래소 클라이언트 생성(ccxt 임포트) → 서버 시각 보정 → 만료된 마켓 목록 갱신
+
+    메인 루프는 그동안 명령어를 처리하고, 거래소가 필요한 첫 조회만 클라이언트가 준비될 때까지 기다림
+    """
+    resync_clock(scheduler)
+    if refresh_markets:
+        print(f"📇 거래 가능 심볼 {load_market_index()}개 (갱신)", flush=True)
+
+def start_metrics():
+    """상태 게이지 등록 후 Prometheus 형식 엔드포인트 시작 (실패해도 봇은 계속 동작)"""
+    metrics.Gauge('sma_tracked_symbols', "Symbols watched by any chat or trendline", lambda: len(tracked_symbols()))
+    metrics.Gauge('sma_chats', "Registered chats", lambda: len(config.chats))
+    metrics.Gauge('sma_trendlines', "Active trendlines", lambda: len(config.active_trendlines))
+    metrics.Gauge('sma_outbox_pending', "Telegram messages waiting to be sent", lambda: outbox.unfinished_tasks)
+    metrics.Gauge('sma_command_queue', "Telegram commands waiting to be handled", command_queue.qsize)
+    metrics.Gauge('sma_clock_offset_seconds', "Exchange server time minus local time", lambda: config.clock_offset)
+    metrics.Gauge('sma_exchange_circuits_open', "Exchange endpoints with an open circuit breaker",
+                  lambda: market.exchange.open_circuits())
+    metrics.Gauge('sma_missed_closes', "Symbols whose candle close could not be evaluated yet",
+                  lambda: sum(len(missed) for missed in config.missed_closes.values()))
+    try:
+        if metrics.start_server(config.METRICS_HOST, config.METRICS_PORT):
+            print(f"📈 계측 엔드포인트: http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics", flush=True)
+    except OSError as e:
+        print(f"Error starting metrics endpoint: {e}")
+
 def monitor():
     setup_os_environment()
     
-    # 인스턴스 중복 체크
+    # 인스턴스 중복 체크 (ccxt/pandas는 지연 임포트라 여기까지 무거운 모듈을 읽지 않음)
     lock_f = check_single_instance()
     if lock_f is None:
         sys.exit(1)
+    
+    # 디스크에 저장된 설정 복원
+    storage.open_store()
+    if storage.restore_state():
+        print("💾 저장된 설정 상태 복원", flush=True)
+    if config.CHAT_ID:
+        config.chats.get_or_create(config.CHAT_ID)  # 관리자 채팅방은 항상 등록
+    
+    # 봉 마감 / 정기 리포트 / 재시도 / 서버 시각 재측정을 하나의 타이머 힙으로 관리 (서버 시각 기준)
+    scheduler = Scheduler(clock=server_time)
+    retry_attempts = {}  # 타임프레임 -> 이번 봉에서 조회 실패 심볼을 재시도한 횟수 (백오프용)
+    
+    # 명령어 수신을 가장 먼저 시작 (전용 스레드, 수신 즉시 메인 루프를 깨움) - 이후 준비 중 받은 명령어는 첫 틱에 처리
+    start_command_listener(on_command=scheduler.notify)
+    markets_fresh = warm_market_index()
+    print(f"📇 거래 가능 심볼 {len(market.market_index)}개 (캐시)", flush=True)
         
-    start_msg = f"🔔 *모니터링 시스템 가동*\n대상: {', '.join(config.SYMBOLS)}\n기본봉: {config.TIMEFRAME}\n\nType 'help' for commands!"
+    start_msg = f"🔔 *모니터링 시스템 가동*\n대상: {', '.join(tracked_symbols())}\n기본봉: {', '.join(get_watched_timeframes())}\n\nType 'help' for commands!"
     print(start_msg)
-    send_telegram_message(start_msg)
+    broadcast(start_msg)
+    
+    # 거래소 클라이언트(ccxt) 준비, 서버 시각 보정, 만료된 마켓 목록 갱신은 백그라운드에서
+    threading.Thread(target=warm_up, args=(scheduler, not markets_fresh), name='warmup', daemon=True).start()
+    
+    # 디스크에 저장된 캔들 복원 (재시작 후 끊긴 구간만 보충 조회)
+    restored = restore_candles()
+    storage.prune_candles(config.CANDLE_LIMIT)
+    print(f"💾 저장된 캔들 {restored}개 시리즈 복원", flush=True)
+    start_metrics()
+    
+    # 데이터 공급원 (REST 폴링 또는 kline 스트림) - 기본봉(1m) 하나로 모든 타임프레임을 만듦
+    source = create_source()
+    source.start(tracked_symbols(), get_watched_timeframes(), wakeup=scheduler.notify)
+    sync_alert_schedule()
+    plan_timers(scheduler, source, config.chats)
     
     while True:
+        events = []
         try:
-            # 1. 명령어 체크 (사용자로부터 수신)
-            trigger_now_report = get_updates()
-            if trigger_now_report:
-                send_report(is_manual=True)
+            # 1. 다음 타이머까지 대기 (명령어/스트림 마감 수신 시 즉시 깨어남) 후 명령어 처리
+            events = scheduler.wait(timeout=source.next_check())
+            started = time.perf_counter()
+            now_requests, handled = process_commands()
+            if ('clock',) in events:
+                resync_clock(scheduler)
+            timeframes = get_watched_timeframes()
+            source.subscribe(tracked_symbols(), timeframes)
+            if handled:
+                plan_timers(scheduler, source, [config.chats.get(chat_id) for chat_id in handled])
+            
+            closed_timeframes = [tf for tf in source.closed_timeframes() if tf in timeframes]
+            has_alerts = bool(config.chats.has_alerts() or config.active_trendlines)
+            prune_missed(scheduler, timeframes, has_alerts)
+            alert_timeframes = closed_timeframes if has_alerts else []
+            # 조회 실패 심볼 재시도 (같은 틱에 봉 마감이 겹치면 마감 평가가 함께 처리)
+            retry_timeframes = [key[1] for key in events if key[0] == 'retry'
+                                and key[1] in config.missed_closes and key[1] not in closed_timeframes]
+            now = server_time()
+            # 리포트 타이머가 울렸지만 아직 시각이 안 된 채팅방(시각 보정으로 앞당겨진 경우 등)도 아래에서 다시 예약
+            report_fired = fired_reports(events)
+            report_due = [chat for chat in report_fired if chat.report_due(now)]
+            
+            # 이번 틱의 모든 채팅방 리포트/알람이 공유할 스냅샷 (기본봉 심볼별 1회 조회)
+            if now_requests or alert_timeframes or report_due:
+                snapshots = take_snapshots(tracked_symbols(), timeframes, refresh=not source.live)
+            elif retry_timeframes:
+                retry_symbols = set().union(*(config.missed_closes[tf] for tf in retry_timeframes))
+                snapshots = take_snapshots(retry_symbols, retry_timeframes, refresh=not source.live)
+            
+            for chat_id in now_requests:
+                send_report(config.chats.get(chat_id), snapshots, is_manual=True)
+            
+            # 2. 지정 알람 체크 (타임프레임별 봉 마감 시점에만)
+            for timeframe in alert_timeframes:
+                kst_time = server_now() + timedelta(hours=9)
+                print(f"🔔 봉 마감 감지! ({timeframe}) 알람 체크 중... (KST {kst_time.strftime('%H:%M:%S.%f')[:-3]})", flush=True)
+                evaluate_alerts(snapshots[timeframe])
+                retry_attempts.pop(timeframe, None)
+            for timeframe in retry_timeframes:
+                missed = set(config.missed_closes[timeframe])
+                print(f"🔁 조회 실패 심볼 재시도 ({timeframe}): {', '.join(sorted(missed))}", flush=True)
+                evaluate_alerts(snapshots[timeframe], only=missed)
             
-            # 2. 지정 알람 체크 (봉 마감 시점에만)
-            if (config.target_alignment or config.active_trendlines) and config.next_alert_time:
-                now_utc = datetime.now(timezone.utc)
-                if now_utc >= config.next_alert_time:
-                    kst_time = config.next_alert_time + timedelta(hours=9)
-                    print(f"🔔 봉 마감 감지! ({config.TIMEFRAME}) 알람 체크 중... (KST {kst_time.strftime('%H:%M:%S')})", flush=True)
-                    check_target_alerts()
-                    check_trendline_alerts()
-                    # 다음 봉 마감 시각으로 갱신
-                    config.next_alert_time = get_next_candle_close(config.TIMEFRAME)
-                    kst_next = config.next_alert_time + timedelta(hours=9)
-                    print(f"⏭️ 다음 알람 체크: KST {kst_next.strftime('%H:%M:%S')}", flush=True)
+            # 다음 봉 마감 시각으로 갱신
+            for timeframe in closed_timeframes:
+                config.next_alert_times[timeframe] = get_next_candle_close(timeframe)
+                if not source.live:
+                    scheduler.schedule(('close', timeframe), config.next_alert_times[timeframe].timestamp())
+                if timeframe in alert_timeframes:
+                    kst_next = config.next_alert_times[timeframe] + timedelta(hours=9)
+                    print(f"⏭️ 다음 알람 체크 ({timeframe}): KST {kst_next.strftime('%H:%M:%S')}", flush=True)
+            for timeframe in (*alert_timeframes, *retry_timeframes):
+                schedule_retry(scheduler, timeframe, retry_attempts)
+            if alert_timeframes and metrics.alert_latency.count:
+                print(f"⏱️ 마감→알람 지연: {metrics.alert_latency.summary()}", flush=True)
             
-            # 3. 정기 리포트 발송
-            if config.is_report_enabled:
-                if (datetime.now() - config.last_report_time).total_seconds() >= config.INTERVAL_SECONDS:
-                    send_report()
+            # 3. 정기 리포트 발송 후 채팅방별 다음 리포트 예약
+            for chat in report_due:
+                send_report(chat, snapshots)
+            plan_timers(scheduler, source, report_fired)
             
-            time.sleep(1)
+            # 4. 새로 마감된 캔들 / 바뀐 설정 상태 저장
+            if now_requests or alert_timeframes or report_due or retry_timeframes:
+                persist_candles()
+            storage.save_state()
+            metrics.tick_latency.observe(time.perf_counter() - started)
             
         except KeyboardInterrupt:
-            send_telegram_message("🛑 *시스템 종료*")
+            source.stop()
+            broadcast("🛑 *시스템 종료*")
+            flush_messages()
             break
         except Exception as e:
             print(f"Error in main loop: {e}")
-            time.sleep(5)
+            metrics.errors.inc('main_loop', '')
+            # 처리하지 못한 타이머는 잠시 후 다시 시도
+            retry_at = server_time() + config.RETRY_DELAY
+            for key in events:
+                if scheduler.due(key) is None:
+                    scheduler.schedule(key, retry_at)
 
 if __name__ == "__main__":
     monitor()
@@ -0,0 +1,215 @@
+import json
+from abc import ABC, abstractmethod
+import queue
+import threading
+import time
+import config
+import market
+from utils import server_now
+
+try:
+    import websocket  # websocket-client (스트림 모드에서만 필요)
+except ImportError:
+    websocket = None
+
+# ==========================================
+# 캔들 데이터 공급원 (REST 폴링 / 웹소켓 스트림)
+# ==========================================
+class DataSource(ABC):
+    """데이터 공급원 인터페이스
+
+    live=True인 공급원은 캔들 저장소를 스스로 최신으로 유지하므로 스냅샷 생성 시 REST 조회가 필요 없음
+    """
+    live = False
+    wakeup = None  # 봉 마감을 받았을 때 메인 루프를 깨우는 콜백
+
+    def start(self, symbols, timeframes, wakeup=None):
+        self.wakeup = wakeup
+
+    def subscribe(self, symbols, timeframes):
+        """감시 대상 변경 반영 (변경 없으면 무시)"""
+        pass
+
+    def stop(self):
+        pass
+
+    @abstractmethod
+    def closed_timeframes(self):
+        """이번 루프에서 봉 마감을 평가해야 하는 타임프레임 목록"""
+
+    def next_check(self):
+        """closed_timeframes()를 다시 확인해야 할 때까지 남은 초 (없으면 None)"""
+        return None
+
+
+class RestPollingSource(DataSource):
+    """기존 방식: 서버 시각 기준으로 타임프레임별 봉 마감을 계산하고 REST로 조회 (마감 타이머는 메인 루프가 예약)"""
+
+    def closed_timeframes(self):
+        now_utc = server_now()
+        return [tf for tf, due in config.next_alert_times.items() if now_utc >= due]
+
+
+class BinanceStreamSource(DataSource):
+    """바이낸스 선물 kline 웹소켓 스트림 - 거래소의 봉 마감 플래그(x)로 알람 평가
+
+    기본봉(1m) 스트림 하나만 구독하고, 기본봉 마감이 상위 봉 경계와 맞으면 해당 타임프레임 마감으로 처리
+    """
+    live = True
+
+    def __init__(self, url=None):
+        self.url = url or config.STREAM_URL
+        self.timeframe = config.BASE_TIMEFRAME
+        self.symbols = []
+        self.timeframes = []
+        self.stream_symbols = {}         # 'BTCUSDT' -> 'BTC/USDT'
+        self.generation = 0              # 구독 대상이 바뀔 때마다 증가 (수신 루프가 재연결 여부를 판단)
+        self.closes = queue.Queue()      # 마감된 봉 (심볼, 타임프레임, 시작 시각)
+        self.pending = {}                # (타임프레임, 시작 시각) -> (첫 수신 시각, 마감 보고한 심볼 집합)
+        self.last_closed = {}            # 심볼 -> 마지막으로 마감 처리한 기본봉 시작 시각
+        self.stop_event = threading.Event()
+        self.ws = None
+        self.thread = None
+
+    def stream_url(self):
+        names = "/".join(f"{symbol.replace('/', '').lower()}@kline_{self.timeframe}" for symbol in self.symbols)
+        return f"{self.url}?streams={names}"
+
+    def _set_targets(self, symbols):
+        self.symbols = list(symbols)
+        self.stream_symbols = {symbol.replace('/', ''): symbol for symbol in self.symbols}
+        self.generation += 1
+
+    def start(self, symbols, timeframes, wakeup=None):
+        self.wakeup = wakeup
+        self._set_targets(symbols)
+        self.timeframes = list(timeframes)
+        self.thread = threading.Thread(target=self._run, name='kline-stream', daemon=True)
+        self.thread.start()
+
+    def subscribe(self, symbols, timeframes):
+        # 타임프레임 변경은 재연결 없이 마감 판정에만 반영
+        self.timeframes = list(timeframes)
+        symbols = list(symbols)
+        if symbols == self.symbols:
+            return
+        self._set_targets(symbols)
+        self.pending.clear()
+        # 현재 연결을 끊으면 수신 스레드가 새 스트림 목록으로 재연결
+        self._close_socket()
+
+    def stop(self):
+        self.stop_event.set()
+        self._close_socket()
+
+    def _close_socket(self):
+        ws = self.ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        backoff = 1
+        while not self.stop_event.is_set():
+            generation = self.generation
+            try:
+                if not self.symbols:
+                    self.stop_event.wait(1)
+                    continue
+                self.ws = websocket.create_connection(self.stream_url(), timeout=config.STREAM_RECV_TIMEOUT)
+                print(f"📡 kline 스트림 연결 ({len(self.symbols)}개 심볼, {self.timeframe})", flush=True)
+                # 끊겨 있던 동안의 봉은 REST로 보충
+                self._backfill()
+                backoff = 1
+                while not self.stop_event.is_set() and generation == self.generation:
+                    try:
+                        raw = self.ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        continue
+                    if not raw:
+                        raise ConnectionError("stream closed")
+                    self._handle(json.loads(raw))
+            except Exception as e:
+                if self.stop_event.is_set():
+                    break
+                if generation != self.generation:
+                    continue  # 구독 변경으로 인한 재연결
+                print(f"⚠️ kline 스트림 끊김: {e} ({backoff}초 후 재연결)", flush=True)
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                self._close_socket()
+                self.ws = None
+
+    def _backfill(self):
+        timeframe = self.timeframe
+        for symbol, candles in market.fetch_all(self.symbols, timeframe).items():
+            if not candles:
+                continue
+            closed = [c for c in candles[-2:] if market.is_closed(c, timeframe)]
+            # 끊긴 동안 마감된 봉이 있으면 놓치지 않도록 마감 이벤트 발생
+            if closed:
+                self._on_base_close(symbol, closed[-1][0])
+
+    def _handle(self, message):
+        data = message.get('data', message)
+        if data.get('e') != 'kline':
+            return
+        k = data['k']
+        symbol = self.stream_symbols.get(k['s'])
+        if symbol is None or k['i'] != self.timeframe:
+            return
+        candle = [int(k['t']), float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+        market.apply_kline(symbol, self.timeframe, candle)
+        if k['x']:
+            self._on_base_close(symbol, candle[0])
+
+    def _on_base_close(self, symbol, open_time):
+        """기본봉 마감 -> 경계를 넘은 타임프레임마다 마감 이벤트 발생 (끊긴 동안 넘은 경계 포함)"""
+        previous = self.last_closed.get(symbol)
+        if previous is not None and previous >= open_time:
+            return
+        self.last_closed[symbol] = open_time
+        if previous is None:
+            return  # 첫 연결 시에는 기준점만 기록
+        close_time = open_time + market.timeframe_ms(self.timeframe)
+        for timeframe in self.timeframes:
+            tf_ms = market.timeframe_ms(timeframe)
+            if close_time // tf_ms > (previous + market.timeframe_ms(self.timeframe)) // tf_ms:
+                self.closes.put((symbol, timeframe, close_time // tf_ms * tf_ms - tf_ms))
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def closed_timeframes(self):
+        """타임프레임별로 모든 심볼의 마감이 모였거나 유예 시간이 지난 것만 반환"""
+        while True:
+            try:
+                symbol, timeframe, open_time = self.closes.get_nowait()
+            except queue.Empty:
+                break
+            first_seen, symbols = self.pending.setdefault((timeframe, open_time), (time.monotonic(), set()))
+            symbols.add(symbol)
+
+        ready = [key for key, (first_seen, symbols) in self.pending.items()
+                 if symbols >= set(self.symbols) or time.monotonic() - first_seen >= config.STREAM_CLOSE_GRACE]
+        for key in ready:
+            del self.pending[key]
+        return list(dict.fromkeys(timeframe for timeframe, _ in ready))
+
+    def next_check(self):
+        """유예 시간을 기다리는 마감이 있으면 가장 먼저 만료되는 시점까지 남은 초"""
+        if not self.pending:
+            return None
+        first_seen = min(first for first, _ in self.pending.values())
+        return max(0.0, first_seen + config.STREAM_CLOSE_GRACE - time.monotonic())
+
+
+def create_source():
+    """config.DATA_SOURCE 설정에 맞는 데이터 공급원 생성"""
+    if config.DATA_SOURCE == 'stream':
+        if websocket is not None:
+            return BinanceStreamSource()
+        print("⚠️ websocket-client 미설치 - REST 폴링 모드로 동작합니다. (pip install websocket-client)")
+    return RestPollingSource()
@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import config
+
+# ==========================================
+# 로컬 저장소 (SQLite) - 캔들 및 설정 상태 영속화
+# ==========================================
+# 메인 루프 스레드에서만 사용 (sqlite3 연결은 스레드 간 공유하지 않음)
+_conn = None
+_last_state_json = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL, timeframe TEXT NOT NULL, ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (symbol, timeframe, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+def open_store(path=None):
+    """저장소 열기 (없으면 생성)"""
+    global _conn
+    _conn = sqlite3.connect(path or config.STORE_FILE)
+    _conn.execute("PRAGMA journal_mode=WAL")
+    _conn.execute("PRAGMA synchronous=NORMAL")
+    _conn.executescript(SCHEMA)
+    return _conn
+
+def is_open():
+    return _conn is not None
+
+def save_candles(symbol, timeframe, rows, since=None):
+    """마감된 캔들 저장 (같은 시각은 덮어씀) - since를 주면 같은 트랜잭션에서 그보다 오래된 캔들 삭제"""
+    if not rows:
+        return
+    with _conn:
+        _conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                          [(symbol, timeframe, *row) for row in rows])
+        if since is not None:
+            _conn.execute("DELETE FROM candles WHERE symbol = ? AND timeframe = ? AND ts < ?", (symbol, timeframe, since))
+
+def load_candles(limit):
+    """(심볼, 타임프레임)별 최근 limit개 캔들 -> {(심볼, 타임프레임): [[ts, o, h, l, c, v], ...]}"""
+    result = {}
+    rows = _conn.execute("""
+        SELECT symbol, timeframe, ts, open, high, low, close, volume FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY symbol, timeframe ORDER BY ts DESC) AS rn FROM candles
+        ) WHERE rn <= ? ORDER BY symbol, timeframe, ts""", (limit,))
+    for symbol, timeframe, *candle in rows:
+        result.setdefault((symbol, timeframe), []).append(candle)
+    return result
+
+def candle_bounds(symbol, timeframe):
+    """저장된 캔들의 (처음, 마지막) 시각 - 없으면 (None, None)"""
+    return _conn.execute("SELECT MIN(ts), MAX(ts) FROM candles WHERE symbol = ? AND timeframe = ?",
+                         (symbol, timeframe)).fetchone()
+
+def load_range(symbol, timeframe, since, until):
+    """[since, until) 구간 캔들 (시간순) -> [(ts, o, h, l, c, v), ...]"""
+    return _conn.execute("""
+        SELECT ts, open, high, low, close, volume FROM candles
+        WHERE symbol = ? AND timeframe = ? AND ts >= ? AND ts < ? ORDER BY ts""",
+                         (symbol, timeframe, since, until)).fetchall()
+
+def delete_candles(symbol):
+    """감시 해제된 심볼의 캔들 전체 삭제"""
+    with _conn:
+        _conn.execute("DELETE FROM candles WHERE symbol = ?", (symbol,))
+
+def prune_candles(keep):
+    """(심볼, 타임프레임)별 최근 keep개만 남기고 삭제"""
+    with _conn:
+        _conn.execute("""
+            DELETE FROM candles WHERE (symbol, timeframe, ts) IN (
+                SELECT symbol, timeframe, ts FROM (
+                    SELECT symbol, timeframe, ts,
+                           ROW_NUMBER() OVER (PARTITION BY symbol, timeframe ORDER BY ts DESC) AS rn FROM candles
+                ) WHERE rn > ?)""", (keep,))
+
+# ==========================================
+# 설정 상태 스냅샷 (config 글로벌 변수)
+# ==========================================
+def dump_state():
+    """config 글로벌 상태를 JSON 직렬화 가능한 dict로"""
+    return {
+        'chats': [chat.to_dict() for chat in config.chats],
+        'alert_notified': [[*key, sorted(chat_ids)] for key, chat_ids in config.chats.notified.items()],
+        'trendlines': [line.to_dict() for line in config.active_trendlines],
+        'trendline_next_id': config.active_trendlines.next_id,
+        'last_update_id': config.last_update_id,
+    }
+
+def save_state():
+    """상태가 바뀐 경우에만 저장"""
+    global _last_state_json
+    state_json = json.dumps(dump_state(), ensure_ascii=False, sort_keys=True)
+    if state_json == _last_state_json:
+        return
+    with _conn:
+        _conn.execute("INSERT OR REPLACE INTO state VALUES ('config', ?)", (state_json,))
+    _last_state_json = state_json
+
+def restore_state():
+    """저장된 상태를 config에 복원 - 복원했으면 True"""
+    global _last_state_json
+    row = _conn.execute("SELECT value FROM state WHERE key = 'config'").fetchone()
+    if row is None:
+        return False
+    state = json.loads(row[0])
+    for settings in state.get('chats', []):
+        config.chats.get_or_create(settings['chat_id'], settings)
+    for symbol, timeframe, code, chat_ids in state.get('alert_notified', []):
+        subscribers = config.chats.conditions.get(timeframe, {}).get(code, {}).get(symbol, set())
+        if subscribers & set(chat_ids):
+            config.chats.notified[(symbol, timeframe, code)] = subscribers & set(chat_ids)
+    for line in state.get('trendlines', []):
+        config.active_trendlines.add(line['symbol'], line['t1'], line['p1'], line['t2'], line['p2'], line['direction'],
+                                     line.get('timeframe', config.DEFAULT_TIMEFRAME), line.get('chat_id', config.CHAT_ID),
+                                     line_id=line['id'])
+    config.active_trendlines.next_id = max(config.active_trendlines.next_id, state.get('trendline_next_id', 1))
+    config.last_update_id = state.get('last_update_id', 0)
+    _last_state_json = row[0]
+    return True
@@ -0,0 +1,184 @@
+from indicators import indicator_name
+from scanner import alignment_code
+
+# ==========================================
+# 채팅방별 구독 설정 + 알람 조건 인덱스
+# ==========================================
+class ChatSettings:
+    """채팅방 하나의 감시 설정 (심볼, 타임프레임, 리포트, 타겟 배열, 크로스)"""
+
+    def __init__(self, chat_id, symbols, timeframe, interval_seconds):
+        self.chat_id = str(chat_id)
+        self.symbols = list(symbols)
+        self.timeframe = timeframe              # 기본 타임프레임 (리포트/추세선 기준)
+        self.extra_timeframes = []              # 함께 감시할 추가 타임프레임
+        self.interval_seconds = interval_seconds
+        self.is_report_enabled = True
+        self.target_alignment = None            # 알림을 받을 타겟 배열 (예: '7>25>99')
+        self.crosses = []                       # 크로스 알람을 받을 지표 쌍 (예: [['ema9', 'sma25']])
+        self.last_report_at = 0.0               # 마지막 정기 리포트 시각 (epoch 초)
+
+    def timeframes(self):
+        return list(dict.fromkeys([self.timeframe, *self.extra_timeframes]))
+
+    def next_report_at(self):
+        """다음 정기 리포트 시각 (epoch 초, 꺼져 있으면 None)"""
+        return self.last_report_at + self.interval_seconds if self.is_report_enabled else None
+
+    def report_due(self, now):
+        return self.is_report_enabled and now >= self.next_report_at()
+
+    def to_dict(self):
+        return {'chat_id': self.chat_id, 'symbols': self.symbols, 'timeframe': self.timeframe,
+                'extra_timeframes': self.extra_timeframes, 'interval_seconds': self.interval_seconds,
+                'is_report_enabled': self.is_report_enabled, 'target_alignment': self.target_alignment,
+                'crosses': self.crosses}
+
+
+class ChatRegistry:
+    """채팅방 설정 모음
+
+    모든 채팅방이 감시하는 심볼/타임프레임의 합집합과 (심볼, 타임프레임, 배열 코드)별 구독자 인덱스를
+    설정이 바뀐 채팅방 분만 증분 갱신 - 알람 평가 비용은 사용자 수가 아니라 서로 다른 조건 수에 비례
+    """
+
+    def __init__(self, symbols, timeframe, interval_seconds, periods):
+        self.defaults = (list(symbols), timeframe, interval_seconds)
+        self.periods = list(periods)
+        self.chats = {}           # chat_id -> ChatSettings
+        self.symbol_refs = {}     # 심볼 -> 감시 중인 채팅방 수
+        self.timeframe_refs = {}  # 타임프레임 -> 감시 중인 채팅방 수
+        self.conditions = {}      # 타임프레임 -> 배열 코드 -> 심볼 -> {chat_id}
+        self.notified = {}        # (심볼, 타임프레임, 배열 코드) -> 이미 알림을 받은 {chat_id}
+        self.crosses = {}         # 타임프레임 -> (지표 a, 지표 b) -> 심볼 -> {chat_id}
+        self.crossed = {}         # (심볼, 타임프레임, a, b) -> 마지막으로 크로스 알림을 보낸 봉 시각
+        self.series_refs = {}     # 크로스 알람에 쓰이는 지표 -> 참조 수
+        self.series_names = ()    # 위 지표 이름 (계산 대상 목록, 정렬)
+        self._indexed = {}        # chat_id -> 인덱스에 반영된 (심볼, 타임프레임, 배열 코드, 크로스 쌍)
+
+    def __len__(self):
+        return len(self.chats)
+
+    def __iter__(self):
+        return iter(list(self.chats.values()))
+
+    def __contains__(self, chat_id):
+        return str(chat_id) in self.chats
+
+    def get(self, chat_id):
+        return self.chats.get(str(chat_id))
+
+    def get_or_create(self, chat_id, settings=None):
+        """채팅방 설정 반환 (처음이면 기본값 또는 저장된 settings dict로 생성)"""
+        chat = self.chats.get(str(chat_id))
+        if chat is None:
+            chat = self.chats[str(chat_id)] = ChatSettings(chat_id, *self.defaults)
+            for name, value in (settings or {}).items():
+                if name != 'chat_id' and hasattr(chat, name):
+                    setattr(chat, name, value)
+            self.update(chat)
+        return chat
+
+    def remove(self, chat_id):
+        chat = self.chats.pop(str(chat_id), None)
+        if chat is not None:
+            self._unindex(chat.chat_id, keep=())
+        return chat
+
+    def symbols(self):
+        return list(self.symbol_refs)
+
+    def timeframes(self):
+        return list(self.timeframe_refs)
+
+    def has_alerts(self):
+        return bool(self.conditions or self.crosses)
+
+    def update(self, chat, reset_alerts=False):
+        """채팅방 설정을 바꾼 뒤 호출 - 합집합/알람 인덱스에서 이 채팅방 분만 다시 반영
+
+        reset_alerts=True면 이미 받은 알람 기록도 지워 조건 충족 시 다시 알림
+        """
+        try:
+            code = alignment_code(chat.target_alignment, self.periods) if chat.target_alignment else None
+        except ValueError:
+            # SMA 기간 설정이 바뀌어 저장된 타겟 배열이 더 이상 유효하지 않음
+            chat.target_alignment, code = None, None
+        chat.crosses = [[indicator_name(a), indicator_name(b)] for a, b in chat.crosses]
+        pairs = tuple(dict.fromkeys((a, b) for a, b in chat.crosses))
+        indexed = (tuple(chat.symbols), tuple(chat.timeframes()), code, pairs)
+        keep = () if reset_alerts else {*self._condition_keys(*indexed[:3]), *self._cross_keys(*indexed)}
+        self._unindex(chat.chat_id, keep)
+
+        for symbol in indexed[0]:
+            self.symbol_refs[symbol] = self.symbol_refs.get(symbol, 0) + 1
+        for timeframe in indexed[1]:
+            self.timeframe_refs[timeframe] = self.timeframe_refs.get(timeframe, 0) + 1
+        for symbol, timeframe, code in self._condition_keys(*indexed[:3]):
+            self.conditions.setdefault(timeframe, {}).setdefault(code, {}).setdefault(symbol, set()).add(chat.chat_id)
+        # 감시 심볼이 없으면 빈 구독 버킷을 만들지 않음 (has_alerts()가 계속 참이 되지 않도록)
+        for timeframe in indexed[1] if indexed[0] else ():
+            for pair in pairs:
+                by_symbol = self.crosses.setdefault(timeframe, {}).setdefault(pair, {})
+                for symbol in indexed[0]:
+                    by_symbol.setdefault(symbol, set()).add(chat.chat_id)
+        for name in dict.fromkeys(name for pair in pairs for name in pair):
+            self.series_refs[name] = self.series_refs.get(name, 0) + 1
+        self.series_names = tuple(sorted(self.series_refs))
+        self._indexed[chat.chat_id] = indexed
+
+    def _unindex(self, chat_id, keep):
+        """인덱스에서 채팅방 제거 - keep에 있는 조건은 알림 기록 유지 (크로스 기록은 구독자가 모두 빠지면 삭제)"""
+        symbols, timeframes, code, pairs = self._indexed.pop(chat_id, ((), (), None, ()))
+        _release(self.symbol_refs, symbols)
+        _release(self.timeframe_refs, timeframes)
+        _release(self.series_refs, dict.fromkeys(name for pair in pairs for name in pair))
+        self.series_names = tuple(sorted(self.series_refs))
+        for timeframe in timeframes:
+            by_pair = self.crosses.get(timeframe, {})
+            for pair in pairs:
+                by_symbol = by_pair.get(pair, {})
+                for symbol in symbols:
+                    subscribers = by_symbol.get(symbol)
+                    if subscribers is not None:
+                        subscribers.discard(chat_id)
+                        if not subscribers:
+                            del by_symbol[symbol]
+                            if (symbol, timeframe, *pair) not in keep:
+                                self.crossed.pop((symbol, timeframe, *pair), None)
+                if pair in by_pair and not by_symbol:
+                    del by_pair[pair]
+            if timeframe in self.crosses and not by_pair:
+                del self.crosses[timeframe]
+        for key in self._condition_keys(symbols, timeframes, code):
+            symbol, timeframe, code = key
+            by_code = self.conditions[timeframe]
+            subscribers = by_code[code][symbol]
+            subscribers.discard(chat_id)
+            if not subscribers:
+                del by_code[code][symbol]
+                if not by_code[code]:
+                    del by_code[code]
+                    if not by_code:
+                        del self.conditions[timeframe]
+            if key not in keep and key in self.notified:
+                self.notified[key].discard(chat_id)
+                if not self.notified[key]:
+                    del self.notified[key]
+
+    @staticmethod
+    def _condition_keys(symbols, timeframes, code):
+        if code is None:
+            return []
+        return [(symbol, timeframe, code) for symbol in symbols for timeframe in timeframes]
+
+    @staticmethod
+    def _cross_keys(symbols, timeframes, code, pairs):
+        return [(symbol, timeframe, a, b) for symbol in symbols for timeframe in timeframes for a, b in pairs]
+
+
+def _release(refs, keys):
+    for key in keys:
+        refs[key] -= 1
+        if refs[key] <= 0:
+            del refs[key]
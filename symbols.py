@@ -0,0 +1,89 @@
+import json
+import os
+import time
+
+# ==========================================
+# 거래 가능 심볼 인덱스 (기초자산 -> 심볼)
+# ==========================================
+class MarketIndex:
+    """거래소 마켓 목록으로 만든 기초자산 -> 심볼 사전 - 정확히 일치하는 것만 O(1) 조회
+
+    거래소 마켓 목록은 무거우므로 한 번 받은 뒤 디스크에 캐시하여 재시작 시 재사용
+    """
+
+    def __init__(self, cache_file, quote='USDT', ttl=86400):
+        self.cache_file = cache_file
+        self.quote = quote
+        self.ttl = ttl
+        self.by_base = {}  # 'BTC' -> 'BTC/USDT'
+
+    def __len__(self):
+        return len(self.by_base)
+
+    def load(self, load_markets):
+        """캐시가 유효하면 캐시에서, 아니면 load_markets()로 받아 캐시에 기록"""
+        cached = self._read_cache()
+        if cached is not None:
+            self.by_base = cached
+            return self
+        self.by_base = self.build(load_markets())
+        self._write_cache()
+        return self
+
+    def warm(self):
+        """기한이 지난 캐시라도 바로 사용 (시작 직후 코인 이름 조회용) - 반환: 캐시가 아직 유효한지"""
+        cache = self._load_cache_file()
+        if not cache or cache.get('quote') != self.quote or not cache.get('markets'):
+            return False
+        self.by_base = cache['markets']
+        return time.time() - cache.get('saved_at', 0) <= self.ttl
+
+    def build(self, markets):
+        """ccxt 마켓 목록 -> 기초자산 사전 (상장 중인 USDT 무기한 선물만)"""
+        by_base = {}
+        for market in markets.values():
+            if market.get('quote') != self.quote or not market.get('swap') or not market.get('linear'):
+                continue
+            if market.get('active') is False:
+                continue
+            by_base[market['base'].upper()] = f"{market['base'].upper()}/{self.quote}"
+        return by_base
+
+    def seed(self, symbols):
+        """알고 있는 심볼을 추가 (마켓 목록을 받지 못했거나 상장 폐지된 감시 심볼)"""
+        for symbol in symbols:
+            base, _, quote = symbol.partition('/')
+            if quote == self.quote:
+                self.by_base.setdefault(base, symbol)
+
+    def resolve(self, coin):
+        """'btc', 'BTC/USDT', 'btcusdt' -> 'BTC/USDT' (상장되지 않았으면 None)"""
+        key = coin.strip().upper().split(':')[0]
+        if '/' in key:
+            key, _, quote = key.partition('/')
+            if quote != self.quote:
+                return None
+        elif key not in self.by_base and key.endswith(self.quote):
+            key = key[:-len(self.quote)]
+        return self.by_base.get(key)
+
+    def _load_cache_file(self):
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_cache(self):
+        cache = self._load_cache_file()
+        if cache is None:
+            return None
+        if cache.get('quote') != self.quote or time.time() - cache.get('saved_at', 0) > self.ttl:
+            return None
+        return cache.get('markets') or None
+
+    def _write_cache(self):
+        tmp = f"{self.cache_file}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': time.time(), 'quote': self.quote, 'markets': self.by_base}, f)
+        os.replace(tmp, self.cache_file)
@@ -1,29 +1,149 @@
+import queue
+import threading
+import time
 import requests
 from datetime import datetime, timedelta, timezone
 import config
-from utils import get_next_candle_close
+import metrics
+from indicators import indicator_name, indicator_label, parse_indicator
+from market import market_index, evict_symbol
+from utils import sync_alert_schedule, tracked_symbols, is_allowed_chat
 
-def send_telegram_message(message):
-    """텔레그램 메시지 전송"""
-    if not config.TOKEN or not config.CHAT_ID:
+# 수신 스레드가 적재하고 메인 루프가 처리하는 명령어 큐
+command_queue = queue.Queue()
+
+# 발신 큐 - 호출자는 적재만 하고 전송은 발신 스레드가 담당
+outbox = queue.Queue()
+send_session = requests.Session()  # keep-alive 연결 재사용 (발신 스레드 전용)
+poll_session = requests.Session()  # 수신 스레드 전용
+last_sent_at = {}                  # 채팅방별 마지막 전송 시각 (monotonic)
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def send_telegram_message(message, chat_id=None, on_sent=None):
+    """텔레그램 메시지 전송 예약 (네트워크를 기다리지 않고 즉시 반환)
+
+    on_sent: 실제 전송이 완료되면 발신 스레드에서 호출할 콜백
+    """
+    chat_id = chat_id or config.CHAT_ID
+    if not config.TOKEN or not chat_id:
         print("Telegram Token or Chat ID not found.")
         return
-    url = f"https://api.telegram.org/bot{config.TOKEN}/sendMessage"
-    payload = {'chat_id': config.CHAT_ID, 'text': message, 'parse_mode': 'Markdown'}
-    try:
-        # 이모지 포함 메시지 처리 시 윈도우/리눅스 공통으로 requests는 내부적으로 utf-8 처리함
-        response = requests.post(url, json=payload, timeout=10)
-        res_json = response.json()
-        if not res_json.get('ok'):
-            print(f"❌ Telegram Error: {res_json.get('description')} | Message: {message[:30]}...")
+    _ensure_dispatcher()
+    outbox.put((str(chat_id), message, on_sent))
+
+def _ensure_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = threading.Thread(target=_dispatch_loop, name='telegram-outbox', daemon=True)
+            _dispatcher.start()
+
+def _dispatch_loop():
+    while True:
+        batch = [outbox.get()]
+        # 같은 틱에 발생한 메시지를 잠시 모아서 한 번에 전송
+        deadline = time.monotonic() + config.SEND_BATCH_WINDOW
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                batch.append(outbox.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        for chat_id, text, callbacks in merge_messages(batch):
+            try:
+                _deliver(chat_id, text)
+            finally:
+                for callback in callbacks:
+                    try:
+                        callback()
+                    except Exception as e:
+                        print(f"Error in send callback: {e}")
+        for _ in batch:
+            outbox.task_done()
+
+def merge_messages(batch):
+    """채팅방별로 메시지를 4096자 이내 묶음으로 병합 -> [(chat_id, text, callbacks)]"""
+    merged = []
+    current = {}  # chat_id -> [text, callbacks]
+    for chat_id, message, on_sent in batch:
+        for chunk in split_message(message):
+            entry = current.get(chat_id)
+            if entry and len(entry[0]) + 2 + len(chunk) <= config.TELEGRAM_MAX_LENGTH:
+                entry[0] += "\n\n" + chunk
+            else:
+                entry = current[chat_id] = [chunk, []]
+                merged.append((chat_id, entry))
+        if on_sent:
+            entry[1].append(on_sent)
+    return [(chat_id, text, callbacks) for chat_id, (text, callbacks) in merged]
+
+def split_message(message):
+    """4096자를 넘는 메시지는 줄 단위로 나눔"""
+    if len(message) <= config.TELEGRAM_MAX_LENGTH:
+        return [message]
+    chunks, current = [], ""
+    for line in message.split("\n"):
+        while len(line) > config.TELEGRAM_MAX_LENGTH:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:config.TELEGRAM_MAX_LENGTH])
+            line = line[config.TELEGRAM_MAX_LENGTH:]
+        if current and len(current) + 1 + len(line) > config.TELEGRAM_MAX_LENGTH:
+            chunks.append(current)
+            current = line
         else:
-            print(f"✅ Message sent successfully: {message[:30]}...")
-    except Exception as e:
-        print(f"Error sending message: {e}")
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _deliver(chat_id, message):
+    """실제 전송 - 채팅방별 전송 간격 유지, 429 retry_after 및 네트워크 오류 재시도"""
+    url = f"{config.TELEGRAM_API_URL}/bot{config.TOKEN}/sendMessage"
+    payload = {'chat_id': chat_id, 'text': message, 'parse_mode': 'Markdown'}
+    backoff = 1
+    for attempt in range(config.SEND_MAX_RETRIES):
+        wait = last_sent_at.get(chat_id, 0) + config.SEND_MIN_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            # 이모지 포함 메시지 처리 시 윈도우/리눅스 공통으로 requests는 내부적으로 utf-8 처리함
+            started = time.perf_counter()
+            response = send_session.post(url, json=payload, timeout=10)
+            last_sent_at[chat_id] = time.monotonic()
+            metrics.send_latency.observe(time.perf_counter() - started)
+            res_json = response.json()
+            if res_json.get('ok'):
+                print(f"✅ Message sent successfully: {message[:30]}...")
+                return True
+            retry_after = res_json.get('parameters', {}).get('retry_after')
+            if response.status_code == 429 and retry_after:
+                print(f"⏳ Telegram rate limit - {retry_after}초 후 재전송", flush=True)
+                metrics.rate_limited.inc('telegram', '')
+                time.sleep(retry_after)
+                continue
+            print(f"❌ Telegram Error: {res_json.get('description')} | Message: {message[:30]}...")
+            metrics.errors.inc('telegram_send', '')
+            return False
+        except Exception as e:
+            print(f"Error sending message: {e}")
+            metrics.errors.inc('telegram_send', '')
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+    print(f"❌ 재시도 초과로 전송 실패 | Message: {message[:30]}...")
+    return False
+
+def flush_messages(timeout=10):
+    """발신 큐가 비워질 때까지 최대 timeout초 대기 (종료 직전 호출)"""
+    deadline = time.monotonic() + timeout
+    while outbox.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.1)
 
 def get_updates():
-    """텔레그램 명령어 수신 및 처리"""
-    url = f"https://api.telegram.org/bot{config.TOKEN}/getUpdates"
+    """텔레그램 명령어 수신 (롱폴링) - 수신한 (채팅방, 명령어)는 command_queue에 적재, 적재한 개수 반환"""
+    url = f"{config.TELEGRAM_API_URL}/bot{config.TOKEN}/getUpdates"
     
     config.get_updates_call_count += 1
     # 20회마다 폴링 상태 로그 출력 (너무 잦은 로그 방지)
@@ -31,13 +151,13 @@ def get_updates():
         print(f"DEBUG: get_updates loop #{config.get_updates_call_count}...", flush=True)
 
     offset = config.last_update_id + 1 if config.last_update_id > 0 else 0 
-    params = {'offset': offset, 'timeout': 5}
-    
-    # `now` 명령어 발생 시 외부에서 상태 보고를 트리거하기 위함
-    trigger_now_report = False
+    params = {'offset': offset, 'timeout': config.POLL_TIMEOUT}
+    queued = 0
     
     try:
-        response = requests.get(url, params=params, timeout=10)
+        started = time.perf_counter()
+        response = poll_session.get(url, params=params, timeout=config.POLL_TIMEOUT + 10)
+        metrics.poll_latency.observe(time.perf_counter() - started)
         res_json = response.json()
         updates = res_json.get('result', [])
         
@@ -47,7 +167,7 @@ def get_updates():
             if 'message' in update:
                 chat_id = str(update['message']['chat']['id'])
                 
-                if chat_id != str(config.CHAT_ID):
+                if not is_allowed_chat(chat_id):
                     print(f"Ignored message from unknown chat_id: {chat_id}")
                     continue
                 
@@ -55,166 +175,338 @@ def get_updates():
                     raw_cmd = update['message']['text'].strip().lower()
                     raw_cmd = " ".join(raw_cmd.split())
                     
-                    print(f"📩 Received command: {raw_cmd}", flush=True)
-
-                    # 명령어 분기
-                    if raw_cmd in config.SUPPORTED_TIMEFRAME:
-                        config.TIMEFRAME = raw_cmd
-                        config.next_alert_time = get_next_candle_close(raw_cmd)
-                        kst_time = config.next_alert_time + timedelta(hours=9)
-                        send_telegram_message(f"✅ 타임프레임이 *{raw_cmd}*로 변경되었습니다.\n🕒 다음 알람 체크: {kst_time.strftime('%H:%M:%S')} (KST)")
-                    
-                    elif raw_cmd == 'report on':
-                        config.is_report_enabled = True
-                        send_telegram_message("✅ 정기 리포트가 *활성화*되었습니다.")
-                    
-                    elif raw_cmd == 'report off':
-                        config.is_report_enabled = False
-                        send_telegram_message("✅ 정기 리포트가 *비활성화*되었습니다.")
-                    
-                    elif raw_cmd.startswith('interval '):
-                        try:
-                            interval_val = int(raw_cmd.split()[1])
-                            if 10 <= interval_val <= 3600:
-                                config.INTERVAL_SECONDS = interval_val
-                                send_telegram_message(f"✅ 리포트 간격이 *{interval_val}초*로 변경되었습니다.")
-                            else:
-                                send_telegram_message("❌ 간격은 10초에서 3600초(60분) 사이여야 합니다.")
-                        except ValueError:
-                            send_telegram_message("❌ 올바른 숫자를 입력하세요. 예: `interval 60`")
-                    
-                    elif raw_cmd.startswith('alert '):
-                        target = raw_cmd.replace('alert ', '').strip()
-                        if target in config.ALIGNMENT_MAP: target = config.ALIGNMENT_MAP[target]
-                        
-                        if target in config.ALIGNMENT_MAP.values():
-                            config.target_alignment = target
-                            config.alert_sent_state = {symbol: False for symbol in config.SYMBOLS}
-                            config.next_alert_time = get_next_candle_close(config.TIMEFRAME)
-                            kst_time = config.next_alert_time + timedelta(hours=9)
-                            send_telegram_message(f"🎯 알람 타겟이 *{target}*로 설정되었습니다.\n🕒 다음 체크: {kst_time.strftime('%H:%M:%S')} (KST)")
-                        elif target == 'off':
-                            config.target_alignment = None
-                            config.next_alert_time = None
-                            send_telegram_message("🚫 타겟 알람이 해제되었습니다.")
-                        else:
-                            send_telegram_message("❓ 지원하지 않는 옵션입니다.")
-
-                    elif raw_cmd.startswith('trend '):
-                        parts = raw_cmd.split()
-                        try:
-                            if len(parts) == 9:
-                                _, coin, d1, t1, p1, d2, t2, p2, direction = parts
-                                curr_year = datetime.now().year
-                                # Parse to UTC timestamp Assuming KST input (UTC+9)
-                                dt1_str = f"{curr_year}/{d1} {t1}"
-                                dt2_str = f"{curr_year}/{d2} {t2}"
-                                dt1 = datetime.strptime(dt1_str, "%Y/%m/%d %H:%M") - timedelta(hours=9)
-                                dt2 = datetime.strptime(dt2_str, "%Y/%m/%d %H:%M") - timedelta(hours=9)
-                                p1, p2 = float(p1), float(p2)
-                                
-                                if dt1 >= dt2:
-                                    send_telegram_message("❌ 두 번째 꺾이는 점의 시간이 첫 번째보다 느려야 합니다.")
-                                    continue
-                                if direction not in ['up', 'down']:
-                                    send_telegram_message("❌ 방향은 up 또는 down 이어야 합니다.")
-                                    continue
-                                
-                                symbol_key = [s for s in config.SYMBOLS if coin.upper() in s]
-                                if symbol_key:
-                                    symbol = symbol_key[0]
-                                    config.active_trendlines[symbol] = {
-                                        't1': dt1.replace(tzinfo=timezone.utc).timestamp(), 'p1': p1,
-                                        't2': dt2.replace(tzinfo=timezone.utc).timestamp(), 'p2': p2,
-                                        'direction': direction
-                                    }
-                                    send_telegram_message(f"📈 *추세선 알람 설정 완료* ({symbol})\n점1: {d1} {t1} (${p1})\n점2: {d2} {t2} (${p2})\n조건: {direction} (종가 기준돌파)")
-                                else:
-                                    send_telegram_message("❌ 지원하지 않는 코인입니다.")
-                                    
-                            elif len(parts) == 3 and parts[1] == 'off':
-                                coin = parts[2]
-                                symbol_key = [s for s in config.SYMBOLS if coin.upper() in s]
-                                if symbol_key:
-                                    symbol = symbol_key[0]
-                                    if symbol in config.active_trendlines:
-                                        del config.active_trendlines[symbol]
-                                        send_telegram_message(f"🚫 {symbol} 추세선 알람이 해제되었습니다.")
-                                    else:
-                                        send_telegram_message(f"❓ {symbol}에 설정된 추세선이 없습니다.")
-                                else:
-                                    send_telegram_message("❌ 지원하지 않는 코인입니다.")
-                            else:
-                                send_telegram_message("❓ 형식 오류!\n설정: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`\n해제: `trend off btc`")
-                        except ValueError:
-                            send_telegram_message("❌ 형식 오류! 형식에 맞게 입력해주세요.\n예: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`")
-
- 
-                    elif raw_cmd == 'now':
-                        trigger_now_report = True
-                    
-                    elif raw_cmd == 'status':
-                        interval_min = config.INTERVAL_SECONDS // 60
-                        interval_sec = config.INTERVAL_SECONDS % 60
-                        interval_str = f"{interval_min}분 {interval_sec}초" if interval_sec else f"{interval_min}분"
-                        report_status = f"✅ ON ({interval_str} 주기)" if config.is_report_enabled else "❌ OFF"
-                        alert_status = f"🔔 ON ({config.target_alignment})" if config.target_alignment else "🔕 OFF"
-                        # 다음 알람 체크 시각 표시
-                        if config.next_alert_time and (config.target_alignment or config.active_trendlines):
-                            kst_time = config.next_alert_time + timedelta(hours=9)
-                            next_check_str = kst_time.strftime('%H:%M:%S')
-                        else:
-                            next_check_str = "설정 안됨"
-                            
-                        # 추세선 알람 상태 문자열 생성
-                        if config.active_trendlines:
-                            trend_lines = ["📈 *활성 추세선:*"]
-                            for sym, data in config.active_trendlines.items():
-                                trend_lines.append(f"  • {sym}: {data['direction']}")
-                            trend_status = "\n".join(trend_lines) + "\n"
-                        else:
-                            trend_status = "📉 *활성 추세선:* 없음\n"
-
-                        msg = "⚙️ *모니터링 설정 현황*\n\n" \
-                              f"• 타임프레임: `{config.TIMEFRAME}`\n" \
-                              f"• 정기 리포트: `{report_status}`\n" \
-                              f"• 지정 타겟 알람: `{alert_status}`\n" \
-                              f"{trend_status}" \
-                              f"• 다음 알람 체크: `{next_check_str} (KST)`"
-                        send_telegram_message(msg)
- 
-                    elif raw_cmd in ['help', '/start']:
-                        timeframes_str = ", ".join(config.SUPPORTED_TIMEFRAME)
-                        align_list = "\n".join([f"  {k}: {v}" for k, v in config.ALIGNMENT_MAP.items()])
-                        msg = f"🤖 *SMA 모니터 명령어 가이드*\n\n" \
-                              f"📊 *리포트 설정*\n" \
-                              f"• `report on/off`: 리포트 켜기/끄기\n" \
-                              f"• `interval [초]`: 리포트 간격 설정 (예: `interval 60`)\n\n" \
-                              f"🎯 *타겟 알림 (이평선)*\n" \
-                              f"• `alert [번호]`: 특정 배열 시 알람 설정\n{align_list}\n" \
-                              f"• `alert off`: 알람 해제\n\n" \
-                              f"📈 *추세선 돌파 알림*\n" \
-                              f"• `trend [코인] [월/일] [시:분] [가격] [월/일] [시:분] [가격] [up/down]`\n" \
-                              f"  (예: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`)\n" \
-                              f"• `trend off [코인]`: 추세선 알람 끄기 (예: `trend off btc`)\n\n" \
-                              f"⚙️ *기타 명령어*\n" \
-                              f"• `status`: 현재 설정 + 다음 체크 시각 확인\n" \
-                              f"• `now`: 즉시 상황 보고\n\n" \
-                              f"🕒 *타임프레임 변경*\n" \
-                              f"• `{timeframes_str}` 중 하나 입력\n" \
-                              f"  (예: `15m` 또는 `1h` 입력 시 즉시 변경)\n\n" \
-                              f"💡 *알람 체크 방식*\n" \
-                              f"• 설정된 봉이 마감될 때 자동 체크됩니다\n" \
-                              f"• 예) 15m봉 → 매 :00, :15, :30, :45에 체크\n" \
-                              f"• 예) 4h봉 → 09:00, 13:00, 17:00, 21:00, 01:00, 05:00에 체크"
-                        send_telegram_message(msg)
-                    
-                    else:
-                        send_telegram_message("❓ 인식할 수 없는 명령어입니다. 'help'를 입력해 사용 가능한 명령어를 확인하세요.")
+                    print(f"📩 Received command ({chat_id}): {raw_cmd}", flush=True)
+                    command_queue.put((chat_id, raw_cmd))
+                    metrics.commands.inc(chat_id)
+                    queued += 1
                 else:
                     print("DEBUG: Received non-text message", flush=True)
                     
     except Exception as e:
         print(f"Error getting updates: {e}", flush=True)
-        
-    return trigger_now_report
+        metrics.errors.inc('telegram_poll', '')
+        time.sleep(5)  # 네트워크 오류 시 재시도 간격
+    return queued
+
+def start_command_listener(on_command=None):
+    """명령어 수신 전용 스레드 시작 (메인 루프를 막지 않음)
+
+    on_command: 명령어를 적재한 뒤 호출할 콜백 (잠든 메인 루프 깨우기)
+    """
+    def listen():
+        while True:
+            if get_updates() and on_command is not None:
+                on_command()
+    thread = threading.Thread(target=listen, name='telegram-intake', daemon=True)
+    thread.start()
+    return thread
+
+def process_commands(timeout=0):
+    """대기 중인 명령어 처리 - 최대 timeout초 동안 첫 명령어를 기다림
+
+    반환: (`now` 명령어를 보낸 채팅방 ID 집합, 명령어를 보낸 채팅방 ID 집합)
+    """
+    now_requests, handled = set(), set()
+    try:
+        chat_id, raw_cmd = command_queue.get(timeout=timeout) if timeout > 0 else command_queue.get_nowait()
+        while True:
+            if handle_command(chat_id, raw_cmd):
+                now_requests.add(chat_id)
+            handled.add(chat_id)
+            chat_id, raw_cmd = command_queue.get_nowait()
+    except queue.Empty:
+        pass
+    return now_requests, handled
+
+def release_symbol(symbol):
+    """리포트/알람 어디에도 쓰이지 않게 된 심볼의 상태 정리"""
+    if symbol not in tracked_symbols():
+        evict_symbol(symbol)
+
+def handle_command(chat_id, raw_cmd):
+    """채팅방 하나의 명령어 한 건 처리 (메인 루프에서 호출) - `now` 명령어면 True 반환"""
+    chat = config.chats.get_or_create(chat_id)
+
+    def reply(message):
+        send_telegram_message(message, chat.chat_id)
+
+    # 명령어 분기
+    if raw_cmd in config.SUPPORTED_TIMEFRAME:
+        chat.timeframe = raw_cmd
+        chat.extra_timeframes = [tf for tf in chat.extra_timeframes if tf != raw_cmd]
+        config.chats.update(chat)
+        sync_alert_schedule()
+        kst_time = config.next_alert_times[raw_cmd] + timedelta(hours=9)
+        reply(f"✅ 타임프레임이 *{raw_cmd}*로 변경되었습니다.\n🕒 다음 알람 체크: {kst_time.strftime('%H:%M:%S')} (KST)")
+    
+    elif raw_cmd.startswith('tf '):
+        parts = raw_cmd.split()
+        if len(parts) == 3 and parts[1] in ['add', 'del'] and parts[2] in config.SUPPORTED_TIMEFRAME:
+            action, timeframe = parts[1], parts[2]
+            if action == 'add' and timeframe not in chat.timeframes():
+                chat.extra_timeframes.append(timeframe)
+            elif action == 'del':
+                if timeframe == chat.timeframe:
+                    reply("❌ 기본 타임프레임은 제거할 수 없습니다. 다른 타임프레임을 입력해 변경하세요.")
+                    return False
+                chat.extra_timeframes = [tf for tf in chat.extra_timeframes if tf != timeframe]
+            config.chats.update(chat)
+            sync_alert_schedule()
+            reply(f"✅ 감시 타임프레임: *{', '.join(chat.timeframes())}*")
+        else:
+            reply("❓ 형식 오류!\n추가: `tf add 1h`\n제거: `tf del 1h`")
+    
+    elif raw_cmd.startswith('coin '):
+        parts = raw_cmd.split()
+        if len(parts) >= 3 and parts[1] in ['add', 'del']:
+            action, coins = parts[1], parts[2:]
+            symbols = [market_index.resolve(coin) for coin in coins]
+            unknown = [coin for coin, symbol in zip(coins, symbols) if symbol is None]
+            if unknown:
+                reply(f"❌ 거래 가능한 심볼이 아닙니다: {', '.join(unknown)}")
+                return False
+            if action == 'add':
+                added = [s for s in dict.fromkeys(symbols) if s not in chat.symbols]
+                if len(set(tracked_symbols()) | set(added)) > config.MAX_SYMBOLS:
+                    reply(f"❌ 감시 심볼은 전체 최대 {config.MAX_SYMBOLS}개까지 가능합니다.")
+                    return False
+                chat.symbols = chat.symbols + added
+                config.chats.update(chat)
+            else:
+                chat.symbols = [s for s in chat.symbols if s not in symbols]
+                config.chats.update(chat)
+                for symbol in symbols:
+                    release_symbol(symbol)
+            reply(f"✅ 감시 심볼 ({len(chat.symbols)}개): {', '.join(chat.symbols) or '없음'}")
+        else:
+            reply("❓ 형식 오류!\n추가: `coin add btc eth`\n제거: `coin del xrp`")
+    
+    elif raw_cmd == 'report on':
+        chat.is_report_enabled = True
+        reply("✅ 정기 리포트가 *활성화*되었습니다.")
+    
+    elif raw_cmd == 'report off':
+        chat.is_report_enabled = False
+        reply("✅ 정기 리포트가 *비활성화*되었습니다.")
+    
+    elif raw_cmd.startswith('interval '):
+        try:
+            interval_val = int(raw_cmd.split()[1])
+            if 10 <= interval_val <= 3600:
+                chat.interval_seconds = interval_val
+                reply(f"✅ 리포트 간격이 *{interval_val}초*로 변경되었습니다.")
+            else:
+                reply("❌ 간격은 10초에서 3600초(60분) 사이여야 합니다.")
+        except ValueError:
+            reply("❌ 올바른 숫자를 입력하세요. 예: `interval 60`")
+    
+    elif raw_cmd.startswith('alert '):
+        target = raw_cmd.replace('alert ', '').strip()
+        if target in config.ALIGNMENT_MAP: target = config.ALIGNMENT_MAP[target]
+    
+        if target in config.ALIGNMENT_MAP.values():
+            chat.target_alignment = target
+            config.chats.update(chat, reset_alerts=True)
+            sync_alert_schedule()
+            kst_time = min(config.next_alert_times[tf] for tf in chat.timeframes()) + timedelta(hours=9)
+            reply(f"🎯 알람 타겟이 *{target}*로 설정되었습니다.\n🕒 다음 체크: {kst_time.strftime('%H:%M:%S')} (KST)")
+        elif target == 'off':
+            chat.target_alignment = None
+            config.chats.update(chat)
+            reply("🚫 타겟 알람이 해제되었습니다.")
+        else:
+            reply("❓ 지원하지 않는 옵션입니다.")
+    
+    elif raw_cmd.startswith('cross '):
+        parts = raw_cmd.split()
+        try:
+            if len(parts) == 2 and parts[1] == 'off':
+                chat.crosses = []
+                config.chats.update(chat)
+                reply("🚫 크로스 알람이 모두 해제되었습니다.")
+            elif len(parts) == 4 and parts[1] == 'del':
+                pair = [indicator_name(parts[2]), indicator_name(parts[3])]
+                if pair in chat.crosses:
+                    chat.crosses = [p for p in chat.crosses if p != pair]
+                    config.chats.update(chat)
+                    reply(f"🚫 {indicator_label(pair[0])} ↔ {indicator_label(pair[1])} 크로스 알람이 해제되었습니다.")
+                else:
+                    reply("❓ 설정된 크로스 알람이 아닙니다.")
+            elif len(parts) == 3:
+                pair = [indicator_name(parts[1]), indicator_name(parts[2])]
+                if pair[0] == pair[1]:
+                    reply("❌ 서로 다른 두 지표를 입력하세요.")
+                    return False
+                if max(parse_indicator(name)[1] for name in pair) > config.CANDLE_LIMIT:
+                    reply(f"❌ 지표 기간은 {config.CANDLE_LIMIT} 이하여야 합니다.")
+                    return False
+                if pair not in chat.crosses:
+                    chat.crosses = chat.crosses + [pair]
+                config.chats.update(chat)
+                sync_alert_schedule()
+                reply(f"⚔️ 크로스 알람 설정: *{indicator_label(pair[0])} ↔ {indicator_label(pair[1])}* ({', '.join(chat.timeframes())})\n"
+                      f"{indicator_label(pair[0])}가 {indicator_label(pair[1])}를 상향/하향 돌파한 봉이 마감되면 알립니다.")
+            else:
+                reply("❓ 형식 오류!\n설정: `cross ema9 sma25`\n해제: `cross del ema9 sma25` 또는 `cross off`")
+        except ValueError:
+            reply("❌ 지표는 sma/ema/wma + 기간 형식이어야 합니다. 예: `cross ema9 sma25`")
+    
+    elif raw_cmd.startswith('trend '):
+        parts = raw_cmd.split()
+        try:
+            if len(parts) == 9:
+                _, coin, d1, t1, p1, d2, t2, p2, direction = parts
+                curr_year = datetime.now().year
+                # Parse to UTC timestamp Assuming KST input (UTC+9)
+                dt1_str = f"{curr_year}/{d1} {t1}"
+                dt2_str = f"{curr_year}/{d2} {t2}"
+                dt1 = datetime.strptime(dt1_str, "%Y/%m/%d %H:%M") - timedelta(hours=9)
+                dt2 = datetime.strptime(dt2_str, "%Y/%m/%d %H:%M") - timedelta(hours=9)
+                p1, p2 = float(p1), float(p2)
+    
+                if dt1 >= dt2:
+                    reply("❌ 두 번째 꺾이는 점의 시간이 첫 번째보다 느려야 합니다.")
+                    return False
+                if direction not in ['up', 'down']:
+                    reply("❌ 방향은 up 또는 down 이어야 합니다.")
+                    return False
+    
+                symbol = market_index.resolve(coin)
+                if symbol:
+                    # 추세선은 등록 시점의 기본 타임프레임 종가로 판정
+                    line = config.active_trendlines.add(
+                        symbol,
+                        dt1.replace(tzinfo=timezone.utc).timestamp(), p1,
+                        dt2.replace(tzinfo=timezone.utc).timestamp(), p2,
+                        direction, chat.timeframe, chat.chat_id
+                    )
+                    sync_alert_schedule()
+                    reply(f"📈 *추세선 알람 설정 완료* ({symbol} #{line.id}, {line.timeframe})\n점1: {d1} {t1} (${p1})\n점2: {d2} {t2} (${p2})\n조건: {direction} (종가 기준돌파)")
+                else:
+                    reply("❌ 지원하지 않는 코인입니다.")
+    
+            elif len(parts) == 3 and parts[1] == 'off':
+                symbol = market_index.resolve(parts[2])
+                if symbol:
+                    removed = config.active_trendlines.remove_symbol(symbol, chat.chat_id)
+                    release_symbol(symbol)
+                    if removed:
+                        reply(f"🚫 {symbol} 추세선 알람 {removed}개가 해제되었습니다.")
+                    else:
+                        reply(f"❓ {symbol}에 설정된 추세선이 없습니다.")
+                else:
+                    reply("❌ 지원하지 않는 코인입니다.")
+    
+            elif len(parts) == 3 and parts[1] == 'del':
+                line_id = int(parts[2].lstrip('#'))
+                line = config.active_trendlines.lines.get(line_id)
+                if line and line.chat_id == chat.chat_id:
+                    config.active_trendlines.remove(line_id)
+                    release_symbol(line.symbol)
+                    reply(f"🚫 {line.symbol} 추세선 #{line.id} 알람이 해제되었습니다.")
+                else:
+                    reply(f"❓ #{line_id} 추세선이 없습니다.")
+            else:
+                reply("❓ 형식 오류!\n설정: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`\n해제: `trend off btc` 또는 `trend del 3`")
+        except ValueError:
+            reply("❌ 형식 오류! 형식에 맞게 입력해주세요.\n예: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`")
+    
+    
+    elif raw_cmd == 'now':
+        # `now` 명령어 발생 시 외부에서 상태 보고를 트리거하기 위함
+        return True
+    
+    elif raw_cmd == 'status':
+        interval_min = chat.interval_seconds // 60
+        interval_sec = chat.interval_seconds % 60
+        interval_str = f"{interval_min}분 {interval_sec}초" if interval_sec else f"{interval_min}분"
+        report_status = f"✅ ON ({interval_str} 주기)" if chat.is_report_enabled else "❌ OFF"
+        alert_status = f"🔔 ON ({chat.target_alignment})" if chat.target_alignment else "🔕 OFF"
+        cross_status = ", ".join(f"{indicator_label(a)}↔{indicator_label(b)}" for a, b in chat.crosses) or "없음"
+        chat_lines = config.active_trendlines.for_chat(chat.chat_id)
+        # 다음 알람 체크 시각 표시 (타임프레임별)
+        if chat.target_alignment or chat.crosses or chat_lines:
+            alert_timeframes = dict.fromkeys([*chat.timeframes(), *(line.timeframe for line in chat_lines)])
+            next_check_str = ", ".join(f"{tf} {(config.next_alert_times[tf] + timedelta(hours=9)).strftime('%H:%M:%S')}"
+                                       for tf in alert_timeframes if tf in config.next_alert_times)
+        else:
+            next_check_str = "설정 안됨"
+    
+        # 추세선 알람 상태 문자열 생성
+        if chat_lines:
+            trend_lines = ["📈 *활성 추세선:*"]
+            for line in chat_lines:
+                trend_lines.append(f"  • {line.symbol} #{line.id}: {line.direction} ({line.timeframe})")
+            trend_status = "\n".join(trend_lines) + "\n"
+        else:
+            trend_status = "📉 *활성 추세선:* 없음\n"
+    
+        msg = "⚙️ *모니터링 설정 현황*\n\n" \
+              f"• 감시 심볼: `{', '.join(chat.symbols) or '없음'}`\n" \
+              f"• 타임프레임: `{', '.join(chat.timeframes())}`\n" \
+              f"• 정기 리포트: `{report_status}`\n" \
+              f"• 지정 타겟 알람: `{alert_status}`\n" \
+              f"• 크로스 알람: `{cross_status}`\n" \
+              f"{trend_status}" \
+              f"• 다음 알람 체크: `{next_check_str} (KST)`\n" \
+              f"• 마감→알람 지연: `{metrics.alert_latency.summary()}`"
+        reply(msg)
+    
+    elif raw_cmd == 'metrics':
+        def top(counter):
+            items = [f"{source} {symbol}".strip() + f" {value}" for (source, symbol), value in counter.top(5)]
+            return ", ".join(items) or "없음"
+        endpoint = f"http://{config.METRICS_HOST}:{config.METRICS_PORT}/metrics" if config.METRICS_PORT else "꺼짐"
+        msg = "📈 *계측 현황*\n\n" \
+              f"• 거래소 조회 (심볼당): `{metrics.fetch_latency.summary()}`\n" \
+              f"• SMA 계산 (타임프레임당): `{metrics.sma_latency.summary()}`\n" \
+              f"• 메인 루프 틱: `{metrics.tick_latency.summary()}`\n" \
+              f"• 텔레그램 전송: `{metrics.send_latency.summary()}`\n" \
+              f"• 텔레그램 수신 (롱폴링): `{metrics.poll_latency.summary()}`\n" \
+              f"• 마감→알람 지연: `{metrics.alert_latency.summary()}`\n" \
+              f"• 오류 {metrics.errors.total()}건: `{top(metrics.errors)}`\n" \
+              f"• 요청 한도 {metrics.rate_limited.total()}건: `{top(metrics.rate_limited)}`\n" \
+              f"• 엔드포인트: `{endpoint}`"
+        reply(msg)
+    
+    elif raw_cmd in ['help', '/start']:
+        timeframes_str = ", ".join(config.SUPPORTED_TIMEFRAME)
+        align_list = "\n".join([f"  {k}: {v}" for k, v in list(config.ALIGNMENT_MAP.items())[:6]])
+        if len(config.ALIGNMENT_MAP) > 6:
+            align_list += f"\n  ... 외 {len(config.ALIGNMENT_MAP) - 6}개 (`alert {config.ALIGNMENT_MAP['1']}` 형식으로도 지정)"
+        msg = f"🤖 *SMA 모니터 명령어 가이드*\n\n" \
+              f"📊 *리포트 설정*\n" \
+              f"• `report on/off`: 리포트 켜기/끄기\n" \
+              f"• `interval [초]`: 리포트 간격 설정 (예: `interval 60`)\n\n" \
+              f"🎯 *타겟 알림 (이평선)*\n" \
+              f"• `alert [번호]`: 특정 배열 시 알람 설정\n{align_list}\n" \
+              f"• `alert off`: 알람 해제\n\n" \
+              f"⚔️ *크로스 알림 (SMA/EMA/WMA)*\n" \
+              f"• `cross [지표] [지표]`: 앞 지표가 뒤 지표를 상향/하향 돌파하면 알람 (예: `cross ema9 sma25`)\n" \
+              f"• `cross del [지표] [지표]` / `cross off`: 크로스 알람 해제\n\n" \
+              f"📈 *추세선 돌파 알림*\n" \
+              f"• `trend [코인] [월/일] [시:분] [가격] [월/일] [시:분] [가격] [up/down]`\n" \
+              f"  (예: `trend btc 02/24 09:00 90000 02/25 09:00 95000 up`)\n" \
+              f"• `trend off [코인]`: 코인의 추세선 알람 모두 끄기 (예: `trend off btc`)\n" \
+              f"• `trend del [번호]`: 특정 추세선만 끄기 (예: `trend del 3`)\n\n" \
+              f"🪙 *감시 심볼*\n" \
+              f"• `coin add [코인...]`: 감시 심볼 추가 (예: `coin add doge pepe`)\n" \
+              f"• `coin del [코인...]`: 감시 심볼 제거 (예: `coin del xrp`)\n\n" \
+              f"⚙️ *기타 명령어*\n" \
+              f"• `status`: 현재 설정 + 다음 체크 시각 확인\n" \
+              f"• `metrics`: 조회/계산/전송 지연과 오류 통계\n" \
+              f"• `now`: 즉시 상황 보고\n\n" \
+              f"🕒 *타임프레임 변경*\n" \
+              f"• `{timeframes_str}` 중 하나 입력\n" \
+              f"  (예: `15m` 또는 `1h` 입력 시 즉시 변경)\n" \
+              f"• `tf add/del [타임프레임]`: 추가 타임프레임 동시 감시 (예: `tf add 1h`)\n\n" \
+              f"💡 *알람 체크 방식*\n" \
+              f"• 설정된 봉이 마감될 때 자동 체크됩니다\n" \
+              f"• 예) 15m봉 → 매 :00, :15, :30, :45에 체크\n" \
+              f"• 예) 4h봉 → 09:00, 13:00, 17:00, 21:00, 01:00, 05:00에 체크\n" \
+              f"• 설정은 채팅방마다 따로 저장됩니다"
+        reply(msg)
+    
+    else:
+        reply("❓ 인식할 수 없는 명령어입니다. 'help'를 입력해 사용 가능한 명령어를 확인하세요.")
+    return False
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+import market
+from fakes import FakeExchange
+from subscriptions import ChatRegistry
+from trendlines import TrendlineRegistry
+from utils import server_time
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    """테스트마다 전역 상태(채팅방, 캔들 저장소, 시각 보정 등)를 새로 시작"""
+    monkeypatch.setattr(config, 'chats', ChatRegistry(config.DEFAULT_SYMBOLS, config.DEFAULT_TIMEFRAME,
+                                                      config.DEFAULT_INTERVAL_SECONDS, config.SMA_PERIODS))
+    monkeypatch.setattr(config, 'active_trendlines', TrendlineRegistry())
+    monkeypatch.setattr(config, 'next_alert_times', {})
+    monkeypatch.setattr(config, 'missed_closes', {})
+    monkeypatch.setattr(config, 'clock_offset', 0.0)
+    for name in ('candle_store', 'sma_states', 'resamplers', 'persisted_ts', 'fetch_latency'):
+        monkeypatch.setattr(market, name, {})
+
+
+@pytest.fixture
+def fake_exchange(monkeypatch):
+    """market.exchange를 서버 시각(config.clock_offset 포함)을 따르는 가짜 거래소로 교체"""
+    exchange = FakeExchange(config.DEFAULT_SYMBOLS, clock=server_time)
+    # 모듈 __getattr__이 실제 거래소를 만들지 않도록 모듈 사전에 직접 대입
+    monkeypatch.setitem(vars(market), 'exchange', exchange)
+    return exchange
@@ -0,0 +1,78 @@
+import math
+import time
+
+import numpy as np
+
+import backtest
+import config
+import market
+import sma_monitor
+import storage
+from resampler import resample_array
+from scanner import rolling_smas, alignment_codes
+from utils import server_time
+
+SYMBOL = 'BTC/USDT'
+TIMEFRAME = '5m'
+START = 1_700_000_000_000 // 300_000 * 300_000
+
+
+def base_rows(count):
+    """사인파 + 완만한 상승 1m 봉 (배열 진입/이탈이 여러 번 생기는 시리즈)"""
+    rows = []
+    for i in range(count):
+        close = 100 + 10 * math.sin(2 * math.pi * i / 300) + i / 200
+        rows.append([START + i * 60_000, close, close + 0.5, close - 0.5, close, 1.0])
+    return rows
+
+
+def test_backtest_matches_live_alerts(monkeypatch, tmp_path, capsys):
+    rows = base_rows(2000)
+    end_s = (START + len(rows) * 60_000) / 1000
+    target = config.ALIGNMENT_MAP['1']
+
+    # 실시간: 같은 5m 봉을 마감 시각마다 스냅샷으로 만들어 evaluate_alerts로 평가
+    chat = config.chats.get_or_create('a')
+    chat.symbols = [SYMBOL]
+    chat.target_alignment = target
+    config.chats.update(chat, reset_alerts=True)
+    # 첫 번째 선은 두 번째 점(구간 끝) 이전에 돌파됨 - 등록 시점부터 평가하는 실시간 규칙과 같아야 함
+    specs = [(START / 1000, 108.0, end_s, 108.0, 'up'), (START / 1000 + 3600, 95.0, end_s - 3600, 97.0, 'down')]
+    for t1, p1, t2, p2, direction in specs:
+        config.active_trendlines.add(SYMBOL, t1, p1, t2, p2, direction, TIMEFRAME, chat_id='a')
+    lines = list(config.active_trendlines)
+
+    live = []
+    monkeypatch.setattr(sma_monitor, 'send_alert', lambda msg, tf, chat_id=None: live.append(
+        (backtest.kst_str(server_time() * 1000), '🎯' if '타겟' in msg else msg.split('(#')[1].split(')')[0])))
+
+    bars = resample_array(np.array(rows, dtype=float), 300_000, 60_000)
+    smas = rolling_smas(bars[:, 4], config.SMA_PERIODS)
+    codes = alignment_codes(smas)
+    for bar, row, code in zip(bars, smas, codes):
+        monkeypatch.setattr(config, 'clock_offset', (bar[0] + 300_000) / 1000 - time.time())
+        snapshot = market.MarketSnapshot(TIMEFRAME, [SYMBOL])
+        snapshot.valid[0] = True
+        snapshot.closes[0] = bar[4]
+        snapshot.smas[0] = row
+        snapshot.codes[0] = code
+        sma_monitor.evaluate_alerts(snapshot)
+
+    # 백테스트: 같은 1m 봉을 저장소에 넣고 오프라인 실행
+    monkeypatch.setattr(storage, '_conn', None)
+    storage.open_store(str(tmp_path / 'history.db'))
+    storage.save_candles(SYMBOL, config.BASE_TIMEFRAME, rows)
+    results = backtest.run([SYMBOL], [TIMEFRAME], START, START + len(rows) * 60_000, target, lines, offline=True)
+    storage._conn.close()
+
+    replayed = []
+    for line in capsys.readouterr().out.splitlines():
+        if ' KST | ' in line:
+            when, _, text = line.split(' | ')
+            replayed.append((when.removesuffix(' KST'), '🎯' if text.startswith('🎯') else text.split('#')[1].split()[0]))
+
+    assert sorted(replayed) == sorted(live)
+    assert sum(what == '🎯' for _, what in live) >= 2
+    assert {what for _, what in live} >= {str(line.id) for line in lines}
+    up = next(r for r in results if r['rule'] == f"trend #{lines[0].id}")
+    assert backtest.parse_kst(up['fired_at'].replace('-', '/')) < lines[0].t2
@@ -0,0 +1,194 @@
+import time
+
+import ccxt
+import pytest
+
+import config
+import market
+import sma_monitor
+from exchange_client import CircuitBreaker, CircuitOpenError, ResilientExchange
+from fakes import FakeExchange
+from indicators import IndicatorState
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RecordingLimiter:
+    def __init__(self):
+        self.paused = []
+
+    def pause(self, seconds):
+        self.paused.append(seconds)
+
+
+def resilient(exchange, clock, **kwargs):
+    """sleep과 회로 차단기 시각을 가짜 시계에 연결한 래퍼"""
+    client = ResilientExchange(exchange, sleep=clock.advance, **kwargs)
+    for breaker in client.breakers.values():
+        breaker.clock = clock
+    return client
+
+
+def test_retries_transient_errors_until_success():
+    clock = FakeClock()
+    exchange = FakeExchange(['BTC/USDT'], clock=clock)
+    client = resilient(exchange, clock, retries=3, base_delay=0.5, max_delay=2.0)
+    exchange.outage(0.2)  # 첫 요청만 실패하고 재시도 대기(0.25초 이상) 후 복구
+
+    assert client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert exchange.faults == 1
+    assert exchange.calls == 1
+    assert client.breakers['fetch_ohlcv'].state == 'closed'
+
+
+def test_gives_up_after_retries():
+    clock = FakeClock()
+    exchange = FakeExchange(['BTC/USDT'], clock=clock)
+    client = resilient(exchange, clock, retries=2, breaker_threshold=10)
+    exchange.outage(3600)
+
+    with pytest.raises(ccxt.ExchangeNotAvailable):
+        client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert exchange.faults == 3
+
+
+def test_request_errors_are_not_retried():
+    clock = FakeClock()
+    exchange = FakeExchange(['BTC/USDT'], clock=clock)
+    client = resilient(exchange, clock, retries=3, breaker_threshold=1)
+
+    def bad_symbol(*args, **kwargs):
+        exchange.faults += 1
+        raise ccxt.BadSymbol("unknown symbol")
+
+    exchange.fetch_ohlcv = bad_symbol
+    with pytest.raises(ccxt.BadSymbol):
+        client.fetch_ohlcv('NOPE/USDT')
+    assert exchange.faults == 1
+    assert client.breakers['fetch_ohlcv'].state == 'closed'
+
+
+def test_breaker_opens_and_probes_once_half_open():
+    clock = FakeClock()
+    exchange = FakeExchange(['BTC/USDT'], clock=clock)
+    client = resilient(exchange, clock, retries=0, breaker_threshold=3, breaker_timeout=30)
+    breaker = client.breakers['fetch_ohlcv']
+    exchange.outage(3600)
+
+    for _ in range(3):
+        with pytest.raises(ccxt.ExchangeNotAvailable):
+            client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert breaker.state == 'open'
+    assert client.open_circuits() == 1
+
+    # 열린 동안은 거래소에 요청하지 않음
+    with pytest.raises(CircuitOpenError):
+        client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert exchange.faults == 3
+    assert client.retry_after() == pytest.approx(30)
+
+    # 반열림: 시험 요청 하나만 허용 - 실패하면 다시 열림
+    clock.advance(30)
+    assert breaker.state == 'half-open'
+    with pytest.raises(ccxt.ExchangeNotAvailable):
+        client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert exchange.faults == 4
+    assert breaker.state == 'open'
+
+    # 다음 시험 요청이 성공하면 닫힘
+    clock.advance(30)
+    exchange.outage_until = 0.0
+    assert client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert breaker.state == 'closed'
+    assert client.open_circuits() == 0
+
+
+def test_half_open_allows_a_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker('fetch_ohlcv', threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.advance(10)
+    assert breaker.allow()
+    assert not breaker.allow()  # 시험 요청 결과가 나오기 전 다른 요청은 차단
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_rate_limit_pauses_limiter_without_retry():
+    clock = FakeClock()
+    exchange = FakeExchange(['BTC/USDT'], clock=clock, fault_rate=1.0, fault_errors=[ccxt.RateLimitExceeded])
+    limiter = RecordingLimiter()
+    client = resilient(exchange, clock, limiter=limiter, retries=3, breaker_threshold=1, rate_limit_cooldown=10)
+
+    with pytest.raises(ccxt.RateLimitExceeded):
+        client.fetch_ohlcv('BTC/USDT', '1m', limit=10)
+    assert exchange.faults == 1
+    assert limiter.paused == [10]
+    assert client.breakers['fetch_ohlcv'].state == 'closed'
+
+
+def find_isolated_cross(exchange, symbol, timeframe, a, b, end_ms, bars=2000, margin=6):
+    """[end_ms - bars봉, end_ms) 구간에서 앞뒤 margin봉 안에 다른 크로스가 없는 크로스 봉 시각"""
+    tf_ms = market.timeframe_ms(timeframe)
+    start = end_ms - bars * tf_ms
+    state = IndicatorState([a, b])
+    crosses = []
+    for ts in range(start, end_ms, tf_ms):
+        state.push(exchange.candle(symbol, timeframe, ts)[4], ts)
+        if state.crossed(a, b):
+            crosses.append(ts)
+    for i, ts in enumerate(crosses):
+        if ts - start < (config.CANDLE_LIMIT + margin) * tf_ms:
+            continue
+        neighbours = crosses[max(0, i - 1):i] + crosses[i + 1:i + 2]
+        if all(abs(ts - other) > margin * tf_ms for other in neighbours):
+            return ts
+    raise AssertionError("no isolated crossover in fake data")
+
+
+def test_outage_closes_are_replayed_after_recovery(fake_exchange, monkeypatch):
+    symbol, timeframe, tf_ms = 'BTC/USDT', '1m', market.timeframe_ms('1m')
+    sent = []
+    monkeypatch.setattr(sma_monitor, 'send_alert', lambda msg, tf, chat_id=None: sent.append((chat_id, msg)))
+    chat = config.chats.get_or_create('c1')
+    chat.symbols, chat.timeframe, chat.crosses = [symbol], timeframe, [['sma7', 'sma25']]
+    config.chats.update(chat)
+
+    def evaluate_at(now_ms):
+        monkeypatch.setattr(config, 'clock_offset', now_ms / 1000 - time.time())
+        snapshot = market.take_snapshots([symbol], [timeframe])[timeframe]
+        return snapshot, sma_monitor.evaluate_alerts(snapshot)
+
+    now_ms = int(time.time() * 1000) // tf_ms * tf_ms
+    cross = find_isolated_cross(fake_exchange, symbol, timeframe, 'sma7', 'sma25', now_ms - 10 * tf_ms)
+
+    # 크로스 2봉 전 마감까지는 정상 평가
+    snapshot, failing = evaluate_at(cross - tf_ms + tf_ms // 2)
+    assert snapshot.has(symbol) and not failing and sent == []
+
+    # 크로스 봉 마감 전후로 거래소 장애 - 조회 실패 심볼로 기록
+    fake_exchange.outage(3600)
+    snapshot, failing = evaluate_at(cross + tf_ms + tf_ms // 2)
+    assert failing and not snapshot.has(symbol)
+    assert config.missed_closes[timeframe] == {symbol: cross - 2 * tf_ms}
+    assert sent == []
+
+    # 복구 후 마감: 장애 중 놓친 크로스 봉을 캐시된 캔들로 재평가해 지연 알림
+    fake_exchange.outage_until = 0.0
+    snapshot, failing = evaluate_at(cross + 4 * tf_ms + tf_ms // 2)
+    assert snapshot.has(symbol) and not failing
+    assert timeframe not in config.missed_closes
+    assert len(sent) == 1
+    chat_id, msg = sent[0]
+    assert chat_id == 'c1' and '크로스 알람' in msg and '지연 확인' in msg
+    assert config.chats.crossed[(symbol, timeframe, 'sma7', 'sma25')] == cross
@@ -0,0 +1,101 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import market
+from fakes import FakeExchange
+from indicators import IndicatorState
+
+SMA_NAMES = [f"sma{p}" for p in config.SMA_PERIODS]
+
+
+def fake_candles(symbol='BTC/USDT', timeframe='5m', limit=config.CANDLE_LIMIT):
+    return FakeExchange().fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+
+
+def pandas_smas(candles):
+    df = pd.DataFrame(candles, columns=market.OHLCV_COLUMNS)
+    return market.calculate_smas(df)
+
+
+def assert_values(actual, expected):
+    """지표 값 비교 - 데이터가 부족한 구간은 둘 다 NaN이어야 함"""
+    np.testing.assert_allclose(np.array(actual, dtype=float), np.array(expected, dtype=float), rtol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize('limit', [50, config.CANDLE_LIMIT])
+def test_indicator_state_matches_pandas_rolling(limit):
+    # limit이 최장 기간보다 길면 링 버퍼가 여러 번 돌면서 합계 재계산 경로도 지남
+    candles = fake_candles(limit=limit)
+    df = pandas_smas(candles)
+    state = IndicatorState(SMA_NAMES)
+
+    for i, candle in enumerate(candles[:-1]):
+        state.push(candle[4], candle[0])
+        assert_values([state.values()[n] for n in SMA_NAMES], [df[f'SMA_{p}'].iloc[i] for p in config.SMA_PERIODS])
+
+    # 진행 중인 마지막 봉은 잠정값 = pandas rolling 결과의 마지막 행
+    provisional = state.provisional(candles[-1][4])
+    assert_values([provisional[n] for n in SMA_NAMES], [df[f'SMA_{p}'].iloc[-1] for p in config.SMA_PERIODS])
+
+
+def test_get_sma_values_matches_calculate_smas(fake_exchange, monkeypatch):
+    # 조회 도중 봉이 바뀌지 않도록 서버 시각을 5m 봉 중간으로 맞춤
+    now = time.time()
+    monkeypatch.setattr(config, 'clock_offset', now // 300 * 300 + 150 - now)
+    for symbol in config.DEFAULT_SYMBOLS:
+        df = market.calculate_smas(market.fetch_data(symbol, '5m'))
+        values = market.get_sma_values(symbol, '5m')
+        assert_values([values[n] for n in SMA_NAMES], [df[f'SMA_{p}'].iloc[-1] for p in config.SMA_PERIODS])
+
+        # 마감 봉 기준 값은 진행 중인 봉을 뺀 직전 행
+        closed = market.get_sma_state(symbol, '5m').values()
+        assert_values([closed[n] for n in SMA_NAMES], [df[f'SMA_{p}'].iloc[-2] for p in config.SMA_PERIODS])
+
+
+def pandas_indicator(close, name):
+    """pandas 기준값 - EMA는 처음 period개 종가의 SMA로 시작, WMA는 최근 봉 가중치 period"""
+    kind, period = name.rstrip('0123456789'), int(name.lstrip('abcdefghijklmnopqrstuvwxyz'))
+    if kind == 'sma':
+        return close.rolling(period).mean()
+    if kind == 'ema':
+        seeded = close.copy()
+        seeded.iloc[:period - 1] = np.nan
+        seeded.iloc[period - 1] = close.iloc[:period].mean()
+        return seeded.ewm(span=period, adjust=False).mean()
+    weights = np.arange(1, period + 1)
+    return close.rolling(period).apply(lambda w: np.dot(w, weights) / weights.sum(), raw=True)
+
+
+@pytest.mark.parametrize('names', [['ema9', 'ema21', 'wma20', 'wma5'], ['ema1', 'wma1', 'sma1']])
+def test_ema_wma_match_pandas(names):
+    candles = fake_candles(limit=config.CANDLE_LIMIT)
+    close = pd.Series([c[4] for c in candles])
+    expected = {name: pandas_indicator(close, name) for name in names}
+    state = IndicatorState(names)
+
+    for i, candle in enumerate(candles[:-1]):
+        state.push(candle[4], candle[0])
+        assert_values([state.values()[n] for n in names], [expected[n].iloc[i] for n in names])
+
+    provisional = state.provisional(candles[-1][4])
+    assert_values([provisional[n] for n in names], [expected[n].iloc[-1] for n in names])
+
+
+def test_crossed_matches_pandas():
+    candles = fake_candles(limit=300)
+    close = pd.Series([c[4] for c in candles[:-1]])
+    fast, slow = pandas_indicator(close, 'ema9'), pandas_indicator(close, 'sma25')
+    diff = fast - slow
+    expected = np.where((diff.shift() <= 0) & (diff > 0), 1, np.where((diff.shift() >= 0) & (diff < 0), -1, 0))
+
+    state = IndicatorState(['ema9', 'sma25'])
+    actual = []
+    for candle in candles[:-1]:
+        state.push(candle[4], candle[0])
+        actual.append(state.crossed('ema9', 'sma25'))
+    assert actual == expected.tolist()
+    assert any(actual)
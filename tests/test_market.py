@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from market import WeightLimiter, klines_weight
+
+
+def test_limiter_spends_burst_then_refills():
+    limiter = WeightLimiter(6000)  # 초당 100
+    assert limiter.acquire(6000) == 0.0
+    started = time.monotonic()
+    waited = limiter.acquire(10)
+    elapsed = time.monotonic() - started
+    assert waited == pytest.approx(0.1, abs=0.05)
+    assert elapsed >= 0.09
+
+
+def test_limiter_refill_is_capped_at_capacity():
+    limiter = WeightLimiter(6000)
+    limiter.updated -= 3600  # 한 시간 쉬어도 버킷 크기 이상은 쌓이지 않음
+    assert limiter.acquire(6000) == 0.0
+    assert limiter.tokens < 1
+
+
+def test_limiter_pause_blocks_all_requests():
+    limiter = WeightLimiter(6000)
+    limiter.pause(0.2)
+    started = time.monotonic()
+    limiter.acquire(1)
+    assert time.monotonic() - started >= 0.19
+
+
+def test_klines_weight_tiers():
+    assert [klines_weight(n) for n in (1, 99, 100, 499, 500, 1000, 1500)] == [1, 1, 2, 2, 5, 5, 10]
+
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+import config
+import sma_monitor
+import telegram_bot
+from scheduler import Scheduler
+from sources import RestPollingSource
+from utils import server_time, sync_alert_schedule
+
+
+@pytest.fixture
+def replies(monkeypatch):
+    sent = []
+    monkeypatch.setattr(telegram_bot, 'send_telegram_message', lambda msg, chat_id=None, on_sent=None: sent.append((chat_id, msg)))
+    return sent
+
+
+def set_server_time(monkeypatch, when):
+    monkeypatch.setattr(config, 'clock_offset', when - time.time())
+
+
+def test_command_in_close_tick_keeps_pending_close(monkeypatch, replies):
+    # 5m 봉 중간에 예약 -> 봉 마감 직후 틱에서 다른 채팅방이 타임프레임 명령어를 보냄
+    bar = time.time() // 300 * 300
+    set_server_time(monkeypatch, bar + 150)
+    config.chats.get_or_create('a')
+    config.chats.get_or_create('b')
+    sync_alert_schedule()
+    scheduler, source = Scheduler(clock=server_time), RestPollingSource()
+    sma_monitor.plan_timers(scheduler, source, config.chats)
+    due_5m = config.next_alert_times['5m']
+
+    set_server_time(monkeypatch, bar + 301)
+    assert ('close', '5m') in scheduler.wait(timeout=0)
+    assert source.closed_timeframes() == ['5m']
+
+    for command in ('tf add 1h', '15m', 'alert 1', 'cross ema9 sma25'):
+        telegram_bot.handle_command('b', command)
+        sma_monitor.plan_timers(scheduler, source, [config.chats.get('b')])
+        assert source.closed_timeframes() == ['5m'], command
+        assert config.next_alert_times['5m'] == due_5m
+
+    # 새로 감시하는 타임프레임만 다음 봉 마감으로 예약
+    assert set(config.next_alert_times) == {'5m', '15m', '1h'}
+    for timeframe in ('15m', '1h'):
+        assert scheduler.due(('close', timeframe)) == config.next_alert_times[timeframe].timestamp() > server_time()
+
+
+def test_unwatched_timeframe_is_dropped(monkeypatch, replies):
+    config.chats.get_or_create('a')
+    sync_alert_schedule()
+    scheduler, source = Scheduler(clock=server_time), RestPollingSource()
+    telegram_bot.handle_command('a', 'tf add 1h')
+    sma_monitor.plan_timers(scheduler, source, [config.chats.get('a')])
+    assert scheduler.due(('close', '1h')) is not None
+
+    telegram_bot.handle_command('a', 'tf del 1h')
+    sma_monitor.plan_timers(scheduler, source, [config.chats.get('a')])
+    assert '1h' not in config.next_alert_times
+    assert scheduler.due(('close', '1h')) is None
+    assert scheduler.due(('close', '5m')) is not None
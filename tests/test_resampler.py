@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+import pytest
+
+import config
+import market
+from fakes import FakeExchange
+from resampler import Resampler, resample_array
+
+BASE_MS = 60 * 1000
+
+
+@pytest.mark.parametrize('timeframe', ['3m', '15m', '1h'])
+def test_incremental_resampling_matches_resample_array(timeframe):
+    tf_ms = market.timeframe_ms(timeframe)
+    # 상위 봉 경계 중간에서 시작하는 1m 봉 500개
+    base = FakeExchange(clock=lambda: 1_700_000_000.0).fetch_ohlcv('BTC/USDT', '1m', limit=500)
+    resampler = Resampler(tf_ms, BASE_MS)
+    bars = {}
+
+    for k in range(1, len(base) + 1):
+        candle = base[k - 1]
+        # 진행 중인 1m 봉은 잠정 집계만, 마감되면 확정 집계
+        for now_ms in (candle[0] + BASE_MS // 2, candle[0] + BASE_MS):
+            for row in resampler.update(base[:k], now_ms):
+                bars[row[0]] = row
+            forming = bars[candle[0] // tf_ms * tf_ms]
+            assert forming[4] == candle[4]
+
+    expected = resample_array(base, tf_ms, BASE_MS)
+    actual = np.array([bars[ts] for ts in sorted(bars)][:len(expected)], dtype=float)
+    np.testing.assert_allclose(actual, expected, rtol=1e-12)
+
+
+def test_fake_exchange_higher_timeframes_are_built_from_1m():
+    exchange = FakeExchange(clock=lambda: 1_700_000_123.0)
+    base = exchange.fetch_ohlcv('ETH/USDT', '1m', limit=1000)
+    for timeframe in ('5m', '15m'):
+        tf_ms = market.timeframe_ms(timeframe)
+        rows = exchange.fetch_ohlcv('ETH/USDT', timeframe, limit=20)
+        # 진행 중인 마지막 봉은 지금까지의 1m 봉만 집계
+        assert rows[-1][4] == base[-1][4]
+        expected = resample_array(base, tf_ms, BASE_MS)
+        by_ts = {row[0]: row for row in expected.tolist()}
+        for row in rows[:-1]:
+            np.testing.assert_allclose(row, by_ts[row[0]], rtol=1e-12)
+
+
+def test_bot_resampled_bars_match_exchange_bars(fake_exchange, monkeypatch):
+    symbols, timeframes = ['BTC/USDT', 'SOL/USDT'], ['1m', '5m', '15m']
+    start = time.time() // 900 * 900 + 7 * 60 + 20
+    for step in range(0, 40 * 60, 60):
+        monkeypatch.setattr(config, 'clock_offset', start + step - time.time())
+        market.take_snapshots(symbols, timeframes)
+
+    # REST로 시드한 과거 봉과 1m 봉을 리샘플링한 최근 봉이 모두 거래소 상위 봉과 일치
+    for symbol in symbols:
+        for timeframe in timeframes[1:]:
+            stored = market.candle_store[(symbol, timeframe)]
+            rest = {row[0]: row for row in fake_exchange.fetch_ohlcv(symbol, timeframe, limit=len(stored))}
+            for candle in stored:
+                np.testing.assert_allclose(candle[:5], rest[candle[0]][:5], rtol=1e-12)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from market import format_sma_info
+from scanner import alignment_code, alignment_codes, alignment_map
+
+PERIODS = [7, 25, 99]
+# 변경 전 config.ALIGNMENT_MAP (번호는 채팅방 설정에 저장되어 있으므로 그대로 유지되어야 함)
+BASELINE_MAP = {'1': '7>25>99', '2': '25>7>99', '3': '25>99>7', '4': '99>25>7', '5': '99>7>25', '6': '7>99>25'}
+
+
+def baseline_alignment(sma_values):
+    """변경 전 get_sma_info의 배열 판정 (값이 큰 순서, 같으면 기간 순서 유지)"""
+    sorted_smas = sorted(sma_values.items(), key=lambda x: x[1], reverse=True)
+    raw_alignment = ">".join(str(p) for p, v in sorted_smas)
+    label = '정배열' if raw_alignment == '7>25>99' else '역배열' if raw_alignment == '99>25>7' else None
+    return raw_alignment, label
+
+
+def test_alignment_map_matches_baseline_numbering():
+    assert alignment_map(PERIODS) == BASELINE_MAP
+
+
+def test_alignment_codes_match_baseline_labels():
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, 4, size=(500, 3)).astype(float)  # 작은 정수라 같은 값(동률)도 자주 나옴
+    codes = alignment_codes(rows)
+    for row, code in zip(rows, codes):
+        sma_values = dict(zip(PERIODS, row.tolist()))
+        raw_alignment, label = baseline_alignment(sma_values)
+        assert code == alignment_code(raw_alignment, PERIODS)
+        status, alignment = format_sma_info(sma_values)
+        assert alignment == raw_alignment
+        assert (label is None and '배열' not in status) or f"({label})" in status
+        # 타겟 알람: 기존에는 문자열 비교, 지금은 배열 코드 비교
+        for target in BASELINE_MAP.values():
+            assert (raw_alignment == target) == (code == alignment_code(target, PERIODS))
+
+
+def test_alignment_codes_mark_missing_values():
+    codes = alignment_codes([[1.0, np.nan, 3.0], [3.0, 2.0, 1.0]])
+    assert codes.tolist() == [-1, alignment_code('7>25>99', PERIODS)]
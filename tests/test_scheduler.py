@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+import config
+import market
+import sma_monitor
+from scheduler import Scheduler
+from sources import RestPollingSource
+from utils import backoff_delay, server_time, sync_alert_schedule
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_timers_fire_in_time_order():
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    scheduler.schedule(('report', 'a'), 1030)
+    scheduler.schedule(('close', '5m'), 1010)
+    scheduler.schedule(('clock',), 1020)
+    scheduler.schedule(('retry', '5m'), 1050)
+
+    assert scheduler.wait(timeout=0) == []
+    clock.now = 1030
+    assert scheduler.wait(timeout=0) == [('close', '5m'), ('clock',), ('report', 'a')]
+    assert scheduler.keys() == [('retry', '5m')]
+    assert scheduler._next_delay() == pytest.approx(20)
+
+
+def test_rescheduling_a_key_replaces_the_timer():
+    clock = FakeClock()
+    scheduler = Scheduler(clock=clock)
+    scheduler.schedule(('report', 'a'), 1010)
+    scheduler.schedule(('report', 'a'), 1040)  # 늦춤 - 이전 예약은 무효
+    scheduler.schedule(('close', '5m'), 1030)
+    scheduler.schedule(('close', '5m'), 1020)  # 앞당김
+
+    clock.now = 1025
+    assert scheduler.wait(timeout=0) == [('close', '5m')]
+    assert scheduler.due(('report', 'a')) == 1040
+    scheduler.cancel(('report', 'a'))
+    clock.now = 1100
+    assert scheduler.wait(timeout=0) == []
+
+
+def test_notify_wakes_wait_without_events():
+    scheduler = Scheduler(clock=FakeClock())
+    scheduler.notify()
+    assert scheduler.wait(timeout=5) == []
+
+
+def test_report_timer_is_replanned_when_not_yet_due(monkeypatch):
+    chat = config.chats.get_or_create('a')
+    chat.last_report_at = server_time() - chat.interval_seconds
+    scheduler, source = Scheduler(clock=server_time), RestPollingSource()
+    sma_monitor.plan_timers(scheduler, source, config.chats)
+    events = scheduler.wait(timeout=0)
+    assert ('report', 'a') in events
+
+    # 같은 틱의 시각 재보정으로 서버 시각이 뒤로 가면 리포트 시각 전이 됨 - 발송하지 않아도 타이머는 다시 예약
+    monkeypatch.setattr(config, 'clock_offset', config.clock_offset - 5)
+    fired = sma_monitor.fired_reports(events)
+    assert fired == [chat]
+    assert not chat.report_due(server_time())
+    sma_monitor.plan_timers(scheduler, source, fired)
+    assert scheduler.due(('report', 'a')) == chat.next_report_at()
+
+
+def test_backoff_delay_grows_within_cap():
+    random.seed(1)
+    for attempt in range(8):
+        delays = [backoff_delay(attempt, 5, 60) for _ in range(200)]
+        assert min(delays) >= 2.5
+        assert max(delays) <= min(60, 5 * 2 ** attempt)
+    assert max(backoff_delay(1, 5, 60) for _ in range(200)) > 5  # 지터 상한도 지수적으로 증가
+
+
+class StubExchange:
+    def __init__(self, retry_after=0.0):
+        self.wait = retry_after
+
+    def retry_after(self):
+        return self.wait
+
+
+def test_schedule_retry_backs_off_and_stops(monkeypatch):
+    monkeypatch.setitem(vars(market), 'exchange', StubExchange())
+    config.chats.get_or_create('a')
+    sync_alert_schedule()
+    scheduler, attempts = Scheduler(clock=server_time), {}
+    # 봉 마감까지 충분히 남도록 다음 마감 시각을 멀리 둠
+    config.next_alert_times['5m'] = config.next_alert_times['5m'].replace(year=2100)
+
+    config.missed_closes['5m'] = {'BTC/USDT': 0}
+    sma_monitor.schedule_retry(scheduler, '5m', attempts)
+    assert attempts['5m'] == 0
+    first = scheduler.due(('retry', '5m')) - server_time()
+    assert config.RETRY_DELAY / 2 <= first <= config.RETRY_DELAY + 0.1
+
+    for _ in range(10):
+        sma_monitor.schedule_retry(scheduler, '5m', attempts)
+    assert scheduler.due(('retry', '5m')) - server_time() <= config.MISSED_RETRY_MAX_DELAY + 0.1
+
+    # 회로가 열려 있으면 다시 시험 가능해질 때까지 미룸
+    market.exchange.wait = 600
+    sma_monitor.schedule_retry(scheduler, '5m', attempts)
+    assert scheduler.due(('retry', '5m')) - server_time() >= 599
+
+    # 다음 봉 마감을 넘기면 마감 평가가 이어받으므로 재시도 예약 없음
+    config.next_alert_times['5m'] = config.next_alert_times['5m'].replace(year=2000)
+    sma_monitor.schedule_retry(scheduler, '5m', attempts)
+    assert scheduler.due(('retry', '5m')) is None
+
+    # 실패 심볼이 없으면 재시도 기록 초기화
+    config.missed_closes['5m'] = {}
+    sma_monitor.schedule_retry(scheduler, '5m', attempts)
+    assert '5m' not in attempts
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+import config
+import market
+from fakes import FakeKlineStreamServer
+from utils import server_time
+
+websocket = pytest.importorskip('websocket')
+from sources import BinanceStreamSource
+
+SYMBOLS = ['BTC/USDT', 'ETH/USDT']
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def collect_closes(source, timeframes, timeout=10.0):
+    """closed_timeframes()를 반복 호출해 timeframes가 모두 마감될 때까지 모음"""
+    seen = set()
+    wait_for(lambda: seen.update(source.closed_timeframes()) or set(timeframes) <= seen, timeout)
+    return seen
+
+
+@pytest.fixture
+def stream(fake_exchange, monkeypatch):
+    monkeypatch.setattr(config, 'STREAM_CLOSE_GRACE', 0.2)
+    monkeypatch.setattr(config, 'STREAM_RECV_TIMEOUT', 0.5)
+    server = FakeKlineStreamServer(tick=0.05, clock=server_time, exchange=fake_exchange).start()
+    wakeups = threading.Event()
+    source = BinanceStreamSource(server.url)
+    source.start(SYMBOLS, ['1m', '5m'], wakeup=wakeups.set)
+    # 첫 연결의 REST 보충(기준점 기록)과 스트림 수신이 시작될 때까지 대기
+    assert wait_for(lambda: server.connections == 1 and all(s in source.last_closed for s in SYMBOLS))
+    yield server, source, wakeups
+    source.stop()
+    server.stop()
+
+
+def test_stream_emits_close_when_clock_crosses_bar(stream, monkeypatch):
+    server, source, wakeups = stream
+
+    base_ms = market.timeframe_ms('1m')
+    open_time = int(server_time() * 1000) // base_ms * base_ms
+    monkeypatch.setattr(config, 'clock_offset', config.clock_offset + 60)
+
+    assert '1m' in collect_closes(source, ['1m'])
+    assert wakeups.is_set()
+    assert all(source.last_closed[symbol] >= open_time for symbol in SYMBOLS)
+
+    # 스트림으로 받은 마감 봉은 같은 시각의 REST 캔들과 같은 값
+    candles = market.candle_store[('BTC/USDT', '1m')]
+    closed = next(c for c in candles if c[0] == open_time)
+    expected = server.exchange.candle('BTC/USDT', '1m', open_time)
+    assert closed[4] == pytest.approx(expected[4], abs=1e-4)
+
+
+def test_stream_reconnects_and_backfills_missed_boundary(stream, monkeypatch):
+    server, source, wakeups = stream
+    base_ms = market.timeframe_ms('1m')
+    before = dict(source.last_closed)
+
+    # 연결이 끊긴 동안 5분이 지나 5m 경계를 넘김 - 새 연결은 진행 중인 봉부터 받으므로 보충 조회로만 알 수 있음
+    server.drop_connections()
+    monkeypatch.setattr(config, 'clock_offset', config.clock_offset + 300)
+
+    assert wait_for(lambda: server.connections == 2)
+    assert {'1m', '5m'} <= collect_closes(source, ['1m', '5m'])
+    current = int(server_time() * 1000) // base_ms * base_ms
+    for symbol in SYMBOLS:
+        assert source.last_closed[symbol] >= current - base_ms > before[symbol]
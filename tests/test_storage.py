@@ -0,0 +1,26 @@
+import config
+import market
+import storage
+
+
+def test_persist_candles_keeps_only_candle_limit_bars(fake_exchange, monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, '_conn', None)
+    storage.open_store(str(tmp_path / 'store.db'))
+    tf_ms = market.timeframe_ms('5m')
+
+    market.fetch_candles('BTC/USDT', '5m')
+    market.persist_candles()
+    count = storage._conn.execute("SELECT COUNT(*) FROM candles").fetchone()[0]
+    assert count == config.CANDLE_LIMIT - 1  # 진행 중인 마지막 봉은 기록하지 않음
+
+    # 봉이 계속 마감되어도 시리즈별 행 수는 CANDLE_LIMIT을 넘지 않음
+    for _ in range(5):
+        monkeypatch.setattr(config, 'clock_offset', config.clock_offset + tf_ms / 1000)
+        market.fetch_candles('BTC/USDT', '5m')
+        market.persist_candles()
+    first, last = storage.candle_bounds('BTC/USDT', '5m')
+    assert (last - first) // tf_ms + 1 == config.CANDLE_LIMIT
+    count = storage._conn.execute("SELECT COUNT(*) FROM candles").fetchone()[0]
+    assert count == config.CANDLE_LIMIT
+    assert last == market.candle_store[('BTC/USDT', '5m')][-2][0]
+    storage._conn.close()
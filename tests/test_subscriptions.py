@@ -0,0 +1,68 @@
+import config
+import market
+from subscriptions import ChatRegistry
+
+
+def registry():
+    return ChatRegistry(['BTC/USDT', 'ETH/USDT'], '5m', 3600, config.SMA_PERIODS)
+
+
+def add_cross(chats, chat_id, a='ema9', b='sma25'):
+    chat = chats.get_or_create(chat_id)
+    chat.crosses.append([a, b])
+    chats.update(chat)
+    return chat
+
+
+def test_crossed_dropped_when_last_subscriber_leaves():
+    chats = registry()
+    first, second = add_cross(chats, 1), add_cross(chats, 2)
+    chats.crossed[('BTC/USDT', '5m', 'ema9', 'sma25')] = 1000
+    chats.crossed[('ETH/USDT', '5m', 'ema9', 'sma25')] = 1000
+
+    # 설정을 다시 반영해도 같은 조건이면 기록 유지 (같은 봉 중복 알림 방지)
+    chats.update(first)
+    assert len(chats.crossed) == 2
+
+    # coin del: 아직 다른 채팅방이 구독 중이면 유지, 마지막 구독자가 빠지면 삭제
+    first.symbols.remove('BTC/USDT')
+    chats.update(first)
+    assert ('BTC/USDT', '5m', 'ema9', 'sma25') in chats.crossed
+    second.symbols.remove('BTC/USDT')
+    chats.update(second)
+    assert ('BTC/USDT', '5m', 'ema9', 'sma25') not in chats.crossed
+
+    # cross del / 채팅방 제거
+    first.crosses.clear()
+    chats.update(first)
+    assert ('ETH/USDT', '5m', 'ema9', 'sma25') in chats.crossed
+    chats.remove(second.chat_id)
+    assert chats.crossed == {}
+    assert chats.crosses == {}
+
+
+def test_evict_symbol_drops_crossed(monkeypatch):
+    chats = registry()
+    monkeypatch.setattr(config, 'chats', chats)
+    chats.crossed[('XRP/USDT', '5m', 'ema9', 'sma25')] = 1000
+    chats.crossed[('ETH/USDT', '5m', 'ema9', 'sma25')] = 1000
+    market.evict_symbol('XRP/USDT')
+    assert list(chats.crossed) == [('ETH/USDT', '5m', 'ema9', 'sma25')]
+
+
+def test_cross_without_symbols_leaves_no_alert_index():
+    chats = registry()
+    chat = chats.get_or_create(1)
+    chat.symbols = []
+    chats.update(chat)
+    chat.crosses.append(['ema9', 'sma25'])
+    chats.update(chat)
+    assert chats.crosses == {}
+    assert not chats.has_alerts()
+
+    chat.symbols = ['BTC/USDT']
+    chats.update(chat)
+    assert chats.has_alerts()
+    chat.symbols = []
+    chats.update(chat)
+    assert not chats.has_alerts()
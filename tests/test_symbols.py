@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import config
+import market
+import telegram_bot
+from fakes import FakeExchange
+from symbols import MarketIndex
+
+MARKETS = {
+    **FakeExchange(['BTC/USDT', 'ETH/USDT', '1000PEPE/USDT']).load_markets(),
+    'BTC/USDT:SPOT': {'symbol': 'BTC/USDT', 'base': 'BTC', 'quote': 'USDT', 'swap': False, 'linear': False},
+    'ETH/BUSD': {'symbol': 'ETH/BUSD', 'base': 'ETH', 'quote': 'BUSD', 'swap': True, 'linear': True},
+    'LUNA/USDT': {'symbol': 'LUNA/USDT', 'base': 'LUNA', 'quote': 'USDT', 'swap': True, 'linear': True, 'active': False},
+}
+
+
+def no_network():
+    raise AssertionError("load_markets must not be called")
+
+
+def test_resolve_by_base_asset(tmp_path):
+    index = MarketIndex(str(tmp_path / 'markets.json')).load(lambda: MARKETS)
+    assert len(index) == 3
+    for coin in ('btc', 'BTC', 'btc/usdt', 'BTCUSDT', 'btc/usdt:usdt'):
+        assert index.resolve(coin) == 'BTC/USDT'
+    assert index.resolve('1000pepe') == '1000PEPE/USDT'
+    assert index.resolve('eth/busd') is None   # USDT 무기한 선물만
+    assert index.resolve('luna') is None       # 상장 폐지
+    assert index.resolve('doge') is None
+
+
+def test_cache_reload_and_expiry(tmp_path):
+    path = tmp_path / 'markets.json'
+    MarketIndex(str(path)).load(lambda: MARKETS)
+    assert json.loads(path.read_text())['markets']['ETH'] == 'ETH/USDT'
+
+    # 유효한 캐시는 거래소 조회 없이 복원
+    assert MarketIndex(str(path)).load(no_network).resolve('eth') == 'ETH/USDT'
+
+    # 기한이 지난 캐시: warm()은 바로 쓰되 갱신 필요를 알리고, load()는 다시 받음
+    expired = MarketIndex(str(path), ttl=-1)
+    assert expired.warm() is False and expired.resolve('btc') == 'BTC/USDT'
+    calls = []
+    expired.load(lambda: calls.append(1) or {})
+    assert calls == [1]
+
+    # 다른 결제 자산의 캐시는 쓰지 않음
+    assert MarketIndex(str(path), quote='BUSD').warm() is False
+
+
+@pytest.fixture
+def commands(monkeypatch, tmp_path):
+    index = MarketIndex(str(tmp_path / 'markets.json')).load(lambda: MARKETS)
+    monkeypatch.setattr(telegram_bot, 'market_index', index)
+    monkeypatch.setattr(telegram_bot, 'send_telegram_message', lambda msg, chat_id=None, on_sent=None: None)
+    chat = config.chats.get_or_create('a')
+    chat.symbols = ['BTC/USDT', 'ETH/USDT']
+    config.chats.update(chat)
+    for symbol in chat.symbols:
+        market.candle_store[(symbol, '1m')] = [[0, 1, 1, 1, 1, 1]]
+    return lambda command: telegram_bot.handle_command('a', command)
+
+
+def test_coin_del_keeps_symbol_used_by_trendline(commands):
+    commands('trend btc 02/24 09:00 90000 02/25 09:00 95000 up')
+    line_id = next(iter(config.active_trendlines)).id
+
+    commands('coin del btc eth')
+    assert ('ETH/USDT', '1m') not in market.candle_store
+    assert ('BTC/USDT', '1m') in market.candle_store  # 추세선이 아직 사용 중
+
+    commands(f'trend del {line_id}')
+    assert ('BTC/USDT', '1m') not in market.candle_store
+
+
+def test_coin_del_keeps_symbol_watched_by_another_chat(commands):
+    other = config.chats.get_or_create('b')
+    other.symbols = ['BTC/USDT']
+    config.chats.update(other)
+    commands('coin del btc')
+    assert ('BTC/USDT', '1m') in market.candle_store
@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+import config
+import telegram_bot
+from fakes import FakeTelegramServer
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    server = FakeTelegramServer().start()
+    monkeypatch.setattr(config, 'TELEGRAM_API_URL', server.url)
+    monkeypatch.setattr(config, 'TOKEN', 'test')
+    monkeypatch.setattr(config, 'SEND_MIN_INTERVAL', 0.0)
+    monkeypatch.setattr(telegram_bot, 'last_sent_at', {})
+    yield server
+    server.stop()
+
+
+def test_alerts_from_one_tick_merge_per_chat(telegram):
+    sent = threading.Semaphore(0)
+    for i in range(3):
+        telegram_bot.send_telegram_message(f"alert a{i}", 'a', on_sent=sent.release)
+    for i in range(2):
+        telegram_bot.send_telegram_message(f"alert b{i}", 'b', on_sent=sent.release)
+    telegram_bot.flush_messages()
+
+    assert sorted(telegram.messages) == [('a', "alert a0\n\nalert a1\n\nalert a2"), ('b', "alert b0\n\nalert b1")]
+    # 병합되어도 메시지마다 발송 완료 콜백은 한 번씩
+    assert all(sent.acquire(timeout=1) for _ in range(5))
+    assert not sent.acquire(timeout=0)
+
+
+def test_long_message_splits_on_line_boundaries(telegram):
+    lines = [f"• line {i:04d} " + "x" * 60 for i in range(200)]  # 약 14,000자
+    message = "\n".join(lines)
+    telegram_bot.send_telegram_message(message, 'c')
+    telegram_bot.flush_messages()
+
+    chunks = [text for chat_id, text in telegram.messages if chat_id == 'c']
+    assert len(chunks) > 1
+    assert all(len(chunk) <= config.TELEGRAM_MAX_LENGTH for chunk in chunks)
+    assert "\n".join(chunks) == message  # 줄 중간에서 자르지 않음
+
+
+def test_merge_keeps_chunks_under_limit(monkeypatch):
+    monkeypatch.setattr(config, 'TELEGRAM_MAX_LENGTH', 20)
+    merged = telegram_bot.merge_messages([('a', "1234567890", None), ('a', "abcdefgh", None),
+                                          ('a', "overflow", None), ('b', "other", None)])
+    assert [(chat_id, text) for chat_id, text, _ in merged] == [
+        ('a', "1234567890\n\nabcdefgh"), ('a', "overflow"), ('b', "other")]
+    assert telegram_bot.split_message("y" * 45) == ["y" * 20, "y" * 20, "y" * 5]
+
+
+class RecordingSession:
+    def __init__(self):
+        self.sent = []
+
+    def post(self, url, json, timeout):
+        self.sent.append((json['chat_id'], time.monotonic()))
+        return self
+
+    status_code = 200
+
+    def json(self):
+        return {'ok': True}
+
+
+def test_per_chat_min_interval(monkeypatch):
+    session = RecordingSession()
+    monkeypatch.setattr(telegram_bot, 'send_session', session)
+    monkeypatch.setattr(telegram_bot, 'last_sent_at', {})
+    monkeypatch.setattr(config, 'SEND_MIN_INTERVAL', 0.3)
+
+    for chat_id in ('a', 'a', 'b', 'a'):
+        assert telegram_bot._deliver(chat_id, "hi")
+    (_, a1), (_, a2), (_, b1), (_, a3) = session.sent
+    assert a2 - a1 >= 0.3
+    assert b1 - a2 < 0.1     # 다른 채팅방은 기다리지 않음
+    assert a3 - a2 >= 0.3
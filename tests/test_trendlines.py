@@ -0,0 +1,35 @@
+from trendlines import TrendlineRegistry
+
+
+def test_check_takes_only_broken_lines():
+    registry = TrendlineRegistry()
+    # 시각 0에서 100, 시각 100에서 200인 상승선 / 가로선 / 하락선
+    rising = registry.add('BTC/USDT', 0, 100, 100, 200, 'up', '5m', 'c1')
+    flat = registry.add('BTC/USDT', 0, 150, 100, 150, 'up', '5m', 'c1')
+    falling = registry.add('BTC/USDT', 0, 200, 100, 100, 'down', '5m', 'c2')
+    other_tf = registry.add('BTC/USDT', 0, 100, 100, 100, 'up', '1h', 'c1')
+
+    # 시각 50: 상승선 150, 가로선 150, 하락선 150 - 종가가 같으면 돌파 아님
+    assert registry.check('BTC/USDT', '5m', 150, 50) == []
+
+    # 시각 80: 상승선 180, 가로선 150 -> 종가 160은 가로선만 상향 돌파
+    assert registry.check('BTC/USDT', '5m', 160, 80) == [(flat, 150.0)]
+    assert flat.id not in registry.lines
+
+    # 선끼리 교차한 뒤에도 각 선의 현재 수준으로 판정 (시각 20: 상승선 120, 하락선 180)
+    fired = registry.check('BTC/USDT', '5m', 185, 20)
+    assert fired == [(rising, 120.0)]
+    fired = registry.check('BTC/USDT', '5m', 170, 20)
+    assert [line for line, _ in fired] == [falling]
+    assert list(registry.lines) == [other_tf.id]
+    assert registry.groups[('BTC/USDT', '5m', 'up')].lines == []
+
+
+def test_remove_keeps_arrays_aligned():
+    registry = TrendlineRegistry()
+    lines = [registry.add('ETH/USDT', 0, 100 + i, 10, 100 + i, 'up', '5m') for i in range(5)]
+    registry.remove(lines[1].id)
+    registry.remove(lines[3].id)
+    fired = registry.check('ETH/USDT', '5m', 103, 5)
+    assert fired == [(lines[0], 100.0), (lines[2], 102.0)]
+    assert registry.groups[('ETH/USDT', '5m', 'up')].lines == [lines[4]]
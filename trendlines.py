@@ -0,0 +1,132 @@
+import numpy as np
+
+# ==========================================
+# 추세선 레지스트리 (심볼별 다수 추세선)
+# ==========================================
+class Trendline:
+    """두 점(시각 초, 가격)을 이은 추세선 - 기울기/절편은 등록 시 한 번만 계산
+
+    timeframe 봉의 종가로 돌파를 판정하고, 알람은 등록한 채팅방(chat_id)으로 보냄
+    """
+
+    def __init__(self, line_id, symbol, t1, p1, t2, p2, direction, timeframe, chat_id=None):
+        self.id = line_id
+        self.symbol = symbol
+        self.t1, self.p1, self.t2, self.p2 = t1, p1, t2, p2
+        self.direction = direction
+        self.timeframe = timeframe
+        self.chat_id = chat_id
+        self.slope = (p2 - p1) / (t2 - t1)
+        self.intercept = p1 - self.slope * t1
+
+    def level(self, timestamp):
+        return self.slope * timestamp + self.intercept
+
+    def to_dict(self):
+        return {'id': self.id, 'symbol': self.symbol, 't1': self.t1, 'p1': self.p1,
+                't2': self.t2, 'p2': self.p2, 'direction': self.direction,
+                'timeframe': self.timeframe, 'chat_id': self.chat_id}
+
+
+class _LineGroup:
+    """같은 심볼/타임프레임/방향의 추세선 - 기울기/절편 배열로 모든 선의 가격 수준을 한 번에 계산"""
+
+    def __init__(self):
+        self.lines = []
+        self.slopes = np.empty(0)
+        self.intercepts = np.empty(0)
+
+    def add(self, line):
+        self.lines.append(line)
+        self.slopes = np.append(self.slopes, line.slope)
+        self.intercepts = np.append(self.intercepts, line.intercept)
+
+    def remove(self, line_id):
+        for i, line in enumerate(self.lines):
+            if line.id == line_id:
+                del self.lines[i]
+                self.slopes = np.delete(self.slopes, i)
+                self.intercepts = np.delete(self.intercepts, i)
+                return line
+        return None
+
+    def levels(self, timestamp):
+        """시각 기준 가격 수준 (등록 순서)"""
+        return self.slopes * timestamp + self.intercepts
+
+    def take(self, mask, levels):
+        """mask가 참인 추세선을 꺼내 (추세선, 가격 수준) 목록으로 반환"""
+        if not mask.any():
+            return []
+        taken = [(self.lines[i], levels[i].item()) for i in np.flatnonzero(mask)]
+        keep = ~mask
+        self.lines = [line for line, kept in zip(self.lines, keep) if kept]
+        self.slopes, self.intercepts = self.slopes[keep], self.intercepts[keep]
+        return taken
+
+
+class TrendlineRegistry:
+    """심볼별 다수 추세선 관리 - 종가 하나를 모든 추세선의 가격 수준과 한 번에 비교하여 돌파한 추세선을 찾음"""
+
+    def __init__(self):
+        self.lines = {}    # id -> Trendline
+        self.groups = {}   # (심볼, 타임프레임, 방향) -> _LineGroup
+        self.next_id = 1
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines.values())
+
+    def symbols(self):
+        return list(dict.fromkeys(line.symbol for line in self.lines.values()))
+
+    def timeframes(self):
+        return list(dict.fromkeys(line.timeframe for line in self.lines.values()))
+
+    def for_symbol(self, symbol, chat_id=None):
+        return [line for line in self.lines.values()
+                if line.symbol == symbol and (chat_id is None or line.chat_id == chat_id)]
+
+    def for_chat(self, chat_id):
+        return [line for line in self.lines.values() if line.chat_id == chat_id]
+
+    def add(self, symbol, t1, p1, t2, p2, direction, timeframe, chat_id=None, line_id=None):
+        """추세선 등록 후 Trendline 반환 (t1 == t2면 ValueError)"""
+        if t1 == t2:
+            raise ValueError("두 점의 시각이 같습니다.")
+        line = Trendline(line_id or self.next_id, symbol, t1, p1, t2, p2, direction, timeframe, chat_id)
+        self.next_id = max(self.next_id, line.id + 1)
+        self.lines[line.id] = line
+        self.groups.setdefault((symbol, timeframe, direction), _LineGroup()).add(line)
+        return line
+
+    def remove(self, line_id):
+        line = self.lines.pop(line_id, None)
+        if line is not None:
+            self.groups[(line.symbol, line.timeframe, line.direction)].remove(line_id)
+        return line
+
+    def remove_symbol(self, symbol, chat_id=None):
+        """심볼의 추세선 전체 해제 (chat_id를 주면 해당 채팅방 것만) - 해제한 개수 반환"""
+        removed = [self.remove(line.id) for line in self.for_symbol(symbol, chat_id)]
+        return len(removed)
+
+    def check(self, symbol, timeframe, close, timestamp):
+        """종가가 돌파한 추세선을 해제하며 (추세선, 기준선 가격) 목록으로 반환
+
+        up: 종가 > 기준선, down: 종가 < 기준선
+        """
+        triggered = []
+        up = self.groups.get((symbol, timeframe, 'up'))
+        if up and up.lines:
+            levels = up.levels(timestamp)
+            triggered += up.take(levels < close, levels)
+        down = self.groups.get((symbol, timeframe, 'down'))
+        if down and down.lines:
+            levels = down.levels(timestamp)
+            triggered += down.take(levels > close, levels)
+        for line, _ in triggered:
+            del self.lines[line.id]
+        return triggered
@@ -1,6 +1,8 @@
 import sys
 import io
 import os
+import random
+import time
 from datetime import datetime, timedelta, timezone
 import config
 
@@ -35,9 +37,21 @@ def check_single_instance():
 # ==========================================
 # 수학 / 시간 유틸리티
 # ==========================================
+def server_time():
+    """거래소 서버 기준 현재 시각 (epoch 초) - 로컬 시계 오차를 config.clock_offset으로 보정"""
+    return time.time() + config.clock_offset
+
+def server_now():
+    """거래소 서버 기준 현재 시각 (UTC datetime)"""
+    return datetime.fromtimestamp(server_time(), timezone.utc)
+
+def backoff_delay(attempt, base, cap):
+    """지수 백오프 + 전체 지터 (동시에 실패한 요청들이 한꺼번에 재시도하지 않도록)"""
+    return random.uniform(base / 2, min(cap, base * 2 ** attempt))
+
 def get_next_candle_close(timeframe):
     """현재 시각 기준으로 다음 봉 마감 시각(UTC)을 계산"""
-    now_utc = datetime.now(timezone.utc)
+    now_utc = server_now()
     minutes = config.TIMEFRAME_MINUTES.get(timeframe, 5)
     
     # 현재 UTC 시각을 자정 기준 분으로 변환
@@ -54,7 +68,41 @@ def get_next_candle_close(timeframe):
     if next_close >= 1440:
         next_close_dt = now_utc.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1, minutes=next_close - 1440)
     
-    # 10초 버퍼 추가 (데이터 확정 대기)
-    next_close_dt += timedelta(seconds=10)
+    # 거래소 집계 반영 대기 (서버 시각 보정으로 고정 버퍼 대신 짧은 여유만 둠)
+    next_close_dt += timedelta(seconds=config.CANDLE_SETTLE_SECONDS)
     
     return next_close_dt
+
+def get_last_candle_close(timeframe):
+    """현재 시각 기준으로 가장 최근에 마감된 봉의 마감 시각(UTC)"""
+    now_utc = server_now()
+    minutes = config.TIMEFRAME_MINUTES.get(timeframe, 5)
+    total_minutes = now_utc.hour * 60 + now_utc.minute
+    return now_utc.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=(total_minutes // minutes) * minutes)
+
+def tracked_symbols():
+    """리포트/알람에 필요한 심볼 목록 (모든 채팅방의 감시 심볼 + 추세선 대상)"""
+    return list(dict.fromkeys([*config.chats.symbols(), *config.active_trendlines.symbols()]))
+
+def get_watched_timeframes():
+    """감시 중인 타임프레임 목록 (모든 채팅방의 타임프레임 + 추세선 타임프레임)"""
+    return list(dict.fromkeys([*config.chats.timeframes(), *config.active_trendlines.timeframes()]))
+
+def is_allowed_chat(chat_id):
+    """명령어를 받을 채팅방인지 (관리자 채팅방 또는 ALLOWED_CHAT_IDS)"""
+    chat_id = str(chat_id)
+    return chat_id == str(config.CHAT_ID) or chat_id in config.ALLOWED_CHAT_IDS or '*' in config.ALLOWED_CHAT_IDS
+
+def sync_alert_schedule():
+    """감시 타임프레임 변경 반영 - 새로 감시하는 타임프레임만 다음 봉 마감으로 예약하고 감시 해제된 것은 제거
+
+    기존 타임프레임의 예약 시각은 그대로 둠 (같은 틱에 마감이 예정된 봉을 다음 봉으로 밀어 건너뛰지 않도록)
+    반환: 새로 추가된 타임프레임 목록
+    """
+    watched = get_watched_timeframes()
+    for timeframe in [tf for tf in config.next_alert_times if tf not in watched]:
+        del config.next_alert_times[timeframe]
+    added = [tf for tf in watched if tf not in config.next_alert_times]
+    for timeframe in added:
+        config.next_alert_times[timeframe] = get_next_candle_close(timeframe)
+    return added